@@ -3,6 +3,23 @@ ASGI config for config project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+The dashboard and portfolio views are async: they run their independent
+queries concurrently (see core.async_utils.gather_queries). They also work
+under WSGI, where Django runs each one in its own event loop. Under ASGI the
+request's own thread is not blocked while the queries run.
+
+Serving over ASGI:
+
+    pip install uvicorn
+    uvicorn config.asgi:application --workers 4
+
+(or `gunicorn config.asgi:application -k uvicorn.workers.UvicornWorker`).
+Static and media files still need a front-end server, as with WSGI.
+
+Compare the two paths for a given family with:
+
+    python manage.py benchmark_views <username> --requests 200 --concurrency 20
+
 For more information on this file, see
 https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
 """
@@ -10,8 +10,11 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
+from celery.schedules import crontab
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -36,6 +39,8 @@ INSTALLED_APPS = [
     'django.contrib.contenttypes',
     'django.contrib.sessions',
     'django.contrib.messages',
+    # Lets runserver serve static files the way WhiteNoise does in production
+    'whitenoise.runserver_nostatic',
     'django.contrib.staticfiles',
     'django.contrib.sites',  # Required for allauth
     
@@ -51,6 +56,9 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'core.middleware.RequestMetricsMiddleware',
+    'core.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -59,6 +67,7 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'django_htmx.middleware.HtmxMiddleware',
     'allauth.account.middleware.AccountMiddleware', # Required for allauth
+    'core.middleware.FamilyContextMiddleware',
 ]
 
 ROOT_URLCONF = 'config.urls'
@@ -74,6 +83,7 @@ TEMPLATES = [
                 'django.template.context_processors.request', # Required for allauth
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'core.context_processors.family',
             ],
         },
     },
@@ -85,14 +95,53 @@ WSGI_APPLICATION = 'config.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
+# Write views run in one transaction each (see core.views). IMMEDIATE makes
+# those transactions queue for SQLite's write lock instead of deadlocking.
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'core.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            'transaction_mode': 'IMMEDIATE',
+            # Seconds a writer waits for the lock before "database is locked"
+            'timeout': 20,
+        },
     }
 }
 
 
+# Cache
+# Shared across workers when REDIS_CACHE_URL is set (e.g. redis://localhost:6379/1);
+# otherwise a per-process memory cache.
+# 'metrics' holds the /metrics counters apart from cached pages and fragments, so
+# they are never culled with them. Point REDIS_METRICS_URL at a database with a
+# noeviction policy to keep them safe from Redis eviction too.
+
+if os.environ.get('REDIS_CACHE_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_CACHE_URL'],
+        },
+        'metrics': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ.get('REDIS_METRICS_URL', os.environ['REDIS_CACHE_URL']),
+        },
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        },
+        'metrics': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'metrics',
+            # Far above the few thousand keys the metrics use, so nothing is culled
+            'OPTIONS': {'MAX_ENTRIES': 100000},
+        },
+    }
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -128,10 +177,36 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/4.2/howto/static-files/
 
 STATIC_URL = 'static/'
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+
+# collectstatic writes content-hashed copies (app.3f2a9c.js) with .gz and .br
+# variants next to them; WhiteNoise serves the best one the client accepts,
+# with a far-future immutable Cache-Control for hashed names.
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage',
+    },
+}
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Uploads are served by core.views.protected_media after an ownership check.
+# In production let the front-end server send the bytes:
+#   'nginx'  - X-Accel-Redirect to an internal location, e.g.
+#              location /protected-media/ { internal; alias /srv/hs_dashboard/media/; }
+#   'apache' - X-Sendfile with the absolute path (mod_xsendfile)
+# Unset, Django streams the file itself (with Range support).
+MEDIA_SENDFILE_BACKEND = os.environ.get('MEDIA_SENDFILE_BACKEND', '')
+MEDIA_ACCEL_REDIRECT_PREFIX = '/protected-media/'
+
+# Compliance report renderer: 'reportlab' draws the grid directly on a PDF canvas;
+# 'xhtml2pdf' renders pdfs/attendance_report.html (and is the fallback).
+PDF_REPORT_ENGINE = os.environ.get('PDF_REPORT_ENGINE', 'reportlab')
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
@@ -152,6 +227,28 @@ ACCOUNT_EMAIL_VERIFICATION = 'none' # Disable email verification for simplicity
 
 CSRF_TRUSTED_ORIGINS = ['https://*.ngrok-free.dev']
 
+# Prometheus scrapes /metrics with "Authorization: Bearer <METRICS_TOKEN>"; staff can view it signed in.
+# Counters live in the cache, so use REDIS_CACHE_URL for numbers that cover every process.
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
+# Structured task logs ("task.finished task=... duration_ms=...") go to the console
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'core': {'handlers': ['console'], 'level': os.environ.get('CORE_LOG_LEVEL', 'INFO')},
+    },
+}
+
+# Email (set EMAIL_BACKEND=django.core.mail.backends.console.EmailBackend to print mail locally)
+EMAIL_BACKEND = os.environ.get('EMAIL_BACKEND', 'django.core.mail.backends.smtp.EmailBackend')
+DEFAULT_FROM_EMAIL = os.environ.get('DEFAULT_FROM_EMAIL', 'HS Dashboard <noreply@hsdashboard.local>')
+# Outbound pace for the weekly digest (0 = unlimited)
+DIGEST_EMAILS_PER_SECOND = float(os.environ.get('DIGEST_EMAILS_PER_SECOND', '5'))
+
 # Celery Configuration
 CELERY_BROKER_URL = 'redis://localhost:6379/0'
 CELERY_RESULT_BACKEND = 'redis://localhost:6379/0'
@@ -159,3 +256,39 @@ CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
+
+# Report rendering runs on its own queue so a slow PDF can't starve the periodic
+# tasks. Run a dedicated worker for it, e.g.
+#   celery -A config worker -Q reports --concurrency 2
+# The limits below then recycle its children: after this many tasks, or once a
+# child's resident memory passes this many kilobytes (checked after each task).
+CELERY_TASK_ROUTES = {
+    'core.tasks.async_generate_report': {'queue': 'reports'},
+}
+CELERY_WORKER_MAX_TASKS_PER_CHILD = int(os.environ.get('CELERY_WORKER_MAX_TASKS_PER_CHILD', '50'))
+CELERY_WORKER_MAX_MEMORY_PER_CHILD = int(os.environ.get('CELERY_WORKER_MAX_MEMORY_PER_CHILD', str(512 * 1024)))
+# Long tasks: don't let one child hoard queued reports
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1
+# Seconds before a report render gets SoftTimeLimitExceeded, and before its child is killed
+REPORT_TASK_SOFT_TIME_LIMIT = int(os.environ.get('REPORT_TASK_SOFT_TIME_LIMIT', '60'))
+REPORT_TASK_TIME_LIMIT = int(os.environ.get('REPORT_TASK_TIME_LIMIT', '90'))
+
+# Periodic tasks (run with `celery -A config beat`)
+CELERY_BEAT_SCHEDULE = {
+    'refresh-association-rollups': {
+        'task': 'core.tasks.refresh_association_rollups',
+        'schedule': 15 * 60,
+    },
+    'prune-sync-records': {
+        'task': 'core.tasks.prune_sync_records',
+        'schedule': 24 * 60 * 60,
+    },
+    'prune-change-events': {
+        'task': 'core.tasks.prune_change_events',
+        'schedule': 24 * 60 * 60,
+    },
+    'send-weekly-digests': {
+        'task': 'core.tasks.send_weekly_digests',
+        'schedule': crontab(day_of_week='monday', hour=7, minute=0),
+    },
+}
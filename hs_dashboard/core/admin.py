@@ -1,10 +1,62 @@
 from django.contrib import admin
-from .models import Student, SchoolDay
+from .models import (
+    Association, FamilyProfile, Student, GlobalSubject, Subject, SchoolDay,
+    AttendanceBitmap, WorkSample, Grade, StudentRollup, SubjectCoverage,
+    SyncReceipt, SyncTombstone, ChangeEvent,
+)
+
+# Tables here grow to tens of thousands of rows, so every admin:
+# - searches one indexed column. On SQLite "^" (istartswith) is a case-insensitive
+#   LIKE that only a NOCASE index serves, and "=" (iexact) is a LIKE as well, so
+#   identifiers with plain indexes use "__exact". Searching a second column on a
+#   joined table would OR across tables and force a scan. Small reference tables
+#   (associations, global subjects, coverage) keep plain prefix searches,
+# - skips the unfiltered COUNT(*) on each changelist (show_full_result_count),
+# - joins the rows __str__/list_display need (list_select_related),
+# - uses autocomplete widgets rather than <select>s listing every related row.
+
+
+class ScalableAdmin(admin.ModelAdmin):
+    show_full_result_count = False
+    list_per_page = 50
+
+
+class ReadOnlyAdmin(ScalableAdmin):
+    """Derived tables: rebuilt from other rows, never edited by hand."""
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(Association)
+class AssociationAdmin(ScalableAdmin):
+    list_display = ('name', 'director_name', 'director', 'required_days')
+    list_select_related = ('director',)
+    search_fields = ('^name',)
+    autocomplete_fields = ('director',)
+
+
+@admin.register(FamilyProfile)
+class FamilyProfileAdmin(ScalableAdmin):
+    list_display = ('user', 'association', 'weekly_digest', 'data_version')
+    list_select_related = ('user', 'association')
+    list_filter = ('association', 'weekly_digest')
+    search_fields = ('user__username__exact',)
+    autocomplete_fields = ('user', 'association')
+    readonly_fields = ('data_version', 'last_digest_at')
+
 
 @admin.register(Student)
-class StudentAdmin(admin.ModelAdmin):
-    list_display = ('name', 'grade_level', 'custom_grade_level')
-    
+class StudentAdmin(ScalableAdmin):
+    list_display = ('name', 'grade_level', 'custom_grade_level', 'user')
+    list_select_related = ('user',)
+    list_filter = ('grade_level',)
+    search_fields = ('^name',)
+    autocomplete_fields = ('user',)
+
     class Media:
         js = ('admin/js/jquery.init.js', 'core/js/student_admin.js')
 
@@ -18,7 +70,98 @@ class StudentAdmin(admin.ModelAdmin):
         extra_context['show_save_and_continue'] = False
         return super().add_view(request, form_url, extra_context=extra_context)
 
+
+@admin.register(GlobalSubject)
+class GlobalSubjectAdmin(ScalableAdmin):
+    list_display = ('name',)
+    search_fields = ('^name_key',)
+
+
+@admin.register(Subject)
+class SubjectAdmin(ScalableAdmin):
+    list_display = ('display_name', 'student', 'global_subject')
+    list_select_related = ('student', 'global_subject')
+    search_fields = ('^name_key',)
+    ordering = ('name_key', 'id')
+    autocomplete_fields = ('student', 'global_subject')
+
+    def get_queryset(self, request):
+        # Also used by autocomplete results, which render __str__ per row
+        return super().get_queryset(request).select_related('student', 'global_subject')
+
+
 @admin.register(SchoolDay)
-class SchoolDayAdmin(admin.ModelAdmin):
+class SchoolDayAdmin(ScalableAdmin):
     list_display = ('student', 'date', 'created_at')
-    list_filter = ('student', 'date')
+    list_select_related = ('student',)
+    date_hierarchy = 'date'
+    search_fields = ('^student__name',)
+    autocomplete_fields = ('student', 'subjects')
+
+
+@admin.register(WorkSample)
+class WorkSampleAdmin(ScalableAdmin):
+    list_display = ('subject', 'student', 'date_uploaded')
+    list_select_related = ('student',)
+    date_hierarchy = 'date_uploaded'
+    search_fields = ('^student__name',)
+    autocomplete_fields = ('student',)
+
+
+@admin.register(Grade)
+class GradeAdmin(ScalableAdmin):
+    list_display = ('student', 'subject', 'term', 'score')
+    list_select_related = ('student', 'subject', 'subject__student', 'subject__global_subject')
+    list_filter = ('term',)
+    search_fields = ('^student__name',)
+    autocomplete_fields = ('student', 'subject')
+
+
+@admin.register(AttendanceBitmap)
+class AttendanceBitmapAdmin(ReadOnlyAdmin):
+    list_display = ('student', 'year_start')
+    list_select_related = ('student',)
+    search_fields = ('^student__name',)
+    exclude = ('bits',)
+
+
+@admin.register(StudentRollup)
+class StudentRollupAdmin(ReadOnlyAdmin):
+    list_display = ('student', 'year_start', 'days_logged', 'last_logged', 'refreshed_at')
+    list_select_related = ('student',)
+    search_fields = ('^student__name',)
+
+
+@admin.register(SubjectCoverage)
+class SubjectCoverageAdmin(ReadOnlyAdmin):
+    list_display = ('association', 'subject_name', 'students', 'days')
+    list_select_related = ('association',)
+    list_filter = ('association',)
+    search_fields = ('^subject_name',)
+
+
+@admin.register(SyncReceipt)
+class SyncReceiptAdmin(ReadOnlyAdmin):
+    list_display = ('user', 'key', 'status', 'school_day', 'created_at')
+    list_select_related = ('user',)
+    date_hierarchy = 'created_at'
+    search_fields = ('user__username__exact',)
+    raw_id_fields = ('school_day',)
+
+
+@admin.register(SyncTombstone)
+class SyncTombstoneAdmin(ReadOnlyAdmin):
+    list_display = ('model', 'object_id', 'user', 'deleted_at')
+    list_select_related = ('user',)
+    list_filter = ('model',)
+    date_hierarchy = 'deleted_at'
+    search_fields = ('user__username__exact',)
+
+
+@admin.register(ChangeEvent)
+class ChangeEventAdmin(ReadOnlyAdmin):
+    list_display = ('id', 'action', 'model', 'object_id', 'user_id', 'created_at')
+    list_filter = ('model', 'action')
+    # Searching by id only: the table is append-only and grows fastest
+    search_fields = ('object_id__exact',)
+    ordering = ('-id',)
@@ -0,0 +1,47 @@
+import asyncio
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.views import redirect_to_login
+from django.db import close_old_connections
+
+
+def _in_own_connection(func):
+    """Runs `func` and then releases the worker thread's DB connection (honouring CONN_MAX_AGE)."""
+    def _run():
+        try:
+            return func()
+        finally:
+            close_old_connections()
+    return _run
+
+
+async def gather_queries(**queries):
+    """
+    Runs independent synchronous ORM callables concurrently and returns their
+    results by name.
+
+    Django's async ORM methods all queue on one shared thread, so they never
+    overlap. Each callable here gets its own worker thread and database
+    connection instead. Callables must return fully evaluated data (lists,
+    dicts), not lazy querysets.
+    """
+    names = list(queries)
+    results = await asyncio.gather(*(
+        sync_to_async(_in_own_connection(func), thread_sensitive=False)()
+        for func in queries.values()
+    ))
+    return dict(zip(names, results))
+
+
+def async_login_required(view_func):
+    """login_required for async views (Django 4.2's decorator only wraps sync views)."""
+    @wraps(view_func)
+    async def _wrapper(request, *args, **kwargs):
+        # request.user is lazy and loading it queries the session
+        is_authenticated = await sync_to_async(lambda: request.user.is_authenticated)()
+        if not is_authenticated:
+            return redirect_to_login(request.get_full_path(), settings.LOGIN_URL)
+        return await view_func(request, *args, **kwargs)
+    return _wrapper
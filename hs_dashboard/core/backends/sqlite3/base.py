@@ -0,0 +1,28 @@
+"""
+SQLite backend that can start transactions with BEGIN IMMEDIATE.
+
+With the default deferred BEGIN a transaction only takes the write lock at
+its first write. Two requests that read before writing then deadlock, and
+SQLite fails one of them at once with "database is locked" rather than
+waiting out the busy timeout. Taking the lock up front makes concurrent write
+transactions queue instead.
+
+Mirrors the `transaction_mode` option added in Django 5.1, so on upgrade the
+ENGINE can go back to django.db.backends.sqlite3 with the same OPTIONS.
+"""
+from django.db.backends.sqlite3 import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    transaction_mode = None
+
+    def get_connection_params(self):
+        kwargs = super().get_connection_params()
+        self.transaction_mode = kwargs.pop('transaction_mode', None)
+        return kwargs
+
+    def _start_transaction_under_autocommit(self):
+        if self.transaction_mode:
+            self.cursor().execute(f"BEGIN {self.transaction_mode}")
+        else:
+            super()._start_transaction_under_autocommit()
@@ -0,0 +1,48 @@
+"""
+Work collected over one database transaction and handed over once, when it
+commits. Signal receivers use batches so a transaction touching hundreds of
+rows still costs one cache bump, one index refresh or one UPDATE.
+"""
+import threading
+
+from django.db import transaction
+
+_local = threading.local()
+
+
+class TransactionBatch:
+    """
+    Per-transaction state, one instance per batch class and open transaction.
+
+    Subclasses collect into their own attributes and override flush(), which
+    runs once after the transaction commits. A rollback (of the transaction,
+    or of the savepoint the batch was started in) drops the batch unflushed.
+    """
+
+    def flush(self):
+        pass
+
+    def _commit(self):
+        batches = getattr(_local, 'batches', {})
+        if batches.get(type(self)) is self:
+            del batches[type(self)]
+        self.flush()
+
+    @classmethod
+    def current(cls):
+        """
+        The batch of the open transaction, or None outside one.
+
+        A new batch is started when the previous one was committed, or was
+        discarded with its on_commit callback by a rollback.
+        """
+        connection = transaction.get_connection()
+        if not connection.in_atomic_block:
+            return None
+        if not hasattr(_local, 'batches'):
+            _local.batches = {}
+        batch = _local.batches.get(cls)
+        if batch is None or not any(entry[1] == batch._commit for entry in connection.run_on_commit):
+            batch = _local.batches[cls] = cls()
+            transaction.on_commit(batch._commit)
+        return batch
@@ -0,0 +1,3 @@
+def family(request):
+    """Exposes the request's FamilyContext to templates as `family`."""
+    return {'family': getattr(request, 'family', None)}
@@ -0,0 +1,148 @@
+import csv
+import json
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from core.models import SchoolDay, Student, Subject, normalize_subject_name
+from core.services.attendance_bitmap import year_start_for
+from core.services.export_service import get_academic_year_range
+from core.utils import get_required_subjects
+from logic import DEFAULT_REQUIRED_DAYS, SchoolYear
+
+FIELDS = [
+    'family', 'student', 'grade', 'year_start', 'year_end', 'required_days', 'days', 'shortfall',
+    'subjects_covered', 'subjects_required', 'missing_subjects', 'projected_completion', 'status',
+]
+DAY_CHUNK_SIZE = 5000
+
+
+def _status(year, projected, today):
+    if year.is_complete:
+        return 'complete'
+    if not year.days:
+        return 'not started'
+    if today > year.end:
+        return 'incomplete'
+    return 'on track' if projected and projected <= year.end else 'behind'
+
+
+class Command(BaseCommand):
+    help = (
+        "Audits every student's academic year offline: days logged against the "
+        "association's requirement, shortfall, required-subject coverage and "
+        "projected completion at the current pace. Uses three queries in total; "
+        "school days are streamed in one ordered pass."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--year', type=int,
+                            help="Academic year by start year (default: each student's current year).")
+        parser.add_argument('--association', type=int, help="Only families in this association id.")
+        parser.add_argument('--today', type=date.fromisoformat,
+                            help="Audit as of this date (YYYY-MM-DD); drives pace and status.")
+        parser.add_argument('--incomplete', action='store_true', help="Only students short of their days.")
+        parser.add_argument('--format', choices=('table', 'csv', 'json'), default='table')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        today = options['today'] or timezone.localdate()
+
+        students = Student.objects.all()
+        if options['association']:
+            students = students.filter(user__profile__association_id=options['association'])
+        rows = list(students.order_by('user__username', 'name', 'id').values_list(
+            'id', 'user__username', 'name', 'grade_level', 'custom_grade_level',
+            'academic_year_start_month', 'academic_year_end_month',
+            'user__profile__association__required_days',
+        ))
+        if not rows:
+            raise CommandError("No students to audit.")
+
+        years = {}
+        for student_id, _, _, _, _, start_month, end_month, required_days in rows:
+            start_month, end_month = start_month or 8, end_month or 7
+            start_year = options['year'] or year_start_for(start_month, today).year
+            start, end = get_academic_year_range(start_month, end_month, start_year)
+            years[student_id] = SchoolYear(start, end, required_days or DEFAULT_REQUIRED_DAYS)
+
+        # Subjects are counted by name so a renamed or re-linked subject still matches.
+        # Display names are resolved like prepare_compliance_data's subject summary.
+        subject_keys = {}
+        assigned = {}
+        for subject_id, student_id, name in Subject.objects.filter(student_id__in=years).annotate(
+            display=Coalesce('global_subject__name', 'name')
+        ).values_list('id', 'student_id', 'display'):
+            subject_keys[subject_id] = normalize_subject_name(name)
+            assigned.setdefault(student_id, []).append(name or '')
+
+        first = min(year.start for year in years.values())
+        last = max(year.end for year in years.values())
+        # One row per (day, subject) with a NULL subject for days logged without any
+        day_rows = SchoolDay.objects.filter(
+            student_id__in=years, date__range=(first, last)
+        ).order_by('student_id', 'date').values_list('student_id', 'date', 'subjects')
+        streamed = 0
+        for student_id, day, subject_id in day_rows.iterator(chunk_size=DAY_CHUNK_SIZE):
+            streamed += 1
+            years[student_id].log_day(day, subject_keys.get(subject_id))
+
+        results = []
+        for student_id, family, name, grade_level, custom_grade, _, _, _ in rows:
+            year = years[student_id]
+            if options['incomplete'] and year.is_complete:
+                continue
+            grade = custom_grade if grade_level == 'Other' and custom_grade else grade_level
+            # The dashboard's rule: assigned subjects, or the grade's defaults when none are assigned
+            subjects = sorted(set(assigned.get(student_id) or get_required_subjects(grade_level)))
+            required = {normalize_subject_name(subject): subject for subject in subjects}
+            covered, missing = year.coverage(list(required))
+            projected = year.projected_completion(today)
+            results.append({
+                'family': family,
+                'student': name,
+                'grade': grade,
+                'year_start': year.start.isoformat(),
+                'year_end': year.end.isoformat(),
+                'required_days': year.required_days,
+                'days': year.days,
+                'shortfall': year.shortfall,
+                'subjects_covered': len(covered),
+                'subjects_required': len(required),
+                'missing_subjects': [required[key] for key in missing],
+                'projected_completion': projected.isoformat() if projected else None,
+                'status': _status(year, projected, today),
+            })
+
+        self._write(results, options['format'])
+        self.stderr.write(
+            f"Audited {len(rows)} student(s) from {streamed} day row(s) in {time.perf_counter() - started:.2f}s"
+        )
+
+    def _write(self, results, output_format):
+        if output_format == 'json':
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        if output_format == 'csv':
+            writer = csv.DictWriter(self.stdout, fieldnames=FIELDS, lineterminator='\n')
+            writer.writeheader()
+            for row in results:
+                writer.writerow({**row, 'missing_subjects': '; '.join(row['missing_subjects'])})
+            return
+
+        self.stdout.write(
+            f"{'family':<16} {'student':<20} {'days':>5} {'req':>5} {'short':>5} "
+            f"{'subjects':>8} {'projected':>10}  status"
+        )
+        for row in results:
+            self.stdout.write(
+                f"{row['family'][:16]:<16} {row['student'][:20]:<20} {row['days']:>5} "
+                f"{row['required_days']:>5} {row['shortfall']:>5} "
+                f"{row['subjects_covered']:>3}/{row['subjects_required']:<4} "
+                f"{row['projected_completion'] or '-':>10}  {row['status']}"
+            )
+            if row['missing_subjects']:
+                self.stdout.write(f"{'':<38}missing: {', '.join(row['missing_subjects'])}")
@@ -0,0 +1,263 @@
+import csv
+import itertools
+import json
+import multiprocessing
+import os
+import resource
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+from io import BytesIO
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import override_settings
+
+from core.models import SchoolDay, Student, WorkSample
+from core.services.attendance_bitmap import rebuild_bitmaps
+from core.services.pdf_service import prepare_compliance_data
+from core.utils import generate_pdf_bytes, resolve_subject
+
+REPORTS = ('attendance', 'portfolio')
+ENGINES = ('reportlab', 'xhtml2pdf')
+FIRST_DAY = date(2025, 8, 1)
+SUBJECTS_PER_DAY = 4
+FIELDS = [
+    'report', 'engine', 'months', 'days', 'subjects', 'samples', 'resolution',
+    'wall_ms', 'wall_ms_min', 'tracemalloc_peak_kb', 'rss_delta_kb', 'rss_peak_kb', 'pdf_bytes',
+]
+
+
+def _int_list(value):
+    return [int(part) for part in value.split(',') if part]
+
+
+def _resolution_list(value):
+    try:
+        return [tuple(int(n) for n in part.lower().split('x')) for part in value.split(',') if part]
+    except ValueError:
+        raise CommandError(f"Resolutions look like 800x600, not {value!r}")
+
+
+def _rss_kb():
+    with open('/proc/self/status') as status:
+        for line in status:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1])
+    return 0
+
+
+def _measure(render, conn):
+    """Child process body: renders once and sends back the measurements."""
+    rss_before = _rss_kb()
+    tracemalloc.start()
+    start = time.perf_counter()
+    pdf = render()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    conn.send({
+        'wall_ms': elapsed * 1000,
+        'tracemalloc_peak_kb': peak // 1024,
+        'rss_delta_kb': max(0, max_rss - rss_before),
+        'rss_peak_kb': max_rss,
+        'pdf_bytes': len(pdf or b''),
+    })
+    conn.close()
+
+
+def _run_isolated(render, repeat):
+    """
+    Renders `repeat` times, each in a forked child so peak RSS belongs to that
+    render alone. The context is built beforehand; children never touch the DB.
+    """
+    context = multiprocessing.get_context('fork')
+    runs = []
+    for _ in range(repeat):
+        parent_conn, child_conn = context.Pipe(duplex=False)
+        process = context.Process(target=_measure, args=(render, child_conn))
+        process.start()
+        child_conn.close()
+        try:
+            runs.append(parent_conn.recv())
+        except EOFError:
+            raise CommandError("A render process died (out of memory?)")
+        process.join()
+    times = [run['wall_ms'] for run in runs]
+    return {
+        'wall_ms': round(statistics.median(times), 2),
+        'wall_ms_min': round(min(times), 2),
+        'tracemalloc_peak_kb': max(run['tracemalloc_peak_kb'] for run in runs),
+        'rss_delta_kb': max(run['rss_delta_kb'] for run in runs),
+        'rss_peak_kb': max(run['rss_peak_kb'] for run in runs),
+        'pdf_bytes': runs[-1]['pdf_bytes'],
+    }
+
+
+def _month_end(months):
+    first = FIRST_DAY
+    for _ in range(months):
+        first = (first + timedelta(days=32)).replace(day=1)
+    return first - timedelta(days=1)
+
+
+def _seed_attendance(user, months, days, subject_count):
+    """A student with `days` school days over `months` months and `subject_count` subjects."""
+    student = Student.objects.create(user=user, name=f'Bench {months}m {days}d {subject_count}s')
+    subjects = [resolve_subject(student, f'Subject {n:02d}') for n in range(subject_count)]
+    end = _month_end(months)
+    span = (end - FIRST_DAY).days + 1
+    days = min(days, span)
+    # Spread the days evenly over the span
+    day_rows = SchoolDay.objects.bulk_create([
+        SchoolDay(student=student, date=FIRST_DAY + timedelta(days=n * span // days))
+        for n in range(days)
+    ])
+    through = SchoolDay.subjects.through
+    if subjects:
+        per_day = min(SUBJECTS_PER_DAY, len(subjects))
+        through.objects.bulk_create([
+            through(schoolday_id=day.id, subject_id=subjects[(index + k) % len(subjects)].id)
+            for index, day in enumerate(day_rows) for k in range(per_day)
+        ], batch_size=1000)
+    rebuild_bitmaps(Student.objects.filter(id=student.id))
+    return student, end, days
+
+
+def _sample_image(width, height):
+    """A JPEG with photo-like noise, so it compresses like a real scan."""
+    from PIL import Image
+    image = Image.effect_noise((width, height), 64).convert('RGB')
+    buffer = BytesIO()
+    image.save(buffer, 'JPEG', quality=85)
+    return buffer.getvalue()
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmarks the attendance and portfolio PDF reports over generated data sets "
+        "(months, days, subjects, sample count and resolution). Records wall time, "
+        "tracemalloc and RSS peaks and PDF size as JSON or CSV. Test data goes into a "
+        "temporary test database, so the live database is never written or locked."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--report', action='append', dest='reports', choices=REPORTS,
+                            help="Report to benchmark (may be repeated; default: both).")
+        parser.add_argument('--engine', action='append', dest='engines', choices=ENGINES,
+                            help="Attendance report engine (may be repeated; default: both).")
+        parser.add_argument('--months', type=_int_list, default=[1, 12], help="Comma-separated, e.g. 1,6,12.")
+        parser.add_argument('--days', type=_int_list, default=[20, 180], help="Logged days, comma-separated.")
+        parser.add_argument('--subjects', type=_int_list, default=[5, 25], help="Subjects, comma-separated.")
+        parser.add_argument('--samples', type=_int_list, default=[1, 10, 50], help="Work samples, comma-separated.")
+        parser.add_argument('--resolution', type=_resolution_list, default=[(1024, 768), (4000, 3000)],
+                            help="Sample image sizes, e.g. 1024x768,4000x3000.")
+        parser.add_argument('--repeat', type=int, default=3, help="Renders per case (median time is reported).")
+        parser.add_argument('--format', choices=('json', 'csv'), default='json')
+        parser.add_argument('--output', help="Write results here instead of stdout.")
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 1:
+            raise CommandError("--repeat must be at least 1")
+        reports = options['reports'] or list(REPORTS)
+        self.options = options
+        self.results = []
+
+        # xhtml2pdf only reads images below the working directory, like real uploads in MEDIA_ROOT
+        os.makedirs(settings.MEDIA_ROOT, exist_ok=True)
+        media_root = tempfile.mkdtemp(prefix='pdf-benchmark-', dir=settings.MEDIA_ROOT)
+        # Seeding holds a write transaction for the whole run, so it goes into the
+        # test database (in memory on SQLite) rather than blocking live writers
+        live_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            with override_settings(MEDIA_ROOT=media_root), transaction.atomic():
+                user = User.objects.create(username='pdf-benchmark')
+                if 'attendance' in reports:
+                    self._attendance_cases(user)
+                if 'portfolio' in reports:
+                    self._portfolio_cases(user)
+        finally:
+            connection.creation.destroy_test_db(live_name, verbosity=0)
+            shutil.rmtree(media_root, ignore_errors=True)
+
+        self._write()
+
+    def _record(self, row):
+        row = {field: row.get(field) for field in FIELDS}
+        self.results.append(row)
+        params = ' '.join(
+            f"{field}={row[field]}" for field in ('months', 'days', 'subjects', 'samples', 'resolution')
+            if row[field] is not None
+        )
+        self.stderr.write(
+            f"{row['report']:<10} {row['engine']:<9} {params} -> {row['wall_ms']:.1f} ms, "
+            f"{row['tracemalloc_peak_kb']} KB traced, {row['rss_delta_kb']} KB RSS, {row['pdf_bytes']} B"
+        )
+
+    def _attendance_cases(self, user):
+        from core.services.report_canvas import render_attendance_report
+
+        engines = self.options['engines'] or list(ENGINES)
+        for months, days, subject_count in itertools.product(
+            self.options['months'], self.options['days'], self.options['subjects']
+        ):
+            student, end, actual_days = _seed_attendance(user, months, days, subject_count)
+            context = prepare_compliance_data(student, FIRST_DAY, end)
+            for engine in engines:
+                if engine == 'reportlab':
+                    render = lambda: render_attendance_report(context)
+                else:
+                    render = lambda: generate_pdf_bytes('pdfs/attendance_report.html', context)
+                self._record({
+                    'report': 'attendance', 'engine': engine, 'months': months,
+                    'days': actual_days, 'subjects': subject_count,
+                    **_run_isolated(render, self.options['repeat']),
+                })
+
+    def _portfolio_cases(self, user):
+        images = {}
+        for width, height in self.options['resolution']:
+            images[(width, height)] = _sample_image(width, height)
+        for count, (width, height) in itertools.product(self.options['samples'], self.options['resolution']):
+            student = Student.objects.create(user=user, name=f'Bench {count} x {width}x{height}')
+            for n in range(count):
+                WorkSample.objects.create(
+                    student=student, subject=f'Subject {n % 5}', date_uploaded=FIRST_DAY,
+                    file=ContentFile(images[(width, height)], name=f'bench_{n}.jpg'),
+                )
+            context = {
+                'student': student,
+                'academic_year': '2025-2026',
+                'samples': list(student.work_samples.order_by('subject', 'date_uploaded')),
+                'start_date': FIRST_DAY,
+                'end_date': _month_end(12),
+            }
+            self._record({
+                'report': 'portfolio', 'engine': 'xhtml2pdf', 'samples': count,
+                'resolution': f'{width}x{height}',
+                **_run_isolated(lambda: generate_pdf_bytes('pdfs/portfolio_report.html', context),
+                                self.options['repeat']),
+            })
+
+    def _write(self):
+        stream = open(self.options['output'], 'w', newline='') if self.options['output'] else sys.stdout
+        try:
+            if self.options['format'] == 'csv':
+                writer = csv.DictWriter(stream, fieldnames=FIELDS)
+                writer.writeheader()
+                writer.writerows(self.results)
+            else:
+                json.dump(self.results, stream, indent=2)
+                stream.write('\n')
+        finally:
+            if stream is not sys.stdout:
+                stream.close()
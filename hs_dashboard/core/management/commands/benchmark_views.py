@@ -0,0 +1,95 @@
+import asyncio
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+from django.test import AsyncClient, Client
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmarks pages through Django's WSGI and ASGI handlers (in process, "
+        "no network) as the given user, reporting throughput and latency."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+        parser.add_argument(
+            '--path', action='append', dest='paths',
+            help="Page to request (may be repeated; default: / and /portfolio/).",
+        )
+        parser.add_argument('--requests', type=int, default=50, help="Requests per page and handler.")
+        parser.add_argument('--concurrency', type=int, default=10, help="Requests in flight at once.")
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f"No user named {options['username']!r}")
+
+        paths = options['paths'] or ['/', '/portfolio/']
+        total = options['requests']
+        concurrency = options['concurrency']
+
+        # One login shared by every client
+        login = Client()
+        login.force_login(user)
+        cookies = login.cookies
+
+        self.stdout.write(f"{total} requests per page, {concurrency} concurrent\n")
+        self.stdout.write(f"{'handler':<6} {'path':<20} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'errors':>7}")
+        for path in paths:
+            for handler, run in (('wsgi', self._run_wsgi), ('asgi', self._run_asgi)):
+                elapsed, timings, errors = run(path, cookies, total, concurrency)
+                self._report(handler, path, elapsed, timings, errors)
+
+    def _report(self, handler, path, elapsed, timings, errors):
+        timings = sorted(timings)
+        p50 = statistics.median(timings) * 1000
+        p95 = timings[max(0, int(len(timings) * 0.95) - 1)] * 1000
+        self.stdout.write(
+            f"{handler:<6} {path:<20} {len(timings) / elapsed:>8.1f} {p50:>8.1f} {p95:>8.1f} {errors:>7}"
+        )
+
+    def _run_wsgi(self, path, cookies, total, concurrency):
+        def fetch(_):
+            client = Client()
+            client.cookies = cookies
+            start = time.perf_counter()
+            try:
+                status = client.get(path).status_code
+            finally:
+                close_old_connections()
+            return time.perf_counter() - start, status
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(fetch, range(total)))
+        return self._summarise(start, results)
+
+    def _run_asgi(self, path, cookies, total, concurrency):
+        async def run_all():
+            semaphore = asyncio.Semaphore(concurrency)
+
+            async def fetch():
+                async with semaphore:
+                    client = AsyncClient()
+                    client.cookies = cookies
+                    start = time.perf_counter()
+                    response = await client.get(path)
+                    return time.perf_counter() - start, response.status_code
+
+            return await asyncio.gather(*(fetch() for _ in range(total)))
+
+        start = time.perf_counter()
+        results = asyncio.run(run_all())
+        return self._summarise(start, results)
+
+    def _summarise(self, start, results):
+        elapsed = time.perf_counter() - start
+        timings = [duration for duration, _ in results]
+        errors = sum(1 for _, status in results if status != 200)
+        return elapsed, timings, errors
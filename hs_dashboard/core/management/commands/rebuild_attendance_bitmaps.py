@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from core.models import Student
+from core.services.attendance_bitmap import rebuild_bitmaps
+
+
+class Command(BaseCommand):
+    help = "Recomputes the per-student attendance bitmaps from SchoolDay rows."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--student', type=int, action='append', dest='student_ids',
+            help="Only rebuild this student id (may be repeated).",
+        )
+
+    def handle(self, *args, **options):
+        students = Student.objects.all()
+        if options['student_ids']:
+            students = students.filter(id__in=options['student_ids'])
+
+        written = rebuild_bitmaps(students)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {written} attendance bitmap(s)."))
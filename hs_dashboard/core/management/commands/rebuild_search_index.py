@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.services.search_service import rebuild_search_index, search_available
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the full-text search index from SchoolDay and WorkSample rows."
+
+    def handle(self, *args, **options):
+        if not search_available():
+            raise CommandError("Full-text search needs SQLite (FTS5); nothing to rebuild.")
+
+        indexed = rebuild_search_index()
+        self.stdout.write(self.style.SUCCESS(f"Indexed {indexed} row(s)."))
@@ -0,0 +1,257 @@
+import logging
+import multiprocessing
+import random
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from importlib import import_module
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, close_old_connections, connections
+from django.test import Client
+from django.urls import reverse
+
+from core.models import Grade, SchoolDay, Student
+from core.utils import resolve_subject
+
+USERNAME_PREFIX = 'stress-family-'
+SUBJECTS = ['Math', 'Reading', 'Science', 'History']
+OPERATIONS = ('log', 'bulk', 'grade')
+# Far from any real records; each family logs consecutive days from here
+FIRST_DATE = date(2000, 1, 1)
+# Any 32 alphanumerics work; the header just has to match the cookie
+CSRF_TOKEN = 'stresstest' * 3 + 'ab'
+
+
+def _seed_families(count):
+    """
+    Creates (or resets) `count` stress-test families with two students each.
+
+    Returns:
+        list: [(user_id, [student_id, student_id]), ...]
+    """
+    families = []
+    for n in range(count):
+        user, created = User.objects.get_or_create(username=f'{USERNAME_PREFIX}{n}')
+        if created:
+            user.set_unusable_password()
+            user.save()
+        students = list(Student.objects.filter(user=user).order_by('id')[:2])
+        while len(students) < 2:
+            students.append(Student.objects.create(user=user, name=f'Stress Student {len(students) + 1}'))
+        for student in students:
+            for name in SUBJECTS:
+                resolve_subject(student, name)
+        # Start every run from an empty history so generated dates never collide
+        SchoolDay.objects.filter(student__in=students).delete()
+        Grade.objects.filter(student__in=students).delete()
+        families.append((user.id, [student.id for student in students]))
+    return families
+
+
+def _session_cookie(user_id):
+    """A logged-in session for `user_id`, usable by the test client or a live server."""
+    user = User.objects.get(id=user_id)
+    session = import_module(settings.SESSION_ENGINE).SessionStore()
+    session[SESSION_KEY] = str(user.pk)
+    session[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+    session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+    session.save()
+    return session.session_key
+
+
+class _Family:
+    """One worker's family: its session, students, subjects and next free date."""
+
+    def __init__(self, user_id, student_ids, session_key):
+        self.student_ids = student_ids
+        self.session_key = session_key
+        self.subject_ids = dict(Student.objects.get(id=student_ids[0]).subjects.values_list('name_key', 'id'))
+        self.next_day = 0
+        self.lock = threading.Lock()
+
+    def take_date(self):
+        with self.lock:
+            self.next_day += 1
+            return (FIRST_DATE + timedelta(days=self.next_day)).isoformat()
+
+
+def _request_data(operation, family, rng):
+    """Returns (url name, POST data) for one write."""
+    first, second = family.student_ids
+    if operation == 'log':
+        return 'log_school_day', {
+            'student_id': first,
+            'date': family.take_date(),
+            'notes': 'Stress test',
+            'subjects_completed': rng.sample(SUBJECTS, 2),
+        }
+    if operation == 'bulk':
+        return 'bulk_log_school_day', {
+            'student_ids': [first, second],
+            'date': family.take_date(),
+            f'subjects_{first}': rng.sample(SUBJECTS, 2),
+            f'subjects_{second}': rng.sample(SUBJECTS, 2),
+        }
+    return 'save_grade', {
+        'student_id': first,
+        'subject_id': rng.choice(list(family.subject_ids.values())),
+        'term': rng.choice(['Q1', 'Q2', 'Q3', 'Q4']),
+        'score': str(rng.randint(60, 100)),
+    }
+
+
+def _post_in_process(client, url, data):
+    try:
+        response = client.post(url, data)
+    except OperationalError as exc:
+        return 'locked' if 'locked' in str(exc) else 'error'
+    except Exception:
+        return 'error'
+    finally:
+        close_old_connections()
+    return 'ok' if response.status_code < 400 else 'error'
+
+
+def _post_live(base_url, session_key, url, data):
+    request = urllib.request.Request(
+        urllib.parse.urljoin(base_url, url),
+        data=urllib.parse.urlencode(data, doseq=True).encode(),
+        headers={
+            'Cookie': f'{settings.SESSION_COOKIE_NAME}={session_key}; {settings.CSRF_COOKIE_NAME}={CSRF_TOKEN}',
+            'X-CSRFToken': CSRF_TOKEN,
+        },
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=60) as response:
+            response.read()
+    except urllib.error.HTTPError as exc:
+        body = exc.read()
+        return 'locked' if b'database is locked' in body else 'error'
+    except OSError:
+        return 'error'
+    return 'ok'
+
+
+def _run_worker(job):
+    """
+    Runs one process's share of the load: `threads` threads, each driving its
+    own family. Returns [(operation, seconds, outcome), ...].
+    """
+    families, operations, requests_per_thread, base_url, seed = job
+    # Forked processes must not share the parent's database connections
+    connections.close_all()
+    logging.getLogger('django.request').setLevel(logging.CRITICAL)
+
+    def drive(index):
+        user_id, student_ids = families[index]
+        family = _Family(user_id, student_ids, _session_cookie(user_id))
+        close_old_connections()
+        rng = random.Random(seed + index)
+        client = None
+        if not base_url:
+            client = Client()
+            client.cookies[settings.SESSION_COOKIE_NAME] = family.session_key
+
+        results = []
+        for _ in range(requests_per_thread):
+            operation = rng.choice(operations)
+            url_name, data = _request_data(operation, family, rng)
+            url = reverse(url_name)
+            start = time.perf_counter()
+            if base_url:
+                outcome = _post_live(base_url, family.session_key, url, data)
+            else:
+                outcome = _post_in_process(client, url, data)
+            results.append((operation, time.perf_counter() - start, outcome))
+        return results
+
+    with ThreadPoolExecutor(max_workers=len(families)) as pool:
+        per_thread = list(pool.map(drive, range(len(families))))
+    connections.close_all()
+    return [result for results in per_thread for result in results]
+
+
+class Command(BaseCommand):
+    help = (
+        "Stress-tests the attendance and grade write views with many concurrent "
+        "writers (threads, optionally across processes), reporting throughput, "
+        "'database is locked' errors and tail latency per operation."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8, help="Writer threads per process.")
+        parser.add_argument('--processes', type=int, default=1, help="Worker processes (forked).")
+        parser.add_argument('--requests', type=int, default=50, help="Writes per thread.")
+        parser.add_argument(
+            '--operation', action='append', dest='operations', choices=OPERATIONS,
+            help="Write to exercise (may be repeated; default: all of them, mixed).",
+        )
+        parser.add_argument(
+            '--url',
+            help="Base URL of a running server (e.g. http://127.0.0.1:8000/) sharing this "
+                 "database. Without it requests go through the in-process test client. Lock "
+                 "errors are recognised from the server's DEBUG error page; otherwise they count as errors.",
+        )
+        parser.add_argument('--seed', type=int, default=0, help="Random seed for the request mix.")
+
+    def handle(self, *args, **options):
+        threads = options['threads']
+        processes = options['processes']
+        if threads < 1 or processes < 1 or options['requests'] < 1:
+            raise CommandError("--threads, --processes and --requests must be positive")
+        operations = tuple(options['operations'] or OPERATIONS)
+
+        families = _seed_families(threads * processes)
+        jobs = [
+            (families[p * threads:(p + 1) * threads], operations, options['requests'],
+             options['url'], options['seed'] + p * threads)
+            for p in range(processes)
+        ]
+
+        target = options['url'] or 'test client'
+        self.stdout.write(
+            f"{threads * processes} writers ({processes} x {threads}), {options['requests']} writes each, "
+            f"against {target} on {connections['default'].vendor}\n"
+        )
+
+        start = time.perf_counter()
+        if processes == 1:
+            results = _run_worker(jobs[0])
+        else:
+            connections.close_all()
+            with multiprocessing.get_context('fork').Pool(processes) as pool:
+                results = [result for chunk in pool.map(_run_worker, jobs) for result in chunk]
+        elapsed = time.perf_counter() - start
+
+        self.stdout.write(
+            f"{'operation':<10} {'writes':>7} {'ok':>7} {'locked':>7} {'errors':>7} "
+            f"{'w/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}"
+        )
+        for operation in operations:
+            self._report(operation, [r for r in results if r[0] == operation], elapsed)
+        self._report('total', results, elapsed)
+
+    def _report(self, label, results, elapsed):
+        if not results:
+            return
+        timings = sorted(duration * 1000 for _, duration, _ in results)
+        outcomes = [outcome for _, _, outcome in results]
+
+        def percentile(fraction):
+            return timings[min(len(timings) - 1, int(len(timings) * fraction))]
+
+        self.stdout.write(
+            f"{label:<10} {len(results):>7} {outcomes.count('ok'):>7} {outcomes.count('locked'):>7} "
+            f"{outcomes.count('error'):>7} {outcomes.count('ok') / elapsed:>8.1f} "
+            f"{statistics.median(timings):>8.1f} {percentile(0.95):>8.1f} "
+            f"{percentile(0.99):>8.1f} {timings[-1]:>8.1f}"
+        )
@@ -0,0 +1,124 @@
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.middleware.gzip import GZipMiddleware
+from django.utils.functional import cached_property
+
+from .models import FamilyProfile, Student
+from .services.metrics import HTTP_REQUEST_SECONDS
+
+
+class FamilyContext:
+    """
+    The signed-in family's profile, association and students, each loaded on
+    first use and then shared by views, templates and services for the rest
+    of the request.
+    """
+
+    def __init__(self, user):
+        self.user = user
+
+    @cached_property
+    def profile(self):
+        if not self.user.is_authenticated:
+            return None
+        return FamilyProfile.objects.select_related('association').filter(user=self.user).first()
+
+    @cached_property
+    def association(self):
+        return self.profile.association if self.profile else None
+
+    @cached_property
+    def students(self):
+        """The family's students with their subjects prefetched."""
+        if not self.user.is_authenticated:
+            return []
+        return list(
+            Student.objects.filter(user=self.user).prefetch_related('subjects', 'subjects__global_subject')
+        )
+
+    @cached_property
+    def student_ids(self):
+        if 'students' in self.__dict__ or not self.user.is_authenticated:
+            return [student.id for student in self.students]
+        return list(Student.objects.filter(user=self.user).values_list('id', flat=True))
+
+    @cached_property
+    def is_director(self):
+        return self.user.is_authenticated and self.user.directed_associations.exists()
+
+
+class FamilyContextMiddleware:
+    """Attaches a lazily loaded FamilyContext as `request.family`."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            # Nothing is loaded here, so async views need no thread hop
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        request.family = FamilyContext(request.user)
+        # In async mode this returns the view's coroutine for the caller to await
+        return self.get_response(request)
+
+
+# Binary types (PDFs, images, zips) are already compressed
+COMPRESSIBLE_TYPES = ('text/', 'application/json', 'application/x-ndjson', 'application/javascript', 'image/svg+xml')
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """
+    Gzips text responses (pages, HTMX partials, JSON, CSV/NDJSON exports).
+
+    Uploads from protected_media are left alone: they advertise byte ranges,
+    whose offsets refer to the uncompressed file.
+    """
+
+    def process_response(self, request, response):
+        content_type = response.get('Content-Type', '').split(';')[0].strip()
+        if response.has_header('Accept-Ranges') or not content_type.startswith(COMPRESSIBLE_TYPES):
+            return response
+        return super().process_response(request, response)
+
+
+class RequestMetricsMiddleware:
+    """
+    Records each response's time in http_request_duration_seconds, labelled
+    with the URL pattern's name (never the raw path) so the series stay bounded.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        start = time.perf_counter()
+        response = self.get_response(request)
+        self._record(request, response, time.perf_counter() - start)
+        return response
+
+    async def __acall__(self, request):
+        start = time.perf_counter()
+        response = await self.get_response(request)
+        self._record(request, response, time.perf_counter() - start)
+        return response
+
+    def _record(self, request, response, duration):
+        match = getattr(request, 'resolver_match', None)
+        HTTP_REQUEST_SECONDS.observe(
+            duration,
+            view=match.view_name if match else 'unmatched',
+            method=request.method,
+            status=response.status_code,
+        )
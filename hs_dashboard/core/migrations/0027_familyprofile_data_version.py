@@ -0,0 +1,19 @@
+# Generated by Django 4.2.30 on 2026-10-19 18:30
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0026_update_semester_labels_data'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='familyprofile',
+            name='data_version',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 4.2.30 on 2026-10-19 18:40
+
+from datetime import date
+
+from django.db import migrations
+
+BITMAP_BYTES = 46
+
+
+def backfill_bitmaps(apps, schema_editor):
+    """Build one attendance bitmap per student and academic year from existing SchoolDays."""
+    Student = apps.get_model('core', 'Student')
+    SchoolDay = apps.get_model('core', 'SchoolDay')
+    AttendanceBitmap = apps.get_model('core', 'AttendanceBitmap')
+
+    start_months = dict(Student.objects.values_list('id', 'academic_year_start_month'))
+
+    years = {}
+    for student_id, day in SchoolDay.objects.values_list('student_id', 'date').iterator(chunk_size=2000):
+        start_month = start_months[student_id] or 8
+        start_year = day.year if day.month >= start_month else day.year - 1
+        year_start = date(start_year, start_month, 1)
+        key = (student_id, year_start)
+        years[key] = years.get(key, 0) | (1 << (day - year_start).days)
+
+    AttendanceBitmap.objects.bulk_create([
+        AttendanceBitmap(student_id=student_id, year_start=year_start, bits=bits.to_bytes(BITMAP_BYTES, 'little'))
+        for (student_id, year_start), bits in years.items()
+    ], batch_size=500)
+
+
+def remove_bitmaps(apps, schema_editor):
+    AttendanceBitmap = apps.get_model('core', 'AttendanceBitmap')
+    AttendanceBitmap.objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0028_attendancebitmap'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_bitmaps, remove_bitmaps),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.30 on 2026-10-19 18:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0029_backfill_attendance_bitmaps'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='globalsubject',
+            name='name_key',
+            field=models.CharField(default='', editable=False, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='subject',
+            name='name_key',
+            field=models.CharField(default='', editable=False, max_length=100),
+        ),
+    ]
@@ -0,0 +1,76 @@
+# Generated by Django 4.2.30 on 2026-10-19 18:37
+
+from django.db import migrations
+from django.db.models import F
+
+
+def normalize(name):
+    return ' '.join((name or '').split()).casefold()
+
+
+def merge_subject(apps, duplicate, survivor):
+    """Moves a duplicate subject's days and grades onto the surviving subject."""
+    Grade = apps.get_model('core', 'Grade')
+    Through = apps.get_model('core', 'SchoolDay').subjects.through
+
+    existing_days = set(Through.objects.filter(subject_id=survivor.id).values_list('schoolday_id', flat=True))
+    moved = Through.objects.filter(subject_id=duplicate.id)
+    moved.exclude(schoolday_id__in=existing_days).update(subject_id=survivor.id)
+    moved.delete()
+
+    graded_terms = set(Grade.objects.filter(subject_id=survivor.id).values_list('term', flat=True))
+    grades = Grade.objects.filter(subject_id=duplicate.id)
+    grades.exclude(term__in=graded_terms).update(subject_id=survivor.id)
+    grades.delete()
+
+    duplicate.delete()
+
+
+def backfill_name_keys(apps, schema_editor):
+    """Fills name_key on every subject and merges rows that normalise to the same key."""
+    GlobalSubject = apps.get_model('core', 'GlobalSubject')
+    Subject = apps.get_model('core', 'Subject')
+
+    # Global subjects first: student subjects inherit the global name
+    global_keys = {}
+    for global_subject in GlobalSubject.objects.order_by('id'):
+        key = normalize(global_subject.name)
+        if key in global_keys:
+            Subject.objects.filter(global_subject_id=global_subject.id).update(global_subject_id=global_keys[key])
+            global_subject.delete()
+            continue
+        global_keys[key] = global_subject.id
+        global_subject.name_key = key
+        global_subject.save(update_fields=['name_key'])
+
+    global_names = dict(GlobalSubject.objects.values_list('id', 'name'))
+
+    # Linked subjects win over custom ones, then the oldest row
+    survivors = {}
+    duplicates = []
+    changed = []
+    subjects = Subject.objects.order_by(F('global_subject_id').asc(nulls_last=True), 'id')
+    for subject in subjects.iterator(chunk_size=2000):
+        name = global_names[subject.global_subject_id] if subject.global_subject_id else subject.name
+        subject.name_key = normalize(name)
+        key = (subject.student_id, subject.name_key)
+        if key in survivors:
+            duplicates.append((subject, survivors[key]))
+        else:
+            survivors[key] = subject
+            changed.append(subject)
+
+    Subject.objects.bulk_update(changed, ['name_key'], batch_size=500)
+    for duplicate, survivor in duplicates:
+        merge_subject(apps, duplicate, survivor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0030_subject_name_key'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_name_keys, migrations.RunPython.noop),
+    ]
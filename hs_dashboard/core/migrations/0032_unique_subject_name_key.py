@@ -0,0 +1,22 @@
+# Generated by Django 4.2.30 on 2026-10-19 18:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0031_backfill_subject_name_keys'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='globalsubject',
+            name='name_key',
+            field=models.CharField(editable=False, max_length=100, unique=True),
+        ),
+        migrations.AlterUniqueTogether(
+            name='subject',
+            unique_together={('student', 'name_key')},
+        ),
+    ]
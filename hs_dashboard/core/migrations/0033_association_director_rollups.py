@@ -0,0 +1,50 @@
+# Generated by Django 4.2.30 on 2026-10-19 18:41
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('core', '0032_unique_subject_name_key'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='association',
+            name='director',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='directed_associations', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.CreateModel(
+            name='StudentRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year_start', models.DateField()),
+                ('year_end', models.DateField()),
+                ('days_logged', models.PositiveIntegerField(default=0)),
+                ('last_logged', models.DateField(blank=True, null=True)),
+                ('subjects_logged', models.PositiveIntegerField(default=0)),
+                ('source_version', models.DateTimeField()),
+                ('refreshed_at', models.DateTimeField(auto_now=True)),
+                ('student', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='rollup', to='core.student')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SubjectCoverage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('subject_name', models.CharField(max_length=100)),
+                ('students', models.PositiveIntegerField(default=0)),
+                ('days', models.PositiveIntegerField(default=0)),
+                ('refreshed_at', models.DateTimeField(auto_now=True)),
+                ('association', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='subject_coverage', to='core.association')),
+            ],
+            options={
+                'ordering': ['-students', 'subject_name'],
+                'unique_together': {('association', 'subject_name')},
+            },
+        ),
+    ]
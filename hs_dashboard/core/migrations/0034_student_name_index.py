@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-19 18:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0033_association_director_rollups'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='student',
+            name='name',
+            field=models.CharField(db_index=True, max_length=100),
+        ),
+    ]
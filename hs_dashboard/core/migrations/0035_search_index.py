@@ -0,0 +1,60 @@
+# Generated by Django 4.2.30 on 2026-10-19 19:05
+
+from django.db import migrations
+
+CREATE_SQL = """
+    CREATE VIRTUAL TABLE IF NOT EXISTS core_search_index USING fts5(
+        title,
+        body,
+        student_id UNINDEXED,
+        user_id UNINDEXED,
+        tokenize = 'unicode61 remove_diacritics 2'
+    )
+"""
+
+# Same rows as core.services.search_service.rebuild_search_index
+BACKFILL_SQL = [
+    """
+    INSERT INTO core_search_index (rowid, title, body, student_id, user_id)
+    SELECT d.id * 2, COALESCE((
+               SELECT group_concat(COALESCE(g.name, s.name), ' ')
+               FROM core_schoolday_subjects ds
+               JOIN core_subject s ON s.id = ds.subject_id
+               LEFT JOIN core_globalsubject g ON g.id = s.global_subject_id
+               WHERE ds.schoolday_id = d.id
+           ), ''), COALESCE(d.notes, ''), d.student_id, st.user_id
+    FROM core_schoolday d
+    JOIN core_student st ON st.id = d.student_id
+    """,
+    """
+    INSERT INTO core_search_index (rowid, title, body, student_id, user_id)
+    SELECT w.id * 2 + 1, w.subject, w.file, w.student_id, st.user_id
+    FROM core_worksample w
+    JOIN core_student st ON st.id = w.student_id
+    """,
+]
+
+
+def create_search_index(apps, schema_editor):
+    """FTS5 is SQLite-only; other databases use the icontains fallback."""
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(CREATE_SQL)
+    for sql in BACKFILL_SQL:
+        schema_editor.execute(sql)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute("DROP TABLE IF EXISTS core_search_index")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0034_student_name_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
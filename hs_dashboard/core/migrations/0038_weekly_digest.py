@@ -0,0 +1,23 @@
+# Generated by Django 4.2.30 on 2026-10-19 19:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0037_change_feed'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='familyprofile',
+            name='last_digest_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='familyprofile',
+            name='weekly_digest',
+            field=models.BooleanField(default=True, help_text='Email a weekly digest of missing work samples and attendance pace'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.30 on 2026-10-19 19:41
+
+from django.db import migrations, models
+import django.db.models.functions.comparison
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0038_weekly_digest'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='student',
+            name='name',
+            field=models.CharField(max_length=100),
+        ),
+        migrations.AddIndex(
+            model_name='changeevent',
+            index=models.Index(fields=['object_id'], name='core_change_object__0db56d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(django.db.models.functions.comparison.Collate('name', 'NOCASE'), name='core_student_name_nocase'),
+        ),
+        migrations.AddIndex(
+            model_name='subject',
+            index=models.Index(django.db.models.functions.comparison.Collate('name_key', 'NOCASE'), name='core_subject_name_key_nocase'),
+        ),
+    ]
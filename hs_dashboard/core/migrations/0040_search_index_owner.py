@@ -0,0 +1,93 @@
+# Generated by Django 4.2.30 on 2026-10-19 20:12
+
+from django.db import migrations
+
+# FTS5 tables can't be altered, so the index is recreated with an indexed
+# `owner` token ("u<user id>") in place of the UNINDEXED user_id column
+CREATE_SQL = """
+    CREATE VIRTUAL TABLE core_search_index USING fts5(
+        title,
+        body,
+        owner,
+        student_id UNINDEXED,
+        tokenize = 'unicode61 remove_diacritics 2'
+    )
+"""
+
+OLD_CREATE_SQL = """
+    CREATE VIRTUAL TABLE core_search_index USING fts5(
+        title,
+        body,
+        student_id UNINDEXED,
+        user_id UNINDEXED,
+        tokenize = 'unicode61 remove_diacritics 2'
+    )
+"""
+
+_DAY_SUBJECTS_SQL = """
+    SELECT group_concat(COALESCE(g.name, s.name), ' ')
+    FROM core_schoolday_subjects ds
+    JOIN core_subject s ON s.id = ds.subject_id
+    LEFT JOIN core_globalsubject g ON g.id = s.global_subject_id
+    WHERE ds.schoolday_id = d.id
+"""
+
+# Same rows as core.services.search_service.rebuild_search_index
+BACKFILL_SQL = [
+    f"""
+    INSERT INTO core_search_index (rowid, title, body, owner, student_id)
+    SELECT d.id * 2, COALESCE(({_DAY_SUBJECTS_SQL}), ''), COALESCE(d.notes, ''), 'u' || st.user_id, d.student_id
+    FROM core_schoolday d
+    JOIN core_student st ON st.id = d.student_id
+    """,
+    """
+    INSERT INTO core_search_index (rowid, title, body, owner, student_id)
+    SELECT w.id * 2 + 1, w.subject, w.file, 'u' || st.user_id, w.student_id
+    FROM core_worksample w
+    JOIN core_student st ON st.id = w.student_id
+    """,
+]
+
+OLD_BACKFILL_SQL = [
+    f"""
+    INSERT INTO core_search_index (rowid, title, body, student_id, user_id)
+    SELECT d.id * 2, COALESCE(({_DAY_SUBJECTS_SQL}), ''), COALESCE(d.notes, ''), d.student_id, st.user_id
+    FROM core_schoolday d
+    JOIN core_student st ON st.id = d.student_id
+    """,
+    """
+    INSERT INTO core_search_index (rowid, title, body, student_id, user_id)
+    SELECT w.id * 2 + 1, w.subject, w.file, w.student_id, st.user_id
+    FROM core_worksample w
+    JOIN core_student st ON st.id = w.student_id
+    """,
+]
+
+
+def _recreate(schema_editor, create_sql, backfill_sql):
+    """FTS5 is SQLite-only; other databases use the icontains fallback."""
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute("DROP TABLE IF EXISTS core_search_index")
+    schema_editor.execute(create_sql)
+    for sql in backfill_sql:
+        schema_editor.execute(sql)
+
+
+def add_owner(apps, schema_editor):
+    _recreate(schema_editor, CREATE_SQL, BACKFILL_SQL)
+
+
+def remove_owner(apps, schema_editor):
+    _recreate(schema_editor, OLD_CREATE_SQL, OLD_BACKFILL_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0039_admin_search_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_owner, remove_owner),
+    ]
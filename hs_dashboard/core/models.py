@@ -1,4 +1,5 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models.functions import Collate
 from django.utils import timezone
 from django.contrib.auth.models import User
 from django.db.models.signals import post_save
@@ -10,6 +11,9 @@ class Association(models.Model):
     director_name = models.CharField(max_length=100)
     required_days = models.PositiveIntegerField(default=180)
     logo = models.ImageField(upload_to='association_logos/', blank=True, null=True)
+    director = models.ForeignKey(
+        User, on_delete=models.SET_NULL, null=True, blank=True, related_name='directed_associations'
+    )
 
     def __str__(self):
         return self.name
@@ -17,6 +21,13 @@ class Association(models.Model):
 class FamilyProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='profile')
     association = models.ForeignKey(Association, on_delete=models.SET_NULL, null=True, blank=True)
+    # Bumped whenever any of the family's rows change; drives ETag/Last-Modified
+    data_version = models.DateTimeField(default=timezone.now)
+    weekly_digest = models.BooleanField(
+        default=True, help_text="Email a weekly digest of missing work samples and attendance pace"
+    )
+    # Set as each digest batch is handed to the mail backend, so a retried run skips it
+    last_digest_at = models.DateTimeField(null=True, blank=True)
 
     def __str__(self):
         return self.user.username
@@ -64,6 +75,11 @@ class Student(models.Model):
     ]
     grading_system = models.CharField(max_length=20, choices=GRADING_SYSTEM_CHOICES, default='quarters')
 
+    class Meta:
+        # Admin prefix searches compile to a case-insensitive LIKE, which SQLite
+        # can only answer from a NOCASE index
+        indexes = [models.Index(Collate('name', 'NOCASE'), name='core_student_name_nocase')]
+
     def __str__(self):
         if self.grade_level == 'Other' and self.custom_grade_level:
             return f"{self.name} ({self.custom_grade_level})"
@@ -84,12 +100,26 @@ class Student(models.Model):
             return self.custom_grade_level
         return self.grade_level
 
+def normalize_subject_name(name):
+    """Lookup key for a subject name: whitespace collapsed and case-folded."""
+    return ' '.join((name or '').split()).casefold()
+
+
 class GlobalSubject(models.Model):
     """Standardized subjects shared across all students for consistent reporting."""
     name = models.CharField(max_length=100, unique=True)
+    name_key = models.CharField(max_length=100, unique=True, editable=False)
     
     def __str__(self):
         return self.name
+
+    def save(self, *args, **kwargs):
+        self.name_key = normalize_subject_name(self.name)
+        # Signals mark the linked families changed once the subjects below commit
+        with transaction.atomic(savepoint=False):
+            super().save(*args, **kwargs)
+            # Linked subjects are keyed by and display the global name
+            self.subject_set.update(name_key=self.name_key, updated_at=timezone.now())
     
     class Meta:
         ordering = ['name']
@@ -99,6 +129,8 @@ class Subject(models.Model):
     student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='subjects')
     global_subject = models.ForeignKey(GlobalSubject, on_delete=models.PROTECT, null=True, blank=True)
     name = models.CharField(max_length=100, blank=True, null=True)
+    name_key = models.CharField(max_length=100, default='', editable=False)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
     
     @property
     def display_name(self):
@@ -110,6 +142,14 @@ class Subject(models.Model):
     def __str__(self):
         return f"{self.display_name} ({self.student.name})"
 
+    def save(self, *args, **kwargs):
+        self.name_key = normalize_subject_name(self.display_name)
+        super().save(*args, **kwargs)
+
+    class Meta:
+        unique_together = ['student', 'name_key']
+        indexes = [models.Index(Collate('name_key', 'NOCASE'), name='core_subject_name_key_nocase')]
+
 class SchoolDay(models.Model):
     student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='school_days')
     date = models.DateField(default=timezone.now)
@@ -118,18 +158,42 @@ class SchoolDay(models.Model):
     subjects = models.ManyToManyField(Subject, blank=True, related_name='school_days')
     # subjects_completed removed
     created_at = models.DateTimeField(auto_now_add=True)
+    # Also bumped when the subjects change (see signals); drives sync deltas
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self):
         return f"{self.student.name} - {self.date}"
 
+    def save(self, *args, **kwargs):
+        # Signals keep the attendance bitmap in step; they must share the row's transaction
+        with transaction.atomic(savepoint=False):
+            super().save(*args, **kwargs)
+
     class Meta:
         unique_together = ['student', 'date']
 
+class AttendanceBitmap(models.Model):
+    """
+    Days attended in one academic year, one bit per day counted from `year_start`
+    (the first day of the student's academic start month). Kept in sync with
+    SchoolDay by signals; rebuild with `manage.py rebuild_attendance_bitmaps`.
+    """
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='attendance_bitmaps')
+    year_start = models.DateField()
+    bits = models.BinaryField(max_length=46, default=bytes(46))
+
+    def __str__(self):
+        return f"{self.student.name} - {self.year_start.year}"
+
+    class Meta:
+        unique_together = ['student', 'year_start']
+
 class WorkSample(models.Model):
     student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='work_samples')
     subject = models.CharField(max_length=100)
     date_uploaded = models.DateField(default=timezone.now)
     file = models.FileField(upload_to='samples/')
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
     
     def __str__(self):
         return f"{self.subject} - {self.student.name} ({self.date_uploaded})"
@@ -152,3 +216,100 @@ class Grade(models.Model):
 
     def __str__(self):
         return f"{self.student.name} - {self.subject.name} - {self.term}: {self.score}"
+
+
+class StudentRollup(models.Model):
+    """
+    Current academic-year progress for one student, read by the director dashboard.
+    Refreshed from the attendance bitmaps whenever the family's data_version moves
+    past `source_version` (see core.services.analytics).
+    """
+    student = models.OneToOneField(Student, on_delete=models.CASCADE, related_name='rollup')
+    year_start = models.DateField()
+    year_end = models.DateField()
+    days_logged = models.PositiveIntegerField(default=0)
+    last_logged = models.DateField(null=True, blank=True)
+    subjects_logged = models.PositiveIntegerField(default=0)
+    source_version = models.DateTimeField()
+    refreshed_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.student.name} - {self.year_start.year}"
+
+class SubjectCoverage(models.Model):
+    """Per-association subject totals for the current academic year."""
+    association = models.ForeignKey(Association, on_delete=models.CASCADE, related_name='subject_coverage')
+    subject_name = models.CharField(max_length=100)
+    students = models.PositiveIntegerField(default=0)
+    days = models.PositiveIntegerField(default=0)
+    refreshed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ['association', 'subject_name']
+        ordering = ['-students', 'subject_name']
+
+    def __str__(self):
+        return f"{self.association.name} - {self.subject_name}"
+
+
+class SyncReceipt(models.Model):
+    """
+    A day log applied through the sync API, recorded under the client's
+    idempotency key so a retried upload is acknowledged instead of re-applied.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='sync_receipts')
+    key = models.CharField(max_length=64)
+    school_day = models.ForeignKey(SchoolDay, on_delete=models.SET_NULL, null=True, blank=True)
+    status = models.CharField(max_length=10)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        unique_together = ['user', 'key']
+
+    def __str__(self):
+        return f"{self.user.username} - {self.key}"
+
+
+class SyncTombstone(models.Model):
+    """Records a deleted synced row so devices can drop it on their next delta."""
+    MODEL_CHOICES = [
+        ('day', 'School day'),
+        ('subject', 'Subject'),
+        ('work_sample', 'Work sample'),
+    ]
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='sync_tombstones')
+    model = models.CharField(max_length=20, choices=MODEL_CHOICES)
+    object_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['user', 'deleted_at'])]
+
+    def __str__(self):
+        return f"{self.model} {self.object_id} ({self.deleted_at})"
+
+
+class ChangeEvent(models.Model):
+    """
+    Append-only feed of inserts, updates and deletes on the core models, read
+    in id order through core.services.change_feed. Ids are plain columns so
+    events outlive the rows (and families) they describe.
+    """
+    ACTION_CHOICES = [
+        ('insert', 'Insert'),
+        ('update', 'Update'),
+        ('delete', 'Delete'),
+    ]
+    model = models.CharField(max_length=20)
+    object_id = models.BigIntegerField()
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES)
+    # Owning family, or null for shared rows (associations)
+    user_id = models.IntegerField(null=True, blank=True)
+    student_id = models.BigIntegerField(null=True, blank=True)
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['user_id', 'id']), models.Index(fields=['object_id'])]
+
+    def __str__(self):
+        return f"#{self.id} {self.action} {self.model} {self.object_id}"
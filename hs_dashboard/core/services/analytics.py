@@ -0,0 +1,231 @@
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, F, Max, Q
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from core.models import Association, SchoolDay, Student, StudentRollup, SubjectCoverage
+from core.services.attendance_bitmap import days_between, load_years, year_start_for
+from core.services.export_service import get_academic_year_range
+
+# A student is at risk when behind this share of the expected pace...
+AT_RISK_PACE = 0.9
+# ...or when nothing has been logged for this many days
+AT_RISK_IDLE_DAYS = 14
+
+
+def association_students(association):
+    return Student.objects.filter(user__profile__association=association)
+
+
+def stale_students(students, today=None):
+    """
+    Students whose rollup is missing, belongs to a previous academic year, or is
+    older than their family's data_version.
+    """
+    today = today or timezone.localdate()
+    # A rollup whose year began a year or more ago belongs to a finished year
+    try:
+        year_ago = today.replace(year=today.year - 1)
+    except ValueError:  # Feb 29
+        year_ago = today.replace(year=today.year - 1, day=28)
+    return students.filter(
+        Q(rollup__isnull=True)
+        | Q(rollup__year_start__lte=year_ago)
+        | Q(rollup__source_version__lt=F('user__profile__data_version'))
+    )
+
+
+def refresh_student_rollups(students, today=None):
+    """
+    Recomputes rollups for the given students.
+
+    Day counts come from the attendance bitmaps; last-logged dates and subject
+    counts are one grouped query each, limited to these students.
+
+    Returns:
+        int: Number of rollups written.
+    """
+    today = today or timezone.localdate()
+    students = list(students.values(
+        'id', 'academic_year_start_month', 'academic_year_end_month', 'user__profile__data_version'
+    ))
+    if not students:
+        return 0
+
+    ranges = {}
+    for row in students:
+        start_month = row['academic_year_start_month'] or 8
+        end_month = row['academic_year_end_month'] or 7
+        year_start = year_start_for(start_month, today)
+        ranges[row['id']] = get_academic_year_range(start_month, end_month, year_start.year)
+
+    student_ids = list(ranges)
+    earliest = min(start for start, _ in ranges.values())
+    years = load_years(student_ids)
+
+    last_logged = dict(
+        SchoolDay.objects.filter(student_id__in=student_ids, date__lte=today)
+        .values('student_id').annotate(last=Max('date')).values_list('student_id', 'last')
+    )
+
+    subjects = {}
+    subject_rows = SchoolDay.subjects.through.objects.filter(
+        schoolday__student_id__in=student_ids, schoolday__date__gte=earliest
+    ).values_list('schoolday__student_id', 'schoolday__date', 'subject_id').distinct()
+    for student_id, day, subject_id in subject_rows.iterator(chunk_size=2000):
+        start, end = ranges[student_id]
+        if start <= day <= end:
+            subjects.setdefault(student_id, set()).add(subject_id)
+
+    now = timezone.now()
+    rollups = []
+    for row in students:
+        start, end = ranges[row['id']]
+        rollups.append(StudentRollup(
+            student_id=row['id'],
+            year_start=start,
+            year_end=end,
+            days_logged=days_between(years[row['id']], start, end),
+            last_logged=last_logged.get(row['id']),
+            subjects_logged=len(subjects.get(row['id'], ())),
+            source_version=row['user__profile__data_version'] or now,
+            refreshed_at=now,
+        ))
+
+    StudentRollup.objects.bulk_create(
+        rollups,
+        update_conflicts=True,
+        unique_fields=['student'],
+        update_fields=['year_start', 'year_end', 'days_logged', 'last_logged',
+                       'subjects_logged', 'source_version', 'refreshed_at'],
+    )
+    return len(rollups)
+
+
+def refresh_subject_coverage(association):
+    """Rebuilds the association's subject totals with one grouped query over its current years."""
+    rows = SchoolDay.subjects.through.objects.filter(
+        schoolday__student__user__profile__association=association,
+        schoolday__date__gte=F('schoolday__student__rollup__year_start'),
+        schoolday__date__lte=F('schoolday__student__rollup__year_end'),
+    ).annotate(
+        subject_name=Coalesce('subject__global_subject__name', 'subject__name')
+    ).values('subject_name').annotate(
+        students=Count('schoolday__student_id', distinct=True),
+        days=Count('id'),
+    )
+
+    with transaction.atomic():
+        SubjectCoverage.objects.filter(association=association).delete()
+        SubjectCoverage.objects.bulk_create([
+            SubjectCoverage(association=association, subject_name=row['subject_name'],
+                            students=row['students'], days=row['days'])
+            for row in rows if row['subject_name']
+        ])
+
+
+def refresh_association(association, force=False):
+    """
+    Brings an association's rollups up to date.
+
+    Only students whose data changed since their last refresh are recomputed;
+    subject coverage is rebuilt when any of them were (or when `force` is set).
+
+    Returns:
+        int: Number of student rollups refreshed.
+    """
+    students = association_students(association)
+    if not force:
+        students = stale_students(students)
+    refreshed = refresh_student_rollups(students)
+    if refreshed or force:
+        refresh_subject_coverage(association)
+    return refreshed
+
+
+def refresh_all_associations(force=False):
+    """
+    Periodic refresh of every association. Subject coverage is always rebuilt
+    here so families that left an association drop out of its totals.
+
+    Returns:
+        dict: {association_id: rollups refreshed}
+    """
+    refreshed = {}
+    for association in Association.objects.all():
+        refreshed[association.id] = refresh_association(association, force=force)
+        if not refreshed[association.id]:
+            refresh_subject_coverage(association)
+    return refreshed
+
+
+def is_behind_pace(days_logged, last_logged, year_start, year_end, required_days, today):
+    """
+    Whether a student in the middle of their academic year is falling behind:
+    nothing logged recently, or fewer days than the pace to `required_days`.
+    """
+    if today < year_start or today > year_end:
+        return False
+    if last_logged is None or today - last_logged > timedelta(days=AT_RISK_IDLE_DAYS):
+        return True
+    elapsed = (today - year_start).days + 1
+    length = (year_end - year_start).days + 1
+    expected = required_days * elapsed / length
+    return days_logged < expected * AT_RISK_PACE
+
+
+def _is_at_risk(rollup, required_days, today):
+    return is_behind_pace(
+        rollup.days_logged, rollup.last_logged, rollup.year_start, rollup.year_end, required_days, today
+    )
+
+
+def association_overview(association, today=None):
+    """
+    Director dashboard data, read from the rollup tables only.
+
+    Returns:
+        dict: 'families' (per-family rows with their students), 'at_risk' students,
+        'coverage' (SubjectCoverage rows) and association-wide 'totals'.
+    """
+    today = today or timezone.localdate()
+    required_days = association.required_days
+    rollups = StudentRollup.objects.filter(
+        student__user__profile__association=association
+    ).select_related('student', 'student__user').order_by('student__user__username', 'student__name')
+
+    families = {}
+    at_risk = []
+    for rollup in rollups:
+        student = rollup.student
+        progress = {
+            'student': student,
+            'rollup': rollup,
+            'percentage': min(100, int(rollup.days_logged * 100 / required_days)) if required_days else 100,
+            'days_remaining': max(0, required_days - rollup.days_logged),
+            'at_risk': _is_at_risk(rollup, required_days, today),
+        }
+        if progress['at_risk']:
+            at_risk.append(progress)
+
+        family = families.setdefault(student.user_id, {'user': student.user, 'students': [], 'days_logged': 0})
+        family['students'].append(progress)
+        family['days_logged'] += rollup.days_logged
+
+    for family in families.values():
+        family['complete'] = all(p['days_remaining'] == 0 for p in family['students'])
+
+    student_count = sum(len(family['students']) for family in families.values())
+    return {
+        'families': list(families.values()),
+        'at_risk': at_risk,
+        'coverage': list(association.subject_coverage.all()),
+        'totals': {
+            'families': len(families),
+            'students': student_count,
+            'at_risk': len(at_risk),
+            'complete': sum(1 for family in families.values() for p in family['students'] if p['days_remaining'] == 0),
+        },
+    }
@@ -0,0 +1,180 @@
+import calendar
+from datetime import date, timedelta
+
+from django.db import transaction
+
+from core.models import AttendanceBitmap, SchoolDay, Student
+
+# 366 days fit in 46 bytes
+BITMAP_BYTES = 46
+
+
+def year_start_for(start_month, day):
+    """Returns the first day of the academic year (starting in `start_month`) containing `day`."""
+    start_month = start_month or 8
+    start_year = day.year if day.month >= start_month else day.year - 1
+    return date(start_year, start_month, 1)
+
+
+def _popcount(value):
+    return bin(value).count('1')
+
+
+class AttendanceYear:
+    """One academic year of attendance as an integer bitset (bit n = year_start + n days)."""
+
+    __slots__ = ('year_start', 'bits')
+
+    def __init__(self, year_start, bits=0):
+        self.year_start = year_start
+        self.bits = bits
+
+    @classmethod
+    def from_row(cls, row):
+        return cls(row.year_start, int.from_bytes(bytes(row.bits), 'little'))
+
+    def to_bytes(self):
+        return self.bits.to_bytes(BITMAP_BYTES, 'little')
+
+    def _index(self, day):
+        return (day - self.year_start).days
+
+    def __contains__(self, day):
+        index = self._index(day)
+        return 0 <= index < BITMAP_BYTES * 8 and bool(self.bits >> index & 1)
+
+    def set(self, day, attended=True):
+        bit = 1 << self._index(day)
+        self.bits = self.bits | bit if attended else self.bits & ~bit
+
+    def count(self):
+        return _popcount(self.bits)
+
+    def count_between(self, start, end):
+        """Days attended from `start` to `end` inclusive."""
+        first = max(self._index(start), 0)
+        last = min(self._index(end), BITMAP_BYTES * 8 - 1)
+        if last < first:
+            return 0
+        mask = (1 << (last - first + 1)) - 1
+        return _popcount(self.bits >> first & mask)
+
+    def dates(self):
+        bits = self.bits
+        index = 0
+        while bits:
+            if bits & 1:
+                yield self.year_start + timedelta(days=index)
+            bits >>= 1
+            index += 1
+
+
+def _as_date(value):
+    # Views assign the raw POSTed string to SchoolDay.date; parse it the way the
+    # field does, which also accepts unpadded dates like "2025-9-5"
+    return SchoolDay._meta.get_field('date').to_python(value)
+
+
+def mark_day(student_id, start_month, day, attended):
+    """
+    Sets or clears one day's bit.
+
+    Joins the caller's transaction (SchoolDay.save and deletes open one), so
+    the bit commits or rolls back with the row. select_for_update locks the
+    year's row where supported; on SQLite the IMMEDIATE transaction already
+    holds the write lock.
+    """
+    day = _as_date(day)
+    year_start = year_start_for(start_month, day)
+    with transaction.atomic(savepoint=False):
+        rows = AttendanceBitmap.objects.select_for_update()
+        if attended:
+            row, _ = rows.get_or_create(student_id=student_id, year_start=year_start)
+        else:
+            row = rows.filter(student_id=student_id, year_start=year_start).first()
+            if row is None:
+                return
+        year = AttendanceYear.from_row(row)
+        year.set(day, attended)
+        row.bits = year.to_bytes()
+        row.save(update_fields=['bits'])
+
+
+def rebuild_bitmaps(students=None):
+    """
+    Recomputes bitmaps from SchoolDay rows in one ordered pass.
+
+    Args:
+        students (QuerySet): Students to rebuild; defaults to every student.
+
+    Returns:
+        int: Number of bitmap rows written.
+    """
+    if students is None:
+        students = Student.objects.all()
+    start_months = dict(students.values_list('id', 'academic_year_start_month'))
+
+    years = {}
+    days = SchoolDay.objects.filter(student_id__in=start_months).values_list('student_id', 'date')
+    for student_id, day in days.iterator(chunk_size=2000):
+        year_start = year_start_for(start_months[student_id], day)
+        key = (student_id, year_start)
+        if key not in years:
+            years[key] = AttendanceYear(year_start)
+        years[key].set(day)
+
+    with transaction.atomic():
+        AttendanceBitmap.objects.filter(student_id__in=start_months).delete()
+        AttendanceBitmap.objects.bulk_create([
+            AttendanceBitmap(student_id=student_id, year_start=year_start, bits=year.to_bytes())
+            for (student_id, year_start), year in years.items()
+        ], batch_size=500)
+    return len(years)
+
+
+def load_years(student_ids, year_starts=None):
+    """Returns {student_id: [AttendanceYear, ...]} for the given students."""
+    rows = AttendanceBitmap.objects.filter(student_id__in=student_ids)
+    if year_starts is not None:
+        rows = rows.filter(year_start__in=year_starts)
+
+    result = {student_id: [] for student_id in student_ids}
+    for row in rows:
+        result[row.student_id].append(AttendanceYear.from_row(row))
+    return result
+
+
+def total_days(years):
+    """Total days attended across a student's AttendanceYears."""
+    return sum(year.count() for year in years)
+
+
+def days_between(years, start, end):
+    """Days attended in [start, end] across a student's AttendanceYears."""
+    return sum(year.count_between(start, end) for year in years)
+
+
+def month_bits(years, year, month):
+    """
+    Attendance for one calendar month as an int (bit d-1 set = day d attended),
+    merged across the given AttendanceYears.
+    """
+    _, last_day = calendar.monthrange(year, month)
+    first = date(year, month, 1)
+    merged = 0
+    for y in years:
+        offset = (first - y.year_start).days
+        if 0 <= offset < BITMAP_BYTES * 8:
+            merged |= y.bits >> offset & ((1 << last_day) - 1)
+    return merged
+
+
+def attended_dates_in_month(years, year, month):
+    """Set of attended dates within one calendar month."""
+    bits = month_bits(years, year, month)
+    return {date(year, month, day) for day in range(1, 32) if bits >> (day - 1) & 1}
+
+
+def student_years(student):
+    """All AttendanceYears for one student."""
+    return load_years([student.id])[student.id]
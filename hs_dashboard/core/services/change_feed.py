@@ -0,0 +1,112 @@
+from datetime import timedelta
+
+from django.utils import timezone
+
+from core.batching import TransactionBatch
+from core.models import ChangeEvent, Student
+
+FEED_PAGE_SIZE = 500
+FEED_RETENTION = timedelta(days=90)
+
+
+class _EventBatch(TransactionBatch):
+    """Change events already written in the current transaction, one per object."""
+
+    def __init__(self):
+        # {(model, object_id): ChangeEvent}
+        self.events = {}
+        # Owners of students seen in this transaction, which may be deleted by the end of it
+        self.student_users = {}
+
+    def user_for(self, student_id):
+        if student_id not in self.student_users:
+            self.student_users[student_id] = _student_user(student_id)
+        return self.student_users[student_id]
+
+
+def _student_user(student_id):
+    return Student.objects.filter(id=student_id).values_list('user_id', flat=True).first()
+
+
+def record_change(model, object_id, action, student_id=None, user_id=None):
+    """
+    Appends a change event.
+
+    The event is written straight away, in the caller's transaction, so it
+    commits or rolls back with the change it describes. Inside a transaction
+    (every write view runs in one) each object keeps one event: an insert
+    followed by updates stays an insert, a later delete wins, and an object
+    created and deleted in one transaction leaves no event. The owning family
+    is looked up from `student_id` when `user_id` isn't given.
+    """
+    batch = _EventBatch.current()
+    if batch is None:
+        if user_id is None and student_id is not None:
+            user_id = _student_user(student_id)
+        ChangeEvent.objects.create(
+            model=model, object_id=object_id, action=action, student_id=student_id, user_id=user_id,
+        )
+        return
+
+    if model == 'student' and user_id is not None:
+        batch.student_users[object_id] = user_id
+    if user_id is None and student_id is not None:
+        user_id = batch.user_for(student_id)
+    event = ChangeEvent(model=model, object_id=object_id, action=action, student_id=student_id, user_id=user_id)
+
+    previous = batch.events.get((model, object_id))
+    # The earlier event may have been rolled back with a savepoint
+    if previous is None or not ChangeEvent.objects.filter(id=previous.id).exists():
+        event.save()
+        batch.events[model, object_id] = event
+    elif action == 'delete' and previous.action == 'insert':
+        # Created and deleted before anyone could see it
+        ChangeEvent.objects.filter(id=previous.id).delete()
+        del batch.events[model, object_id]
+    elif action == 'delete' and previous.action != 'delete':
+        ChangeEvent.objects.filter(id=previous.id).update(action='delete')
+        previous.action = 'delete'
+    # Anything else repeats the earlier event, which stays as it is
+
+
+def latest_cursor():
+    """The cursor of the newest event; readers starting now pass this."""
+    return ChangeEvent.objects.order_by('-id').values_list('id', flat=True).first() or 0
+
+
+def read_changes(cursor=0, limit=FEED_PAGE_SIZE, models=None, user_id=None):
+    """
+    Reads events after `cursor` in the order they were written.
+
+    Args:
+        cursor (int): Last event id already processed (0 for the start).
+        limit (int): Maximum events to return.
+        models (iterable): Only these model names (e.g. {'schoolday'}).
+        user_id (int): Only one family's events.
+
+    Returns:
+        tuple: (events, next_cursor). Pass next_cursor back on the next call;
+        it equals `cursor` when nothing new has arrived.
+    """
+    events = ChangeEvent.objects.filter(id__gt=cursor).order_by('id')
+    if models is not None:
+        events = events.filter(model__in=list(models))
+    if user_id is not None:
+        events = events.filter(user_id=user_id)
+    events = list(events[:limit])
+    return events, (events[-1].id if events else cursor)
+
+
+def iter_changes(cursor=0, **filters):
+    """Yields every event after `cursor`, a page at a time."""
+    while True:
+        events, cursor = read_changes(cursor, **filters)
+        yield from events
+        if len(events) < filters.get('limit', FEED_PAGE_SIZE):
+            return
+
+
+def prune_change_events():
+    """Drops events past the retention period. Returns the number deleted."""
+    deleted, _ = ChangeEvent.objects.filter(created_at__lt=timezone.now() - FEED_RETENTION).delete()
+    return deleted
@@ -0,0 +1,168 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.sites.models import Site
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db.models import Max
+from django.db.models.functions import Coalesce
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.utils import timezone
+
+from core.models import FamilyProfile, SchoolDay, Student, Subject, WorkSample
+from core.services.analytics import is_behind_pace
+from core.services.attendance_bitmap import days_between, load_years, year_start_for
+from core.services.export_service import get_academic_year_range
+from core.utils import get_required_subjects
+
+# Families whose digests are computed together (a handful of queries per chunk)
+DIGEST_CHUNK_SIZE = 200
+# Messages handed to the mail backend per send_messages() call
+DIGEST_BATCH_SIZE = 50
+# A family is due again this long after its last digest; a retried run skips it
+DIGEST_INTERVAL = timedelta(days=6)
+# Same window as the dashboard's sample check
+SAMPLE_WINDOW = timedelta(days=42)
+
+
+def _due_families(now):
+    return User.objects.filter(
+        profile__weekly_digest=True, is_active=True,
+    ).exclude(email='').exclude(profile__last_digest_at__gt=now - DIGEST_INTERVAL)
+
+
+def family_digests(user_ids, today=None):
+    """
+    Computes digest data for a chunk of families with set-based queries.
+
+    Each student gets the subjects without a work sample in the last six weeks
+    (the dashboard's rule: assigned subjects, or the grade's defaults) and
+    current-year days against the association's requirement.
+
+    Returns:
+        dict: {user_id: [student digest dict, ...]}
+    """
+    today = today or timezone.localdate()
+    students = list(Student.objects.filter(user_id__in=user_ids).order_by('name', 'id').values(
+        'id', 'user_id', 'name', 'grade_level', 'academic_year_start_month', 'academic_year_end_month',
+        'user__profile__association__required_days',
+    ))
+    student_ids = [row['id'] for row in students]
+    attendance = load_years(student_ids)
+
+    assigned = {}
+    subject_names = Subject.objects.filter(student_id__in=student_ids).annotate(
+        display=Coalesce('global_subject__name', 'name')
+    ).values_list('student_id', 'display')
+    for student_id, name in subject_names:
+        if name:
+            assigned.setdefault(student_id, set()).add(name)
+
+    sampled = set(WorkSample.objects.filter(
+        student_id__in=student_ids, date_uploaded__gte=today - SAMPLE_WINDOW
+    ).values_list('student_id', 'subject').distinct())
+
+    last_logged = dict(
+        SchoolDay.objects.filter(student_id__in=student_ids, date__lte=today)
+        .values('student_id').annotate(last=Max('date')).values_list('student_id', 'last')
+    )
+
+    digests = {}
+    for row in students:
+        start_month = row['academic_year_start_month'] or 8
+        end_month = row['academic_year_end_month'] or 7
+        start, end = get_academic_year_range(start_month, end_month, year_start_for(start_month, today).year)
+        required_days = row['user__profile__association__required_days'] or 180
+        days_logged = days_between(attendance[row['id']], start, end)
+        subjects = sorted(assigned.get(row['id']) or get_required_subjects(row['grade_level']))
+
+        digests.setdefault(row['user_id'], []).append({
+            'name': row['name'],
+            'days_logged': days_logged,
+            'required_days': required_days,
+            'days_remaining': max(0, required_days - days_logged),
+            'last_logged': last_logged.get(row['id']),
+            'behind': is_behind_pace(days_logged, last_logged.get(row['id']), start, end, required_days, today),
+            'missing_samples': [name for name in subjects if (row['id'], name) not in sampled],
+        })
+    return digests
+
+
+def build_digest_message(user, students, dashboard_url):
+    """The digest email for one family, or None when there is nothing to report."""
+    if not any(student['behind'] or student['missing_samples'] for student in students):
+        return None
+    context = {'user': user, 'students': students, 'dashboard_url': dashboard_url}
+    message = EmailMultiAlternatives(
+        subject=render_to_string('core/email/weekly_digest_subject.txt', context).strip(),
+        body=render_to_string('core/email/weekly_digest.txt', context),
+        to=[user.email],
+    )
+    message.attach_alternative(render_to_string('core/email/weekly_digest.html', context), 'text/html')
+    return message
+
+
+class _RateLimiter:
+    """Spaces out sends to at most `per_second` messages a second (0 = unlimited)."""
+
+    def __init__(self, per_second):
+        self.interval = 1 / per_second if per_second else 0
+        self.next_at = time.monotonic()
+
+    def wait(self, count):
+        now = time.monotonic()
+        if self.next_at > now:
+            time.sleep(self.next_at - now)
+        self.next_at = max(now, self.next_at) + count * self.interval
+
+
+def send_weekly_digests(today=None):
+    """
+    Sends the weekly digest to every family that is due.
+
+    Families are processed DIGEST_CHUNK_SIZE at a time in id order, and their
+    messages go out in batches over one backend connection, paced by
+    settings.DIGEST_EMAILS_PER_SECOND. Each family's last_digest_at is stamped
+    as its batch is sent, so a run that dies part-way can simply be retried.
+
+    Returns:
+        dict: Counts of 'families' considered, digests 'sent' and 'skipped'
+        (nothing to report).
+    """
+    now = timezone.now()
+    dashboard_url = f"https://{Site.objects.get_current().domain}{reverse('dashboard')}"
+    limiter = _RateLimiter(settings.DIGEST_EMAILS_PER_SECOND)
+    totals = {'families': 0, 'sent': 0, 'skipped': 0}
+    connection = get_connection()
+
+    def flush(batch):
+        limiter.wait(len(batch))
+        sent = connection.send_messages([message for _, message in batch]) or 0
+        FamilyProfile.objects.filter(user_id__in=[user_id for user_id, _ in batch]).update(last_digest_at=now)
+        totals['sent'] += sent
+
+    last_id = 0
+    with connection:
+        while True:
+            users = list(_due_families(now).filter(id__gt=last_id).order_by('id')[:DIGEST_CHUNK_SIZE])
+            if not users:
+                break
+            last_id = users[-1].id
+            totals['families'] += len(users)
+
+            digests = family_digests([user.id for user in users], today)
+            batch = []
+            for user in users:
+                message = build_digest_message(user, digests.get(user.id, []), dashboard_url)
+                if message is None:
+                    totals['skipped'] += 1
+                    continue
+                batch.append((user.id, message))
+                if len(batch) == DIGEST_BATCH_SIZE:
+                    flush(batch)
+                    batch = []
+            if batch:
+                flush(batch)
+    return totals
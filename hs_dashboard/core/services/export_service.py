@@ -0,0 +1,185 @@
+import calendar
+import csv
+import json
+from datetime import date
+
+from django.db.models import Q
+from django.db.models.functions import Coalesce
+
+from core.models import SchoolDay, WorkSample, Grade
+
+# Rows pulled from the database per round trip while streaming.
+EXPORT_CHUNK_SIZE = 2000
+# Students whose rows are fetched together; a chunk's rows are held until it is written.
+EXPORT_STUDENT_CHUNK_SIZE = 100
+
+EXPORT_COLUMNS = {
+    'school_days': ['student_id', 'student', 'date', 'subjects', 'notes'],
+    'work_samples': ['student_id', 'student', 'date_uploaded', 'subject', 'file'],
+    'grades': ['student_id', 'student', 'subject', 'term', 'score'],
+}
+
+EXPORT_FORMATS = ('csv', 'ndjson')
+
+
+def get_academic_year_range(start_month, end_month, start_year):
+    """
+    Returns the (start_date, end_date) of the academic year beginning in `start_year`.
+
+    Years that wrap the calendar (e.g. August -> July) end in the following year.
+    """
+    end_year = start_year + 1 if start_month > end_month else start_year
+    _, last_day = calendar.monthrange(end_year, end_month)
+    return date(start_year, start_month, 1), date(end_year, end_month, last_day)
+
+
+def _student_ranges(students, academic_year):
+    """
+    Yields (student_id, name, date_range) for every student.
+
+    Only scalar columns are loaded so even an association-wide export keeps a
+    small footprint. `date_range` is None when no academic year was requested.
+    """
+    rows = students.order_by('name', 'id').values_list(
+        'id', 'name', 'academic_year_start_month', 'academic_year_end_month'
+    )
+    for student_id, name, start_month, end_month in rows.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        date_range = None
+        if academic_year:
+            date_range = get_academic_year_range(start_month or 8, end_month or 7, academic_year)
+        yield student_id, name, date_range
+
+
+def _chunked(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _in_ranges(students, field):
+    """
+    Matches the rows of `students` (student_id, name, date_range) whose `field`
+    falls in that student's own academic year. Students are grouped by range,
+    and start months vary little, so the filter stays short.
+    """
+    by_range = {}
+    for student_id, _, date_range in students:
+        by_range.setdefault(date_range, []).append(student_id)
+    query = Q()
+    for date_range, student_ids in by_range.items():
+        condition = Q(student_id__in=student_ids)
+        if date_range:
+            condition &= Q(**{f'{field}__range': date_range})
+        query |= condition
+    return query
+
+
+def _rows_by_student(rows):
+    """Groups (student_id, *values) rows into {student_id: [values]}, keeping their order."""
+    grouped = {}
+    for student_id, *values in rows.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        grouped.setdefault(student_id, []).append(values)
+    return grouped
+
+
+def _school_day_rows(students):
+    days = _rows_by_student(
+        SchoolDay.objects.filter(_in_ranges(students, 'date')).order_by('date').values_list(
+            'student_id', 'id', 'date', 'notes'
+        )
+    )
+
+    # One subject query per chunk of days instead of one per day
+    through = SchoolDay.subjects.through
+    subjects_by_day = {}
+    day_ids = [day_id for student_days in days.values() for day_id, _, _ in student_days]
+    for chunk in _chunked(day_ids, EXPORT_CHUNK_SIZE):
+        links = through.objects.filter(schoolday_id__in=chunk).annotate(
+            subject_name=Coalesce('subject__global_subject__name', 'subject__name')
+        ).values_list('schoolday_id', 'subject_name')
+        for day_id, subject_name in links:
+            subjects_by_day.setdefault(day_id, []).append(subject_name or '')
+
+    for student_id, name, _ in students:
+        for day_id, day_date, notes in days.get(student_id, ()):
+            yield [
+                student_id,
+                name,
+                day_date.isoformat(),
+                '; '.join(sorted(subjects_by_day.get(day_id, []))),
+                notes or '',
+            ]
+
+
+def _work_sample_rows(students):
+    samples = _rows_by_student(
+        WorkSample.objects.filter(_in_ranges(students, 'date_uploaded')).order_by(
+            'date_uploaded', 'id'
+        ).values_list('student_id', 'date_uploaded', 'subject', 'file')
+    )
+    for student_id, name, _ in students:
+        for uploaded, subject, file_name in samples.get(student_id, ()):
+            yield [student_id, name, uploaded.isoformat(), subject, file_name]
+
+
+def _grade_rows(students):
+    # Grades are stored per term rather than per date, so the academic year
+    # filter does not narrow them down.
+    grades = _rows_by_student(
+        Grade.objects.filter(student_id__in=[student_id for student_id, _, _ in students]).annotate(
+            subject_name=Coalesce('subject__global_subject__name', 'subject__name')
+        ).order_by('subject_name', 'term').values_list('student_id', 'subject_name', 'term', 'score')
+    )
+    for student_id, name, _ in students:
+        for subject_name, term, score in grades.get(student_id, ()):
+            yield [student_id, name, subject_name or '', term, score]
+
+
+ROW_BUILDERS = {
+    'school_days': _school_day_rows,
+    'work_samples': _work_sample_rows,
+    'grades': _grade_rows,
+}
+
+
+def iter_export_rows(dataset, students, academic_year=None):
+    """
+    Lazily yields export rows (lists matching EXPORT_COLUMNS[dataset]).
+
+    Rows are fetched for EXPORT_STUDENT_CHUNK_SIZE students at a time, so an
+    association-wide export costs a few queries per chunk rather than per
+    student.
+
+    Args:
+        dataset (str): One of EXPORT_COLUMNS' keys.
+        students (QuerySet): Students to export, already scoped to the caller.
+        academic_year (int): Optional academic start year to filter by.
+    """
+    build_rows = ROW_BUILDERS[dataset]
+    for chunk in _chunked(_student_ranges(students, academic_year), EXPORT_STUDENT_CHUNK_SIZE):
+        yield from build_rows(chunk)
+
+
+class _Echo:
+    """File-like object whose write() hands the value straight back to csv.writer."""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(dataset, rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(EXPORT_COLUMNS[dataset])
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def stream_ndjson(dataset, rows):
+    columns = EXPORT_COLUMNS[dataset]
+    for row in rows:
+        yield json.dumps(dict(zip(columns, row))) + '\n'
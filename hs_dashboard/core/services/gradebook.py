@@ -0,0 +1,164 @@
+from django.core.cache import cache
+from django.db import transaction
+
+from core.models import Grade, Student, Subject
+
+GRADEBOOK_TIMEOUT = 60 * 60 * 24
+
+TERMS = {
+    'quarters': ['Q1', 'Q2', 'Q3', 'Q4'],
+    'semesters': ['Fall', 'Spring'],
+}
+# Column order for the family matrix
+TERM_ORDER = [term for term, _ in Grade._meta.get_field('term').choices]
+SCORE_MAX_LENGTH = Grade._meta.get_field('score').max_length
+
+
+def terms_for(grading_system):
+    return TERMS.get(grading_system, TERMS['quarters'])
+
+
+def build_family_gradebook(user_id):
+    """
+    Pivots every student x subject x term of a family into one matrix.
+
+    Students, their subjects and the subjects' grades come back from a single
+    LEFT JOIN, so subjects without grades (and students without subjects)
+    still get their rows.
+
+    Returns:
+        dict: 'terms' (the matrix columns) and 'students', each with 'id',
+        'name', 'terms' and 'rows' of {'subject_id', 'subject', 'cells'};
+        a cell is {'term', 'score', 'editable'}.
+    """
+    rows = Student.objects.filter(user_id=user_id).order_by(
+        'name', 'id', 'subjects__name', 'subjects__global_subject__name', 'subjects__id'
+    ).values_list(
+        'id', 'name', 'grading_system',
+        'subjects__id', 'subjects__name', 'subjects__global_subject__name',
+        'subjects__grades__term', 'subjects__grades__score',
+    )
+
+    students = {}
+    scores = {}
+    used_terms = set()
+    for student_id, name, grading_system, subject_id, subject_name, global_name, term, score in rows:
+        student = students.get(student_id)
+        if student is None:
+            student = students[student_id] = {
+                'id': student_id, 'name': name, 'terms': terms_for(grading_system), 'subjects': {},
+            }
+            used_terms.update(student['terms'])
+        if subject_id is not None:
+            student['subjects'].setdefault(subject_id, global_name or subject_name)
+        if term is not None:
+            # Grades from before a switch of grading system keep their column
+            scores[subject_id, term] = score
+            used_terms.add(term)
+
+    columns = [term for term in TERM_ORDER if term in used_terms]
+    for student in students.values():
+        student['rows'] = [
+            {
+                'subject_id': subject_id,
+                'subject': subject,
+                'cells': [
+                    {
+                        'term': term,
+                        'score': scores.get((subject_id, term), ''),
+                        'editable': term in student['terms'] or (subject_id, term) in scores,
+                    }
+                    for term in columns
+                ],
+            }
+            for subject_id, subject in student.pop('subjects').items()
+        ]
+    return {'terms': columns, 'students': list(students.values())}
+
+
+def overlay_scores(gradebook, scores):
+    """
+    Shows submitted scores in a family matrix, so a rejected edit can be
+    corrected rather than typed again.
+
+    Args:
+        gradebook (dict): A matrix from build_family_gradebook(), updated in place.
+        scores (dict): {(subject_id, term): score}, as passed to save_family_grades().
+    """
+    for student in gradebook['students']:
+        for row in student['rows']:
+            for cell in row['cells']:
+                score = scores.get((row['subject_id'], cell['term']))
+                if score is not None and cell['editable']:
+                    cell['score'] = score
+    return gradebook
+
+
+def family_gradebook(user_id, version):
+    """
+    The family matrix, cached under the family's data_version.
+
+    Every grade, subject or student change moves data_version when its
+    transaction commits, so a cached matrix is never served after an edit.
+    """
+    key = f'gradebook:{user_id}:{version.timestamp()}'
+    gradebook = cache.get(key)
+    if gradebook is None:
+        gradebook = build_family_gradebook(user_id)
+        cache.set(key, gradebook, GRADEBOOK_TIMEOUT)
+    return gradebook
+
+
+def save_family_grades(user_id, scores):
+    """
+    Applies a bulk edit of the family matrix.
+
+    Args:
+        user_id (int): The family; subjects of other families are ignored.
+        scores (dict): {(subject_id, term): score}; a blank score clears the grade.
+
+    Returns:
+        tuple: (number of grades changed, list of error messages). Nothing
+        is saved when there are errors.
+    """
+    subjects = {
+        subject_id: (student_id, grading_system)
+        for subject_id, student_id, grading_system in Subject.objects.filter(
+            student__user_id=user_id, id__in={subject_id for subject_id, _ in scores}
+        ).values_list('id', 'student_id', 'student__grading_system')
+    }
+    existing = {
+        (grade.subject_id, grade.term): grade
+        for grade in Grade.objects.filter(subject_id__in=subjects)
+    }
+
+    errors = []
+    changes = []
+    for (subject_id, term), score in scores.items():
+        if subject_id not in subjects:
+            continue
+        score = score.strip()
+        grade = existing.get((subject_id, term))
+        if score == (grade.score if grade else ''):
+            continue
+        if term not in terms_for(subjects[subject_id][1]) and grade is None:
+            errors.append(f"{term} is not a term for this student's grading system.")
+        elif len(score) > SCORE_MAX_LENGTH:
+            errors.append(f"\"{score}\" is too long; scores are at most {SCORE_MAX_LENGTH} characters.")
+        else:
+            changes.append((subject_id, term, score, grade))
+    if errors:
+        return 0, errors
+
+    # Saved row by row so the change feed and sync tombstones see every edit;
+    # the family's data_version still moves once, on commit
+    with transaction.atomic():
+        for subject_id, term, score, grade in changes:
+            if not score:
+                grade.delete()
+            elif grade is None:
+                Grade.objects.create(student_id=subjects[subject_id][0], subject_id=subject_id, term=term, score=score)
+            else:
+                grade.score = score
+                grade.save(update_fields=['score'])
+    return len(changes), []
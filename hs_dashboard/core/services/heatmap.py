@@ -0,0 +1,103 @@
+import base64
+import time
+from datetime import date, timedelta
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count
+
+from core.batching import TransactionBatch
+from core.models import SchoolDay
+from core.services.attendance_bitmap import year_start_for
+
+HEATMAP_TIMEOUT = 60 * 60 * 24
+
+
+def _generation_key(student_id):
+    return f'heatmap:generation:{student_id}'
+
+
+class _HeatmapBatch(TransactionBatch):
+    """Students whose heatmaps go stale when the current transaction commits."""
+
+    def __init__(self):
+        self.student_ids = set()
+
+    def flush(self):
+        if self.student_ids:
+            generation = time.time_ns()
+            cache.set_many({_generation_key(student_id): generation for student_id in self.student_ids}, None)
+
+
+def invalidate_heatmaps(*student_ids):
+    """
+    Drops every cached heatmap year for the given students.
+
+    Cached years are keyed by a per-student generation, so bumping it
+    invalidates them all without knowing which years were cached. Inside a
+    transaction the bump waits for the commit: bumped earlier, a concurrent
+    request could cache the old rows under the new generation.
+    """
+    batch = _HeatmapBatch.current() or _HeatmapBatch()
+    batch.student_ids.update(student_ids)
+    if not transaction.get_connection().in_atomic_block:
+        batch.flush()
+
+
+def _year_end(year_start):
+    return year_start.replace(year=year_start.year + 1) - timedelta(days=1)
+
+
+def _build_heatmap(student, year_start):
+    year_end = _year_end(year_start)
+    rows = SchoolDay.objects.filter(
+        student=student, date__range=(year_start, year_end)
+    ).annotate(subject_count=Count('subjects')).order_by('date').values_list('date', 'subject_count')
+
+    bits = 0
+    subjects = []
+    for day, subject_count in rows:
+        bits |= 1 << (day - year_start).days
+        subjects.append(subject_count)
+
+    length = (year_end - year_start).days + 1
+    return {
+        'student': student.id,
+        'start': year_start.isoformat(),
+        'end': year_end.isoformat(),
+        'days': length,
+        # Little-endian bitset: bit n (byte n // 8, bit n % 8) = start + n days
+        'attended': base64.b64encode(bits.to_bytes((length + 7) // 8, 'little')).decode(),
+        # Subject counts for the attended days, in date order
+        'subjects': subjects,
+        'total': len(subjects),
+    }
+
+
+def year_heatmap(student, year=None):
+    """
+    One academic year of a student's attendance in a compact form for
+    drawing a year heatmap client-side.
+
+    Args:
+        student (Student): The student.
+        year (int): Calendar year the academic year starts in; defaults to
+            the year containing today.
+
+    Returns:
+        dict: 'start', 'end', 'days', base64 'attended' bitmap, per-day
+        'subjects' counts and 'total'.
+    """
+    start_month = student.academic_year_start_month or 8
+    if year is None:
+        year_start = year_start_for(start_month, date.today())
+    else:
+        year_start = date(year, start_month, 1)
+
+    generation = cache.get_or_set(_generation_key(student.id), 0, None)
+    key = f'heatmap:{student.id}:{generation}:{year_start.isoformat()}'
+    heatmap = cache.get(key)
+    if heatmap is None:
+        heatmap = _build_heatmap(student, year_start)
+        cache.set(key, heatmap, HEATMAP_TIMEOUT)
+    return heatmap
@@ -0,0 +1,151 @@
+import mimetypes
+import os
+import posixpath
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from core.models import WorkSample
+
+# Generated variants of a sample (thumbnails, previews) live under
+# samples/derived/<sample id>/ and share the sample's permissions
+DERIVED_PREFIX = 'samples/derived/'
+SAMPLE_PREFIX = 'samples/'
+PUBLIC_PREFIXES = ('association_logos/',)
+
+# Stored names never change content (uploads get a fresh name), so clients may keep them
+CACHE_CONTROL = 'private, max-age=31536000, immutable'
+RANGE_CHUNK_SIZE = 64 * 1024
+
+_RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def clean_media_path(path):
+    """Normalises a requested media path, rejecting anything that escapes MEDIA_ROOT."""
+    path = posixpath.normpath(path).lstrip('/')
+    if path in ('', '.') or path.startswith('..'):
+        raise Http404("Invalid media path")
+    return path
+
+
+def can_access(user, path):
+    """Whether `user` may download the media file at `path`."""
+    if path.startswith(PUBLIC_PREFIXES):
+        return True
+    if user.is_staff:
+        return True
+
+    samples = WorkSample.objects.filter(student__user=user)
+    if path.startswith(DERIVED_PREFIX):
+        sample_id = path[len(DERIVED_PREFIX):].split('/', 1)[0]
+        return sample_id.isdigit() and samples.filter(id=int(sample_id)).exists()
+    if path.startswith(SAMPLE_PREFIX):
+        return samples.filter(file=path).exists()
+    return False
+
+
+def _parse_range(header, size):
+    """
+    Returns (start, end) for a single "bytes=" range, None to ignore the header,
+    or False when the range cannot be satisfied.
+    """
+    match = _RANGE_RE.match(header.strip())
+    if not match or not any(match.groups()):
+        # Multiple or malformed ranges: serving the whole file is allowed
+        return None
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    else:
+        # Suffix range: the last N bytes
+        start = max(0, size - int(last))
+        end = size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+def _iter_range(handle, start, length):
+    with handle:
+        handle.seek(start)
+        while length > 0:
+            chunk = handle.read(min(RANGE_CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def _offload_response(path, full_path):
+    """A header-only response the front-end server completes, or None to stream from Django."""
+    backend = settings.MEDIA_SENDFILE_BACKEND
+    if backend == 'nginx':
+        response = HttpResponse()
+        response['X-Accel-Redirect'] = settings.MEDIA_ACCEL_REDIRECT_PREFIX + quote(path)
+    elif backend == 'apache':
+        response = HttpResponse()
+        response['X-Sendfile'] = full_path
+    else:
+        return None
+    # Let the server fill in the type and length of the real file
+    del response['Content-Type']
+    return response
+
+
+def serve_media(request, path):
+    """
+    Serves one stored file after the caller has checked access.
+
+    With MEDIA_SENDFILE_BACKEND set, only headers are produced and nginx
+    (X-Accel-Redirect) or Apache (X-Sendfile) sends the bytes. Otherwise the
+    file is streamed here with single-range support.
+    """
+    try:
+        full_path = default_storage.path(path)
+        stat = os.stat(full_path)
+    except (FileNotFoundError, NotADirectoryError, NotImplementedError):
+        raise Http404("File not found")
+
+    etag = quote_etag(f'{int(stat.st_mtime)}-{stat.st_size}')
+    response = get_conditional_response(request, etag=etag, last_modified=int(stat.st_mtime))
+
+    if response is None:
+        response = _offload_response(path, full_path)
+
+    if response is None:
+        size = stat.st_size
+        content_type, encoding = mimetypes.guess_type(full_path)
+        byte_range = None
+        if request.headers.get('Range') and request.headers.get('If-Range', etag) == etag:
+            byte_range = _parse_range(request.headers['Range'], size)
+
+        if byte_range is False:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+        elif byte_range:
+            start, end = byte_range
+            length = end - start + 1
+            response = StreamingHttpResponse(
+                _iter_range(open(full_path, 'rb'), start, length),
+                status=206,
+                content_type=content_type or 'application/octet-stream',
+            )
+            response['Content-Length'] = str(length)
+            response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        else:
+            response = FileResponse(open(full_path, 'rb'), content_type=content_type)
+        if encoding:
+            response['Content-Encoding'] = encoding
+
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    response['Cache-Control'] = CACHE_CONTROL
+    response['Vary'] = 'Cookie'
+    return response
@@ -0,0 +1,195 @@
+"""
+Counters and histograms kept in the Django cache and rendered in the
+Prometheus text format by the /metrics view.
+
+Every process (web workers, Celery workers) increments the same keys in the
+'metrics' cache, so with Redis (REDIS_CACHE_URL) /metrics reports the whole
+deployment. With the default memory cache each process only sees its own
+numbers. Values persist until the cache is flushed.
+"""
+import math
+
+from django.core.cache import caches
+from django.utils.connection import ConnectionProxy
+
+KEY_PREFIX = 'metrics'
+
+cache = ConnectionProxy(caches, 'metrics')
+
+_registry = {}
+
+
+def _label_key(labels):
+    return ','.join(f'{name}={value}' for name, value in labels)
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (
+        (name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in pairs
+    )
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+
+def _format_value(value):
+    if isinstance(value, float):
+        return repr(value) if math.isfinite(value) else '+Inf'
+    return str(value)
+
+
+class _Metric:
+    type = None
+
+    def __init__(self, name, help_text, labels=()):
+        if name in _registry:
+            raise ValueError(f"Metric {name} is already registered")
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(labels)
+        # Series this process has registered, so the index is only checked once per series
+        self._registered = set()
+        _registry[name] = self
+
+    def _labels(self, labels):
+        if set(labels) != set(self.label_names):
+            raise ValueError(f"{self.name} takes labels {self.label_names}, got {tuple(labels)}")
+        return tuple((name, str(labels[name])) for name in self.label_names)
+
+    def _key(self, labels, suffix):
+        return f'{KEY_PREFIX}:{self.name}:{_label_key(labels)}:{suffix}'
+
+    def _slot_key(self, slot):
+        return f'{KEY_PREFIX}:{self.name}:series:{slot}'
+
+    def _register_series(self, labels, created):
+        """
+        Adds a series to the metric's index: numbered slots allocated with an
+        atomic increment, so concurrent processes never overwrite each other.
+
+        A per-series marker (added atomically) makes this idempotent: each
+        process re-checks a series the first time it touches it, and again
+        whenever it had to create the series' keys, so a flushed index is
+        rebuilt as soon as the series is next used.
+        """
+        if labels in self._registered and not created:
+            return
+        if cache.add(self._key(labels, 'registered'), True, None):
+            cache.add(self._slot_key('count'), 0, None)
+            slot = cache.incr(self._slot_key('count'))
+            cache.set(self._slot_key(slot), labels, None)
+        self._registered.add(labels)
+
+    def _incr(self, key, amount):
+        """Increments `key`, creating it if needed. Returns True when it was created."""
+        try:
+            cache.incr(key, amount)
+            return False
+        except ValueError:
+            if not cache.add(key, amount, None):
+                cache.incr(key, amount)
+            return True
+
+    def series(self):
+        count = cache.get(self._slot_key('count')) or 0
+        slots = cache.get_many([self._slot_key(slot) for slot in range(1, count + 1)])
+        # A slot may repeat a series if its marker was flushed on its own
+        return list(dict.fromkeys(slots.values()))
+
+    def render(self):
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        labels = self._labels(labels)
+        self._register_series(labels, self._incr(self._key(labels, 'total'), amount))
+
+    def render(self):
+        series = self.series()
+        values = cache.get_many([self._key(labels, 'total') for labels in series])
+        for labels in series:
+            yield f"{self.name}_total{_format_labels(labels)} {values.get(self._key(labels, 'total'), 0)}"
+
+
+class Histogram(_Metric):
+    type = 'histogram'
+
+    def __init__(self, name, help_text, labels=(), buckets=(), sum_scale=1000):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+        # cache.incr is integer-only, so the sum is kept in units of 1/sum_scale
+        self.sum_scale = sum_scale
+
+    def observe(self, value, **labels):
+        labels = self._labels(labels)
+        bucket = next(index for index, bound in enumerate(self.buckets) if value <= bound)
+        # Buckets are stored individually and made cumulative when rendered
+        self._incr(self._key(labels, f'b{bucket}'), 1)
+        self._incr(self._key(labels, 'sum'), int(round(value * self.sum_scale)))
+        self._register_series(labels, self._incr(self._key(labels, 'count'), 1))
+
+    def render(self):
+        series = self.series()
+        keys = [
+            self._key(labels, suffix)
+            for labels in series
+            for suffix in [f'b{index}' for index in range(len(self.buckets))] + ['count', 'sum']
+        ]
+        values = cache.get_many(keys)
+        for labels in series:
+            cumulative = 0
+            for index, bound in enumerate(self.buckets):
+                cumulative += values.get(self._key(labels, f'b{index}'), 0)
+                le = '+Inf' if math.isinf(bound) else _format_value(bound)
+                yield f"{self.name}_bucket{_format_labels(labels, [('le', le)])} {cumulative}"
+            total = values.get(self._key(labels, 'sum'), 0) / self.sum_scale
+            yield f"{self.name}_sum{_format_labels(labels)} {_format_value(total)}"
+            yield f"{self.name}_count{_format_labels(labels)} {values.get(self._key(labels, 'count'), 0)}"
+
+
+def render_metrics():
+    """Every registered metric in the Prometheus text exposition format."""
+    lines = []
+    for metric in _registry.values():
+        lines.append(f"# HELP {metric.name} {metric.help_text}")
+        lines.append(f"# TYPE {metric.name} {metric.type}")
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+
+# --- Web tier
+
+HTTP_REQUEST_SECONDS = Histogram(
+    'http_request_duration_seconds', "Time to produce a response, by view.",
+    labels=('view', 'method', 'status'),
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+
+# --- Celery tasks
+
+TASK_SECONDS = Histogram(
+    'celery_task_duration_seconds', "Task run time, by task and outcome.",
+    labels=('task', 'outcome'),
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120),
+)
+TASK_RSS_BYTES = Histogram(
+    'celery_task_rss_bytes', "Worker resident memory when a task finished.",
+    labels=('task',),
+    buckets=tuple(mb * 1024 * 1024 for mb in (64, 128, 256, 384, 512, 768, 1024, 2048)),
+    sum_scale=1,
+)
+TASK_RSS_GROWTH_BYTES = Histogram(
+    'celery_task_rss_growth_bytes', "Growth of the worker's peak memory during a task.",
+    labels=('task',),
+    buckets=tuple(mb * 1024 * 1024 for mb in (1, 4, 16, 64, 128, 256, 512)),
+    sum_scale=1,
+)
+TASK_FAILURES = Counter(
+    'celery_task_failures', "Failed task runs, by exception type.",
+    labels=('task', 'exception'),
+)
@@ -1,7 +1,16 @@
 
 import calendar
-from datetime import date, timedelta
+import logging
+from datetime import date
+from celery.exceptions import SoftTimeLimitExceeded
+from django.conf import settings
+from django.db.models import Count
+from django.db.models.functions import Coalesce
 from core.models import SchoolDay
+from core.utils import generate_pdf_bytes
+from core.services.attendance_bitmap import days_between, month_bits, student_years
+
+logger = logging.getLogger(__name__)
 
 def prepare_compliance_data(student, start_date, end_date):
     """
@@ -22,19 +31,9 @@ def prepare_compliance_data(student, start_date, end_date):
     if isinstance(end_date, str):
         end_date = date.fromisoformat(end_date)
 
-    # 1. Fetch all relevant school days once
-    school_days = SchoolDay.objects.filter(
-        student=student,
-        date__range=[start_date, end_date]
-    ).prefetch_related('subjects')
-    
-    # Map dates to subjects for O(1) lookup
-    # attendance_map = { date: [subject_names] }
-    attendance_map = {
-        day.date: [s.display_name for s in day.subjects.all()] 
-        for day in school_days
-    }
-    
+    # 1. Attendance comes from the student's yearly bitmaps (one small query)
+    years = student_years(student)
+
     # 2. Build the Matrix (Months)
     months_data = []
     
@@ -50,18 +49,22 @@ def prepare_compliance_data(student, start_date, end_date):
         
         # Determine valid days in this month
         _, last_day_of_month = calendar.monthrange(y_val, m_num)
+        attended = month_bits(years, y_val, m_num)
         
+        # Drop days outside the reporting range (partial first/last months)
+        for d in range(1, last_day_of_month + 1):
+            if not start_date <= date(y_val, m_num, d) <= end_date:
+                attended &= ~(1 << (d - 1))
+
         days_status = [] # List of 31 items
         
         for d in range(1, 32):
             if d > last_day_of_month:
                 days_status.append({'code': 'INVALID', 'label': ''})
+            elif attended >> (d - 1) & 1:
+                days_status.append({'code': 'ATTENDED', 'label': 'X'})
             else:
-                check_date = date(y_val, m_num, d)
-                if check_date in attendance_map:
-                    days_status.append({'code': 'ATTENDED', 'label': 'X'})
-                else:
-                    days_status.append({'code': 'EMPTY', 'label': ''})
+                days_status.append({'code': 'EMPTY', 'label': ''})
         
         monthly_total = sum(1 for day in days_status if day['code'] == 'ATTENDED')
         
@@ -79,14 +82,19 @@ def prepare_compliance_data(student, start_date, end_date):
             current_date = date(y_val, m_num + 1, 1)
             
     # 3. Calculate Stats & Subjects
-    total_days = len(attendance_map)
+    total_days = days_between(years, start_date, end_date)
     days_required = 180
     days_remaining = max(0, days_required - total_days)
     
-    subject_counts = {}
-    for subjs in attendance_map.values():
-        for s in subjs:
-            subject_counts[s] = subject_counts.get(s, 0) + 1
+    # Count subject usage in the database instead of walking every day
+    subject_counts = dict(
+        SchoolDay.subjects.through.objects.filter(
+            schoolday__student=student,
+            schoolday__date__range=[start_date, end_date]
+        ).annotate(
+            subject_name=Coalesce('subject__global_subject__name', 'subject__name')
+        ).values('subject_name').annotate(days=Count('id')).values_list('subject_name', 'days')
+    )
             
     # Sort subjects alpha
     sorted_subjects = sorted(subject_counts.items())
@@ -121,3 +129,26 @@ def prepare_compliance_data(student, start_date, end_date):
     }
     
     return context
+
+
+def render_compliance_pdf(context):
+    """
+    Renders the Compliance Record PDF with the engine chosen by
+    settings.PDF_REPORT_ENGINE: 'reportlab' draws it directly on a canvas,
+    'xhtml2pdf' renders pdfs/attendance_report.html. Defaults to 'reportlab',
+    as in settings; the template engine is also the fallback if the canvas
+    renderer fails.
+
+    Returns:
+        bytes: The PDF, or None if rendering failed.
+    """
+    if getattr(settings, 'PDF_REPORT_ENGINE', 'reportlab') == 'reportlab':
+        from core.services.report_canvas import render_attendance_report
+        try:
+            return render_attendance_report(context)
+        except SoftTimeLimitExceeded:
+            # Out of time in a report task: don't start a second, slower render
+            raise
+        except Exception:
+            logger.exception("ReportLab rendering failed; falling back to xhtml2pdf")
+    return generate_pdf_bytes('pdfs/attendance_report.html', context)
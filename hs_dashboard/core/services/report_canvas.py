@@ -0,0 +1,198 @@
+"""
+Draws the attendance report (pdfs/attendance_report.html) straight onto a
+ReportLab canvas from prepare_compliance_data()'s context, skipping the
+template and xhtml2pdf's HTML/CSS layout. Measurements mirror the template.
+"""
+from io import BytesIO
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.units import cm
+from reportlab.lib.utils import simpleSplit
+from reportlab.pdfgen.canvas import Canvas
+
+PAGE_WIDTH, PAGE_HEIGHT = letter
+MARGIN = 1 * cm
+CONTENT_WIDTH = PAGE_WIDTH - 2 * MARGIN
+# The footer frame of base_pdf.html: 4cm tall, 1cm above the page edge
+FOOTER_TOP = MARGIN + 4 * cm
+
+# xhtml2pdf treats CSS px as 0.75pt
+PX = 0.75
+GRID_ROW_HEIGHT = 22 * PX
+GRID_FONT_SIZE = 9 * PX
+MONTH_COL = 0.15 * CONTENT_WIDTH
+DAY_COL = 0.021 * CONTENT_WIDTH
+TOTAL_COL = CONTENT_WIDTH - MONTH_COL - 31 * DAY_COL
+INVALID_FILL = colors.HexColor('#cccccc')
+FOOTNOTE_GREY = colors.HexColor('#666666')
+
+TITLE = "Compliance Record pursuant to SC Code § 59-65-47"
+CERTIFICATION = (
+    "I certify that the attendance and progress records included in this report are accurate and comply with the "
+    "requirements of South Carolina Code § 59-65-47."
+)
+PORTFOLIO_NOTE = (
+    "A portfolio of work samples has been maintained for this student and is available for review upon request."
+)
+
+
+def _centered(canvas, text, y, font, size):
+    canvas.setFont(font, size)
+    canvas.drawCentredString(PAGE_WIDTH / 2, y, text)
+
+
+def _label_value(canvas, x, y, label, value, align='left'):
+    """Draws "<b>label</b> value" with the value underlined, like the header table."""
+    label_width = canvas.stringWidth(label, 'Helvetica-Bold', 10)
+    value_width = canvas.stringWidth(value, 'Helvetica', 10)
+    width = label_width + value_width
+    if align == 'center':
+        x -= width / 2
+    elif align == 'right':
+        x -= width
+    canvas.setFont('Helvetica-Bold', 10)
+    canvas.drawString(x, y, label)
+    canvas.setFont('Helvetica', 10)
+    canvas.drawString(x + label_width, y, value)
+    return x + label_width, value_width
+
+
+def _draw_header(canvas, context):
+    y = PAGE_HEIGHT - MARGIN - 28
+    _centered(canvas, TITLE, y, 'Helvetica-Bold', 16)
+    y -= 25
+    _centered(canvas, f"Association: {context['association_name']}", y, 'Helvetica', 12)
+    y -= 18
+    _centered(canvas, f"Academic Year: {context['academic_year']}", y, 'Helvetica', 12)
+
+    y -= 31
+    student = context['student']
+    canvas.setLineWidth(0.5)
+    for x, label, value, align in (
+        (MARGIN, "Student Name: ", student.name, 'left'),
+        (PAGE_WIDTH / 2, "Grade: ", student.display_grade, 'center'),
+    ):
+        value_x, value_width = _label_value(canvas, x, y, label, value, align)
+        canvas.line(value_x, y - 1.5, value_x + value_width, y - 1.5)
+    if context['stats']['total_days']:
+        _label_value(canvas, PAGE_WIDTH - MARGIN, y, "Total Days: ", str(context['stats']['total_days']), 'right')
+    return y - 20
+
+
+def _draw_grid(canvas, months, top):
+    """The months x 31 attendance table. Returns the y below it."""
+    canvas.setLineWidth(1)
+    canvas.setStrokeColor(colors.black)
+    rows = len(months) + 1
+    bottom = top - rows * GRID_ROW_HEIGHT
+    day_x = [MARGIN + MONTH_COL + i * DAY_COL for i in range(32)]
+    text_offset = (GRID_ROW_HEIGHT - GRID_FONT_SIZE) / 2 + 1
+
+    # Shaded cells first so the borders stay on top
+    canvas.setFillColor(INVALID_FILL)
+    for row, month in enumerate(months, start=1):
+        row_bottom = top - (row + 1) * GRID_ROW_HEIGHT
+        for index, day in enumerate(month['days']):
+            if day['code'] == 'INVALID':
+                canvas.rect(day_x[index], row_bottom, DAY_COL, GRID_ROW_HEIGHT, stroke=0, fill=1)
+    canvas.setFillColor(colors.black)
+
+    for row in range(rows + 1):
+        y = top - row * GRID_ROW_HEIGHT
+        canvas.line(MARGIN, y, MARGIN + CONTENT_WIDTH, y)
+    for x in [MARGIN] + day_x + [MARGIN + CONTENT_WIDTH]:
+        canvas.line(x, top, x, bottom)
+
+    # Header row
+    y = top - GRID_ROW_HEIGHT + text_offset
+    canvas.setFont('Helvetica-Bold', GRID_FONT_SIZE)
+    canvas.drawCentredString(MARGIN + MONTH_COL / 2, y, "Month")
+    canvas.drawCentredString(day_x[31] + TOTAL_COL / 2, y, "Total")
+    for index in range(31):
+        canvas.drawCentredString(day_x[index] + DAY_COL / 2, y, str(index + 1))
+
+    for row, month in enumerate(months, start=1):
+        y = top - (row + 1) * GRID_ROW_HEIGHT + text_offset
+        canvas.drawCentredString(MARGIN + MONTH_COL / 2, y, month['name'])
+        for index, day in enumerate(month['days']):
+            if day['code'] == 'ATTENDED':
+                canvas.drawCentredString(day_x[index] + DAY_COL / 2, y, "X")
+        if month['total'] > 0:
+            canvas.drawCentredString(day_x[31] + TOTAL_COL / 2, y, str(month['total']))
+    return bottom
+
+
+def _draw_footer(canvas, generated_date):
+    y = FOOTER_TOP - 7
+    canvas.setFont('Helvetica-Bold', 10)
+    canvas.drawString(MARGIN, y, "Parental Certification")
+    canvas.setFont('Helvetica', 10)
+    for line in simpleSplit(CERTIFICATION, 'Helvetica', 10, CONTENT_WIDTH):
+        y -= 12
+        canvas.drawString(MARGIN, y, line)
+
+    y -= 28
+    canvas.setLineWidth(1)
+    date_x = MARGIN + 0.7 * CONTENT_WIDTH
+    canvas.line(MARGIN, y, MARGIN + 0.6 * CONTENT_WIDTH, y)
+    canvas.line(date_x, y, MARGIN + CONTENT_WIDTH, y)
+    y -= 13
+    canvas.drawString(MARGIN, y, "Parent/Guardian Signature")
+    canvas.drawString(date_x, y, "Date")
+
+    y -= 21
+    canvas.setFont('Helvetica-Oblique', 8)
+    canvas.setFillColor(FOOTNOTE_GREY)
+    canvas.drawCentredString(
+        PAGE_WIDTH / 2, y, f"Generated via Homeschool Dashboard on {generated_date.strftime('%B %d, %Y')}"
+    )
+    canvas.setFillColor(colors.black)
+
+
+def render_attendance_report(context):
+    """
+    Renders the attendance report for a prepare_compliance_data() context.
+
+    Returns:
+        bytes: The PDF document.
+    """
+    buffer = BytesIO()
+    canvas = Canvas(buffer, pagesize=letter, pageCompression=1)
+    canvas.setTitle("Attendance Report")
+
+    def new_page():
+        _draw_footer(canvas, context['generated_date'])
+        canvas.showPage()
+        return PAGE_HEIGHT - MARGIN - 12
+
+    y = _draw_header(canvas, context)
+    y = _draw_grid(canvas, context['months_data'], y)
+
+    # Subject summary: odd entries in the left column, even in the right
+    y -= 33
+    canvas.setFont('Helvetica-Bold', 10)
+    canvas.drawString(MARGIN, y, "Subject Summary")
+    y -= 4
+    subjects = context['subjects']
+    for index in range(0, len(subjects), 2):
+        y -= 15
+        if y < FOOTER_TOP + 15:
+            y = new_page()
+        canvas.setFont('Helvetica', 10)
+        for column, (subject, count) in enumerate(subjects[index:index + 2]):
+            canvas.drawString(MARGIN + column * CONTENT_WIDTH / 2, y, f"- {subject}: {count} days")
+
+    y -= 25
+    lines = simpleSplit(PORTFOLIO_NOTE, 'Helvetica-Oblique', 10, CONTENT_WIDTH)
+    if y - 12 * len(lines) < FOOTER_TOP:
+        y = new_page()
+    canvas.setFont('Helvetica-Oblique', 10)
+    for line in lines:
+        canvas.drawString(MARGIN, y, line)
+        y -= 12
+
+    _draw_footer(canvas, context['generated_date'])
+    canvas.showPage()
+    canvas.save()
+    return buffer.getvalue()
@@ -0,0 +1,205 @@
+import re
+
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from core.batching import TransactionBatch
+from core.models import SchoolDay, WorkSample
+
+SEARCH_TABLE = 'core_search_index'
+SEARCH_PAGE_SIZE = 20
+
+# rowid = object id * 2 + kind, so a row can be replaced by primary key
+KIND_DAY = 0
+KIND_SAMPLE = 1
+
+# Snippet markers that cannot occur in user text; swapped for <mark> after escaping
+_MARK_START = '\x02'
+_MARK_END = '\x03'
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+# Subject names for each day, shared by the rebuild and single-day reindex
+_DAY_SUBJECTS_SQL = """
+    SELECT group_concat(COALESCE(g.name, s.name), ' ')
+    FROM core_schoolday_subjects ds
+    JOIN core_subject s ON s.id = ds.subject_id
+    LEFT JOIN core_globalsubject g ON g.id = s.global_subject_id
+    WHERE ds.schoolday_id = d.id
+"""
+
+# `owner` holds one "u<user id>" token per row, so a search matches only the
+# family's own rows instead of filtering every family's hits afterwards
+_INSERT_DAYS_SQL = f"""
+    INSERT INTO {SEARCH_TABLE} (rowid, title, body, owner, student_id)
+    SELECT d.id * 2 + {KIND_DAY}, COALESCE(({_DAY_SUBJECTS_SQL}), ''), COALESCE(d.notes, ''),
+           'u' || st.user_id, d.student_id
+    FROM core_schoolday d
+    JOIN core_student st ON st.id = d.student_id
+"""
+
+# The tokenizer splits file paths on "/", "-", "_" and ".", so they are indexed as stored
+_INSERT_SAMPLES_SQL = f"""
+    INSERT INTO {SEARCH_TABLE} (rowid, title, body, owner, student_id)
+    SELECT w.id * 2 + {KIND_SAMPLE}, w.subject, w.file, 'u' || st.user_id, w.student_id
+    FROM core_worksample w
+    JOIN core_student st ON st.id = w.student_id
+"""
+
+
+def search_available():
+    """The FTS5 index only exists on SQLite; other databases fall back to icontains."""
+    return connection.vendor == 'sqlite'
+
+
+def _in_chunks(ids, size=500):
+    ids = sorted(ids)
+    for start in range(0, len(ids), size):
+        yield ids[start:start + size]
+
+
+def _reindex(day_ids, sample_ids):
+    """Replaces the index rows of the given days and samples; deleted ones are just dropped."""
+    with transaction.atomic(), connection.cursor() as cursor:
+        for kind, ids, insert_sql, id_column in (
+            (KIND_DAY, day_ids, _INSERT_DAYS_SQL, 'd.id'),
+            (KIND_SAMPLE, sample_ids, _INSERT_SAMPLES_SQL, 'w.id'),
+        ):
+            for chunk in _in_chunks(ids):
+                placeholders = ', '.join(['%s'] * len(chunk))
+                cursor.execute(
+                    f"DELETE FROM {SEARCH_TABLE} WHERE rowid IN ({placeholders})",
+                    [object_id * 2 + kind for object_id in chunk],
+                )
+                cursor.execute(f"{insert_sql} WHERE {id_column} IN ({placeholders})", chunk)
+
+
+class _IndexBatch(TransactionBatch):
+    """Days and work samples to re-index when the current transaction commits."""
+
+    def __init__(self):
+        self.day_ids = set()
+        self.sample_ids = set()
+
+    def flush(self):
+        if self.day_ids or self.sample_ids:
+            _reindex(self.day_ids, self.sample_ids)
+
+
+def reindex_on_commit(day_ids=(), sample_ids=()):
+    """
+    Queues school days and work samples for re-indexing.
+
+    Each row is re-indexed once, after the surrounding transaction commits,
+    however many saves and subject changes touched it; outside a transaction
+    it happens straight away. Rows that no longer exist leave the index.
+    """
+    if not search_available():
+        return
+    batch = _IndexBatch.current() or _IndexBatch()
+    batch.day_ids.update(day_ids)
+    batch.sample_ids.update(sample_ids)
+    if not connection.in_atomic_block:
+        batch.flush()
+
+
+def rebuild_search_index():
+    """
+    Rebuilds the whole index from SchoolDay and WorkSample rows.
+
+    Returns:
+        int: Number of indexed rows.
+    """
+    if not search_available():
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {SEARCH_TABLE}")
+        cursor.execute(_INSERT_DAYS_SQL)
+        cursor.execute(_INSERT_SAMPLES_SQL)
+        cursor.execute(f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) VALUES ('optimize')")
+        cursor.execute(f"SELECT count(*) FROM {SEARCH_TABLE}")
+        return cursor.fetchone()[0]
+
+
+def build_match_query(text):
+    """
+    Turns free text into a safe FTS5 query in which every word must match as a
+    prefix, so "volc experiment" finds "volcano experiments".
+    """
+    return ' '.join('"%s"*' % token for token in _TOKEN_RE.findall(text or ''))
+
+
+def _highlight(snippet):
+    html = escape(snippet).replace(_MARK_START, '<mark>').replace(_MARK_END, '</mark>')
+    return mark_safe(html)
+
+
+def _fts_page(user, match, offset):
+    # The words only match title and body; the owner column only scopes the search
+    scoped = f'owner : "u{user.id}" AND {{title body}} : ({match})'
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT rowid, snippet({SEARCH_TABLE}, 0, %s, %s, '…', 12), "
+            f"snippet({SEARCH_TABLE}, 1, %s, %s, '…', 12) "
+            f"FROM {SEARCH_TABLE} "
+            f"WHERE {SEARCH_TABLE} MATCH %s "
+            f"ORDER BY bm25({SEARCH_TABLE}, 2.0, 1.0, 0.0) "
+            f"LIMIT %s OFFSET %s",
+            [_MARK_START, _MARK_END, _MARK_START, _MARK_END, scoped, SEARCH_PAGE_SIZE + 1, offset],
+        )
+        return [
+            # Show whichever column matched more of the words (the title on a tie)
+            (rowid // 2, rowid % 2, _highlight(max(snippets, key=lambda snippet: snippet.count(_MARK_START))))
+            for rowid, *snippets in cursor.fetchall()
+        ]
+
+
+def _fallback_page(user, text, offset):
+    # Unranked substring search for databases without FTS5
+    days = SchoolDay.objects.filter(student__user=user).filter(
+        Q(notes__icontains=text) | Q(subjects__name__icontains=text)
+        | Q(subjects__global_subject__name__icontains=text)
+    ).distinct().order_by('-date').values_list('id', flat=True)
+    samples = WorkSample.objects.filter(student__user=user).filter(
+        Q(subject__icontains=text) | Q(file__icontains=text)
+    ).order_by('-date_uploaded').values_list('id', flat=True)
+    ids = [(day_id, KIND_DAY) for day_id in days] + [(sample_id, KIND_SAMPLE) for sample_id in samples]
+    return [(obj_id, kind, '') for obj_id, kind in ids[offset:offset + SEARCH_PAGE_SIZE + 1]]
+
+
+def search(user, text, page=1):
+    """
+    Ranked search across the user's school days and work samples.
+
+    Returns:
+        dict: 'results' (dicts with 'kind', 'object', 'snippet'), 'page' and
+        'has_next'. Day objects come with their student; samples likewise.
+    """
+    page = max(1, page)
+    offset = (page - 1) * SEARCH_PAGE_SIZE
+    if search_available():
+        match = build_match_query(text)
+        hits = _fts_page(user, match, offset) if match else []
+    else:
+        hits = _fallback_page(user, text, offset) if text.strip() else []
+
+    has_next = len(hits) > SEARCH_PAGE_SIZE
+    hits = hits[:SEARCH_PAGE_SIZE]
+
+    day_ids = [obj_id for obj_id, kind, _ in hits if kind == KIND_DAY]
+    sample_ids = [obj_id for obj_id, kind, _ in hits if kind == KIND_SAMPLE]
+    days = SchoolDay.objects.select_related('student').in_bulk(day_ids) if day_ids else {}
+    samples = WorkSample.objects.select_related('student').in_bulk(sample_ids) if sample_ids else {}
+
+    results = []
+    for obj_id, kind, snippet in hits:
+        obj = (days if kind == KIND_DAY else samples).get(obj_id)
+        if obj is not None:
+            results.append({
+                'kind': 'day' if kind == KIND_DAY else 'sample',
+                'object': obj,
+                'snippet': snippet,
+            })
+    return {'results': results, 'page': page, 'has_next': has_next}
@@ -0,0 +1,53 @@
+import time
+import uuid
+
+from django.core.cache import cache
+
+# How long a render may hold the lock before others assume it died
+LOCK_TIMEOUT = 120
+# How long finished results are kept for late duplicates
+RESULT_TIMEOUT = 300
+POLL_INTERVAL = 0.25
+
+
+def single_flight(key, render, wait_timeout=LOCK_TIMEOUT):
+    """
+    Runs `render()` once for concurrent callers sharing `key`.
+
+    The first caller takes a lock with cache.add (atomic in every backend) and
+    stores the result; the others wait for it instead of rendering again. A
+    result already in the cache is returned straight away. If the lock holder
+    fails, or the wait times out, the waiter renders the result itself.
+
+    `render` must return something picklable; None is treated as a failure
+    and is not shared.
+    """
+    result_key = f'single_flight:result:{key}'
+    lock_key = f'single_flight:lock:{key}'
+
+    result = cache.get(result_key)
+    if result is not None:
+        return result
+
+    token = uuid.uuid4().hex
+    if not cache.add(lock_key, token, LOCK_TIMEOUT):
+        deadline = time.monotonic() + wait_timeout
+        while time.monotonic() < deadline:
+            time.sleep(POLL_INTERVAL)
+            result = cache.get(result_key)
+            if result is not None:
+                return result
+            if cache.get(lock_key) is None:
+                # Holder finished without a result (failed); render ourselves
+                break
+        return render()
+
+    try:
+        result = render()
+        if result is not None:
+            cache.set(result_key, result, RESULT_TIMEOUT)
+        return result
+    finally:
+        # Only release our own lock; it may have expired and been re-taken
+        if cache.get(lock_key) == token:
+            cache.delete(lock_key)
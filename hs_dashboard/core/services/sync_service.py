@@ -0,0 +1,189 @@
+from datetime import date, datetime, timedelta
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from core.models import SchoolDay, Student, Subject, SyncReceipt, SyncTombstone, WorkSample
+from core.utils import resolve_subject
+
+SYNC_MAX_BATCH = 500
+# Rows written by transactions still open when a cursor is issued commit with
+# an earlier timestamp, so each delta re-reads this much of the past
+SYNC_CURSOR_OVERLAP = timedelta(seconds=5)
+RECEIPT_RETENTION = timedelta(days=30)
+TOMBSTONE_RETENTION = timedelta(days=90)
+
+
+class SyncError(ValueError):
+    """A malformed sync request; the message is safe to show to the client."""
+
+
+def _apply_entry(user, students, entry):
+    """Validates and applies one queued day log. Returns (status, school_day)."""
+    try:
+        student = students[int(entry.get('student'))]
+    except (KeyError, TypeError, ValueError):
+        raise SyncError("Unknown student")
+    try:
+        day_date = date.fromisoformat(entry.get('date') or '')
+    except (TypeError, ValueError):
+        raise SyncError("Invalid date")
+    notes = entry.get('notes')
+    subject_names = entry.get('subjects') or []
+    if not isinstance(subject_names, list):
+        raise SyncError("subjects must be a list")
+
+    # A day logged twice (on two devices, or online then offline) is merged
+    day, created = SchoolDay.objects.get_or_create(student=student, date=day_date, defaults={'notes': notes})
+    if not created and notes:
+        day.notes = notes
+        day.save(update_fields=['notes', 'updated_at'])
+    subjects = [resolve_subject(student, str(name)) for name in subject_names if name]
+    if subjects:
+        day.subjects.add(*subjects)
+    return ('created' if created else 'merged'), day
+
+
+def apply_day_logs(user, entries):
+    """
+    Applies a device's queued day logs in one transaction.
+
+    Each entry is {'key', 'student', 'date', 'notes', 'subjects'}, where `key`
+    is a client-generated idempotency key. Keys already applied are answered
+    from their receipt, so retrying an upload never logs a day twice. A bad
+    entry is rejected on its own without undoing the others.
+
+    Returns:
+        list: One {'key', 'status', 'id'} (or {'key', 'status', 'error'}) per
+        entry, status being 'created', 'merged', 'duplicate' or 'rejected'.
+    """
+    if len(entries) > SYNC_MAX_BATCH:
+        raise SyncError(f"At most {SYNC_MAX_BATCH} entries per upload")
+
+    results = []
+    with transaction.atomic():
+        students = {student.id: student for student in Student.objects.filter(user=user)}
+        keys = [entry.get('key') for entry in entries if isinstance(entry, dict)]
+        receipts = {
+            receipt.key: receipt
+            for receipt in SyncReceipt.objects.filter(user=user, key__in=[k for k in keys if isinstance(k, str)])
+        }
+
+        for entry in entries:
+            key = entry.get('key') if isinstance(entry, dict) else None
+            if not isinstance(key, str) or not 0 < len(key) <= 64:
+                results.append({'key': key, 'status': 'rejected', 'error': "Missing or invalid key"})
+                continue
+            if key in receipts:
+                results.append({'key': key, 'status': 'duplicate', 'id': receipts[key].school_day_id})
+                continue
+            try:
+                with transaction.atomic():
+                    status, day = _apply_entry(user, students, entry)
+                    receipts[key] = SyncReceipt.objects.create(user=user, key=key, school_day=day, status=status)
+            except SyncError as e:
+                results.append({'key': key, 'status': 'rejected', 'error': str(e)})
+                continue
+            except IntegrityError:
+                # The same key applied concurrently by another request
+                receipt = SyncReceipt.objects.filter(user=user, key=key).first()
+                if receipt is None:
+                    raise
+                results.append({'key': key, 'status': 'duplicate', 'id': receipt.school_day_id})
+                continue
+            results.append({'key': key, 'status': status, 'id': day.id})
+    return results
+
+
+def parse_cursor(cursor):
+    """Returns the datetime a cursor stands for, or None for a full sync."""
+    if not cursor:
+        return None
+    try:
+        since = datetime.fromisoformat(cursor)
+    except ValueError:
+        raise SyncError("Invalid cursor")
+    if timezone.is_naive(since):
+        raise SyncError("Invalid cursor")
+    return since
+
+
+def _serialize_days(days):
+    subject_ids = {}
+    links = SchoolDay.subjects.through.objects.filter(
+        schoolday_id__in=[day.id for day in days]
+    ).values_list('schoolday_id', 'subject_id')
+    for day_id, subject_id in links:
+        subject_ids.setdefault(day_id, []).append(subject_id)
+    return [{
+        'id': day.id,
+        'student': day.student_id,
+        'date': day.date.isoformat(),
+        'notes': day.notes or '',
+        'subjects': subject_ids.get(day.id, []),
+    } for day in days]
+
+
+def changes_since(user, cursor=None):
+    """
+    Everything a device needs to catch up since `cursor` in one response.
+
+    Without a cursor, or with one older than the tombstone retention, the
+    full data set is returned with 'reset': True and the device should
+    replace its copy.
+
+    Returns:
+        dict: 'cursor' for the next call, 'reset', 'students', changed
+        'days', 'subjects' and 'work_samples', and 'deleted' ids per kind.
+    """
+    since = parse_cursor(cursor)
+    now = timezone.now()
+    reset = since is None or since < now - TOMBSTONE_RETENTION
+
+    days = SchoolDay.objects.filter(student__user=user).order_by('date')
+    subjects = Subject.objects.filter(student__user=user).select_related('global_subject')
+    samples = WorkSample.objects.filter(student__user=user).order_by('-date_uploaded')
+    deleted = {'days': [], 'subjects': [], 'work_samples': []}
+    if not reset:
+        days = days.filter(updated_at__gte=since)
+        subjects = subjects.filter(updated_at__gte=since)
+        samples = samples.filter(updated_at__gte=since)
+        tombstones = SyncTombstone.objects.filter(user=user, deleted_at__gte=since).values_list('model', 'object_id')
+        for model, object_id in tombstones:
+            deleted[{'day': 'days', 'subject': 'subjects', 'work_sample': 'work_samples'}[model]].append(object_id)
+
+    return {
+        'cursor': (now - SYNC_CURSOR_OVERLAP).isoformat(),
+        'reset': reset,
+        'students': [
+            {'id': student.id, 'name': student.name, 'grade': student.display_grade}
+            for student in Student.objects.filter(user=user).order_by('name')
+        ],
+        'days': _serialize_days(list(days)),
+        'subjects': [
+            {'id': subject.id, 'student': subject.student_id, 'name': subject.display_name,
+             'global_subject': subject.global_subject_id}
+            for subject in subjects
+        ],
+        'work_samples': [
+            {'id': sample.id, 'student': sample.student_id, 'subject': sample.subject,
+             'date_uploaded': sample.date_uploaded.isoformat(), 'url': sample.file.url}
+            for sample in samples
+        ],
+        'deleted': deleted,
+    }
+
+
+def record_deletion(model, object_id, student_id):
+    """Leaves a tombstone for a deleted synced row (called from signals)."""
+    user_id = Student.objects.filter(id=student_id).values_list('user_id', flat=True).first()
+    if user_id is not None:
+        SyncTombstone.objects.create(user_id=user_id, model=model, object_id=object_id)
+
+
+def prune_sync_records():
+    """Drops receipts and tombstones past their retention. Returns rows deleted."""
+    now = timezone.now()
+    receipts, _ = SyncReceipt.objects.filter(created_at__lt=now - RECEIPT_RETENTION).delete()
+    tombstones, _ = SyncTombstone.objects.filter(deleted_at__lt=now - TOMBSTONE_RETENTION).delete()
+    return receipts + tombstones
@@ -0,0 +1,314 @@
+import threading
+
+from django.contrib.auth.models import User
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete, m2m_changed
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import Student, Subject, GlobalSubject, SchoolDay, WorkSample, Grade, Association, FamilyProfile
+from .batching import TransactionBatch
+from .versioning import touch_family
+from .services.attendance_bitmap import mark_day, rebuild_bitmaps
+from .services.change_feed import record_change
+from .services.heatmap import invalidate_heatmaps
+from .services.sync_service import record_deletion
+from .services.search_service import reindex_on_commit
+
+
+@receiver(post_save, sender=Student)
+@receiver(post_delete, sender=Student)
+def touch_student_family(sender, instance, **kwargs):
+    touch_family(user_id=instance.user_id)
+
+
+@receiver(post_save, sender=Subject)
+@receiver(post_delete, sender=Subject)
+@receiver(post_save, sender=SchoolDay)
+@receiver(post_delete, sender=SchoolDay)
+@receiver(post_save, sender=WorkSample)
+@receiver(post_delete, sender=WorkSample)
+@receiver(post_save, sender=Grade)
+@receiver(post_delete, sender=Grade)
+def touch_student_row_family(sender, instance, **kwargs):
+    touch_family(student_id=instance.student_id)
+
+
+@receiver(m2m_changed, sender=SchoolDay.subjects.through)
+def touch_school_day_subjects_family(sender, instance, action, reverse, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        # Reverse changes come from the Subject side; both carry student_id
+        touch_family(student_id=instance.student_id)
+
+
+@receiver(post_save, sender=Association)
+def touch_association_families(sender, instance, created, **kwargs):
+    if not created:
+        for user_id in FamilyProfile.objects.filter(association=instance).values_list('user_id', flat=True):
+            touch_family(user_id=user_id)
+
+
+@receiver(post_save, sender=GlobalSubject)
+def touch_global_subject_families(sender, instance, created, raw=False, **kwargs):
+    # Linked subjects are renamed with a queryset update, which sends no signals
+    if not created and not raw:
+        for student_id in Subject.objects.filter(global_subject=instance).values_list(
+            'student_id', flat=True
+        ).distinct():
+            touch_family(student_id=student_id)
+
+
+# --- Attendance bitmaps
+
+@receiver(pre_save, sender=SchoolDay)
+def remember_school_day_slot(sender, instance, **kwargs):
+    # Views assign the raw POSTed string; receivers below compare real dates
+    instance.date = sender._meta.get_field('date').to_python(instance.date)
+    # Needed to clear the old bit when a day is moved to another date/student
+    instance._bitmap_previous = None
+    if instance.pk:
+        instance._bitmap_previous = SchoolDay.objects.filter(pk=instance.pk).values_list(
+            'student_id', 'student__academic_year_start_month', 'date'
+        ).first()
+
+
+@receiver(post_save, sender=SchoolDay)
+def update_bitmap_on_save(sender, instance, **kwargs):
+    student = instance.student
+    previous = getattr(instance, '_bitmap_previous', None)
+    if previous and (previous[0], previous[2]) != (student.id, instance.date):
+        mark_day(previous[0], previous[1], previous[2], attended=False)
+    mark_day(student.id, student.academic_year_start_month, instance.date, attended=True)
+
+
+_deleting = threading.local()
+
+
+@receiver(pre_delete, sender=Student)
+def remember_deleting_student(sender, instance, **kwargs):
+    # The student's bitmaps go with it, so its cascaded days needn't clear bits
+    if not hasattr(_deleting, 'student_ids'):
+        _deleting.student_ids = set()
+    _deleting.student_ids.add(instance.id)
+
+
+@receiver(post_delete, sender=Student)
+def forget_deleting_student(sender, instance, **kwargs):
+    getattr(_deleting, 'student_ids', set()).discard(instance.id)
+
+
+@receiver(post_delete, sender=SchoolDay)
+def update_bitmap_on_delete(sender, instance, **kwargs):
+    if instance.student_id in getattr(_deleting, 'student_ids', ()):
+        return
+    start_month = Student.objects.filter(id=instance.student_id).values_list(
+        'academic_year_start_month', flat=True
+    ).first()
+    if start_month is not None:
+        mark_day(instance.student_id, start_month, instance.date, attended=False)
+
+
+@receiver(pre_save, sender=Student)
+def remember_student_start_month(sender, instance, **kwargs):
+    instance._previous_start_month = None
+    if instance.pk:
+        instance._previous_start_month = Student.objects.filter(pk=instance.pk).values_list(
+            'academic_year_start_month', flat=True
+        ).first()
+
+
+@receiver(post_save, sender=Student)
+def rebuild_bitmaps_on_year_change(sender, instance, created, **kwargs):
+    previous = getattr(instance, '_previous_start_month', None)
+    if not created and previous is not None and previous != instance.academic_year_start_month:
+        # Bit offsets are relative to the start month, so every year shifts
+        rebuild_bitmaps(Student.objects.filter(id=instance.id))
+
+
+# --- Subject lists of school days
+#
+# m2m_changed fires from both sides of SchoolDay.subjects: forward from a day
+# (pk_set holds subject ids) and reverse from a Subject (pk_set holds day ids).
+# A reverse clear has no pk_set, so its days are remembered on pre_clear.
+
+@receiver(m2m_changed, sender=SchoolDay.subjects.through)
+def remember_cleared_days(sender, instance, action, reverse, **kwargs):
+    if reverse and action == 'pre_clear':
+        instance._cleared_day_ids = list(instance.school_days.values_list('id', flat=True))
+
+
+def _changed_day_ids(instance, action, reverse, pk_set):
+    """Ids of the days whose subjects a post_* m2m_changed action changed; empty for pre_* actions."""
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return []
+    if not reverse:
+        return [instance.pk]
+    if action == 'post_clear':
+        return getattr(instance, '_cleared_day_ids', [])
+    return list(pk_set or ())
+
+
+# --- Full-text search index
+# Rows are queued and re-indexed once per transaction, after it commits.
+
+@receiver(post_save, sender=SchoolDay)
+@receiver(post_delete, sender=SchoolDay)
+def reindex_school_day(sender, instance, **kwargs):
+    reindex_on_commit(day_ids=[instance.id])
+
+
+@receiver(m2m_changed, sender=SchoolDay.subjects.through)
+def reindex_school_day_subjects(sender, instance, action, reverse, pk_set, **kwargs):
+    day_ids = _changed_day_ids(instance, action, reverse, pk_set)
+    if day_ids:
+        reindex_on_commit(day_ids=day_ids)
+
+
+@receiver(post_save, sender=Subject)
+def reindex_renamed_subject_days(sender, instance, created, raw=False, **kwargs):
+    # Day titles are built from subject names
+    if not created and not raw:
+        reindex_on_commit(day_ids=list(instance.school_days.values_list('id', flat=True)))
+
+
+@receiver(pre_delete, sender=Subject)
+def reindex_deleted_subject_days(sender, instance, **kwargs):
+    # The through rows cascade without m2m_changed; the days are re-indexed
+    # once the delete has committed
+    reindex_on_commit(day_ids=list(instance.school_days.values_list('id', flat=True)))
+
+
+@receiver(post_save, sender=GlobalSubject)
+def reindex_global_subject_days(sender, instance, created, raw=False, **kwargs):
+    if not created and not raw:
+        reindex_on_commit(day_ids=list(
+            SchoolDay.objects.filter(subjects__global_subject=instance).values_list('id', flat=True).distinct()
+        ))
+
+
+@receiver(post_save, sender=WorkSample)
+@receiver(post_delete, sender=WorkSample)
+def reindex_work_sample(sender, instance, **kwargs):
+    reindex_on_commit(sample_ids=[instance.id])
+
+
+# --- Year heatmaps
+
+@receiver(post_save, sender=SchoolDay)
+@receiver(post_delete, sender=SchoolDay)
+@receiver(post_save, sender=Student)
+def invalidate_student_heatmaps(sender, instance, **kwargs):
+    # A moved day may also leave its previous student's heatmap stale
+    previous = getattr(instance, '_bitmap_previous', None)
+    if previous and previous[0] != instance.student_id:
+        invalidate_heatmaps(previous[0])
+    invalidate_heatmaps(instance.id if sender is Student else instance.student_id)
+
+
+@receiver(m2m_changed, sender=SchoolDay.subjects.through)
+def invalidate_heatmap_subject_counts(sender, instance, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        # Forward changes come from a SchoolDay, reverse ones from a Subject
+        invalidate_heatmaps(instance.student_id)
+
+
+@receiver(post_save, sender=Subject)
+@receiver(post_delete, sender=Subject)
+def invalidate_subject_heatmaps(sender, instance, **kwargs):
+    # A deleted subject's through rows cascade without m2m_changed
+    invalidate_heatmaps(instance.student_id)
+
+
+@receiver(post_save, sender=GlobalSubject)
+def invalidate_global_subject_heatmaps(sender, instance, created, raw=False, **kwargs):
+    if not created and not raw:
+        invalidate_heatmaps(*Subject.objects.filter(global_subject=instance).values_list(
+            'student_id', flat=True
+        ).distinct())
+
+
+# --- Sync API: change timestamps and tombstones
+
+class _SavedDays(TransactionBatch):
+    """Days saved in the open transaction, whose updated_at auto_now already set."""
+
+    def __init__(self):
+        self.ids = set()
+
+
+@receiver(post_save, sender=SchoolDay)
+def remember_saved_day(sender, instance, **kwargs):
+    batch = _SavedDays.current()
+    if batch is not None:
+        batch.ids.add(instance.pk)
+
+
+@receiver(m2m_changed, sender=SchoolDay.subjects.through)
+def bump_school_day_on_subject_change(sender, instance, action, reverse, pk_set, **kwargs):
+    day_ids = set(_changed_day_ids(instance, action, reverse, pk_set))
+    # A day saved in this transaction commits with its subjects and a fresh updated_at
+    saved = _SavedDays.current()
+    if saved is not None:
+        day_ids -= saved.ids
+    if day_ids:
+        SchoolDay.objects.filter(pk__in=day_ids).update(updated_at=timezone.now())
+
+
+_deleting_users = threading.local()
+
+
+@receiver(pre_delete, sender=User)
+def remember_deleting_user(sender, instance, **kwargs):
+    # Tombstones would point at the user being deleted, and nobody is left to sync
+    if not hasattr(_deleting_users, 'ids'):
+        _deleting_users.ids = set()
+    _deleting_users.ids.add(instance.id)
+
+
+@receiver(post_delete, sender=User)
+def forget_deleting_user(sender, instance, **kwargs):
+    getattr(_deleting_users, 'ids', set()).discard(instance.id)
+
+
+@receiver(post_delete, sender=SchoolDay)
+@receiver(post_delete, sender=Subject)
+@receiver(post_delete, sender=WorkSample)
+def record_sync_tombstone(sender, instance, **kwargs):
+    deleting = getattr(_deleting_users, 'ids', None)
+    if deleting and Student.objects.filter(id=instance.student_id, user_id__in=deleting).exists():
+        return
+    model = {SchoolDay: 'day', Subject: 'subject', WorkSample: 'work_sample'}[sender]
+    record_deletion(model, instance.id, instance.student_id)
+
+
+# --- Change feed
+
+_FEED_MODELS = (SchoolDay, Subject, WorkSample, Grade, Student, Association)
+
+
+def _record_instance_change(instance, action):
+    if isinstance(instance, Student):
+        record_change('student', instance.id, action, student_id=instance.id, user_id=instance.user_id)
+    else:
+        record_change(instance._meta.model_name, instance.id, action,
+                      student_id=getattr(instance, 'student_id', None))
+
+
+@receiver(post_save)
+def record_save_event(sender, instance, created, raw=False, **kwargs):
+    if sender in _FEED_MODELS and not raw:
+        _record_instance_change(instance, 'insert' if created else 'update')
+
+
+@receiver(post_delete)
+def record_delete_event(sender, instance, **kwargs):
+    if sender in _FEED_MODELS:
+        _record_instance_change(instance, 'delete')
+
+
+@receiver(m2m_changed, sender=SchoolDay.subjects.through)
+def record_school_day_subjects_event(sender, instance, action, reverse, pk_set, **kwargs):
+    # A day's subject list is part of the day, so this is an update of the day(s);
+    # the batch folds it into the day's own event when both land in one commit
+    student_id = instance.student_id
+    for day_id in _changed_day_ids(instance, action, reverse, pk_set):
+        record_change('schoolday', day_id, 'update', student_id=student_id)
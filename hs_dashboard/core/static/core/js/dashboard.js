@@ -0,0 +1,43 @@
+function selectAllSubjects(btn) {
+    // Find the container with checkboxes within the same parent group
+    const container = btn.closest('.mb-3').querySelector('.space-y-1');
+    const inputs = container.querySelectorAll('input[type="checkbox"]');
+
+    // Check if all are currently checked
+    const allChecked = Array.from(inputs).every(input => input.checked);
+
+    if (allChecked) {
+        // Deselect all
+        inputs.forEach(input => input.checked = false);
+        btn.textContent = "Select All";
+    } else {
+        // Select all
+        inputs.forEach(input => input.checked = true);
+        btn.textContent = "Deselect All";
+    }
+}
+
+let formToDelete = null;
+
+function showDeleteModal(formId, message) {
+    formToDelete = formId;
+    if (message) {
+        document.getElementById('modal-message').innerText = message;
+    } else {
+        document.getElementById('modal-message').innerText = 'Are you sure you want to delete this item? This action cannot be undone.';
+    }
+    document.getElementById('delete-modal').classList.remove('hidden');
+}
+
+function closeDeleteModal() {
+    formToDelete = null;
+    document.getElementById('delete-modal').classList.add('hidden');
+}
+
+function confirmDelete() {
+    if (formToDelete) {
+        // requestSubmit() lets HTMX-enabled forms handle the submission themselves
+        document.getElementById(formToDelete).requestSubmit();
+    }
+    closeDeleteModal();
+}
@@ -0,0 +1,167 @@
+// Filled from the json_script block the first time the edit modal opens
+let studentSubjectsMap = null;
+
+function openEditDayModal(btn) {
+    const dayId = btn.dataset.id;
+    const studentId = btn.dataset.studentId;
+    const date = btn.dataset.date;
+    const notes = btn.dataset.notes;
+    const subjects = JSON.parse(btn.dataset.subjects || '[]');
+
+    editDay(dayId, studentId, date, notes, subjects);
+}
+
+function editDay(dayId, studentId, date, notes, completedSubjects) {
+    document.getElementById('edit_day_id').value = dayId;
+    document.getElementById('edit_student_id').value = studentId;
+    document.getElementById('edit_day_date').value = date;
+    document.getElementById('edit_day_notes').value = notes || '';
+
+    // completedSubjects is already a JavaScript array from the template
+    const completed = Array.isArray(completedSubjects) ? completedSubjects : [];
+
+    // Populate Subjects Checkboxes
+    const container = document.getElementById('edit_subjects_container');
+    container.innerHTML = ''; // Clear previous
+
+    if (studentSubjectsMap === null) {
+        studentSubjectsMap = JSON.parse(document.getElementById('student-subjects-data').textContent);
+    }
+    const availableSubjects = studentSubjectsMap[studentId] || [];
+
+    if (availableSubjects.length === 0) {
+        container.innerHTML = '<span class="text-gray-500 italic text-xs">No subjects found for this student.</span>';
+    } else {
+        availableSubjects.forEach(subject => {
+            const div = document.createElement('div');
+            div.className = 'flex items-center space-x-2';
+
+            const checkbox = document.createElement('input');
+            checkbox.type = 'checkbox';
+            checkbox.name = 'subjects_completed';
+            checkbox.value = subject;
+            checkbox.className = 'form-checkbox h-4 w-4 text-blue-600 rounded focus:ring-blue-500 border-gray-300';
+
+            if (completed.includes(subject)) {
+                checkbox.checked = true;
+            }
+
+            const label = document.createElement('label');
+            label.textContent = subject;
+            label.className = 'text-gray-700';
+
+            div.appendChild(checkbox);
+            div.appendChild(label);
+            container.appendChild(div);
+        });
+    }
+
+    document.getElementById('edit-day-modal').classList.remove('hidden');
+}
+
+function closeEditDayModal() {
+    document.getElementById('edit-day-modal').classList.add('hidden');
+}
+
+function toggleNote(id) {
+    const textDiv = document.getElementById(`note-text-${id}`);
+    const btn = document.getElementById(`note-toggle-${id}`);
+
+    if (textDiv.classList.contains('line-clamp-2')) {
+        textDiv.classList.remove('line-clamp-2');
+        btn.textContent = 'Show less';
+    } else {
+        textDiv.classList.add('line-clamp-2');
+        btn.textContent = 'Show more';
+    }
+}
+
+// Calendar Popover Logic
+function toggleDayPopover(event, popoverId) {
+    event.stopPropagation();
+    const targetPopover = document.getElementById(popoverId);
+
+    // If target is missing (e.g. unlogged day), do nothing
+    if (!targetPopover) return;
+
+    // Close all other popovers
+    const allPopovers = document.querySelectorAll('.day-popover');
+    allPopovers.forEach(p => {
+        if (p.id !== popoverId) {
+            p.classList.add('hidden');
+        }
+    });
+
+    // Toggle target
+    targetPopover.classList.toggle('hidden');
+}
+
+// Close popovers on click outside
+document.addEventListener('click', function (event) {
+    const allPopovers = document.querySelectorAll('.day-popover');
+    allPopovers.forEach(p => {
+        p.classList.add('hidden');
+    });
+});
+
+function toggleHistory() {
+    const extraItems = document.querySelectorAll('.extra-history-item');
+    const btn = document.getElementById('history-toggle-btn');
+
+    extraItems.forEach(item => {
+        item.classList.toggle('hidden');
+    });
+
+    if (btn.innerText.includes('Show All')) {
+        btn.innerText = 'Show Less';
+    } else {
+        btn.innerText = 'Show All History';
+    }
+}
+
+function updateTermOptions(studentId) {
+    const termSelect = document.getElementById('report-card-term-select');
+    const studentSelect = document.getElementById('report-card-student-select');
+    const selectedOption = studentSelect.options[studentSelect.selectedIndex];
+    const gradingSystem = selectedOption.getAttribute('data-grading-system') || 'quarters';
+    const termLabel = document.getElementById('report-card-term-label');
+
+    termSelect.innerHTML = '';
+
+    if (gradingSystem === 'semesters') {
+        termLabel.innerText = 'Semester';
+        termSelect.innerHTML = `
+            <option value="Fall">Fall</option>
+            <option value="Spring">Spring</option>
+        `;
+    } else {
+        termLabel.innerText = 'Term';
+        termSelect.innerHTML = `
+            <option value="Q1">Quarter 1</option>
+            <option value="Q2">Quarter 2</option>
+            <option value="Q3">Quarter 3</option>
+            <option value="Q4">Quarter 4</option>
+        `;
+    }
+}
+
+function submitReportCard() {
+    const studentId = document.getElementById('report-card-student-select').value;
+    const form = document.getElementById('report-card-form');
+    form.action = '/gradebook/' + studentId + '/';
+    document.getElementById('report-card-modal').classList.add('hidden');
+}
+
+function submitExport() {
+    const form = document.getElementById('export-data-form');
+    form.action = document.getElementById('export-dataset-select').value;
+    document.getElementById('export-data-modal').classList.add('hidden');
+}
+
+// Initialize term options on page load
+document.addEventListener('DOMContentLoaded', function () {
+    const studentSelect = document.getElementById('report-card-student-select');
+    if (studentSelect && studentSelect.value) {
+        updateTermOptions(studentSelect.value);
+    }
+});
@@ -0,0 +1,97 @@
+function toggleHistory() {
+    const container = document.getElementById('history-container');
+    const summary = document.getElementById('history-summary');
+    const btn = document.getElementById('toggle-history-btn');
+
+    if (container.style.display === 'none') {
+        container.style.display = 'block';
+        if (summary) summary.style.display = 'none';
+        btn.innerText = 'Collapse';
+    } else {
+        container.style.display = 'none';
+        if (summary) summary.style.display = 'block';
+        btn.innerText = 'Expand';
+    }
+}
+
+// Student Form Functions
+function toggleCustomGrade() {
+    const select = document.getElementById('grade_level');
+    const container = document.getElementById('custom_grade_container');
+    if (select.value === 'Other') {
+        container.style.display = 'block';
+    } else {
+        container.style.display = 'none';
+    }
+}
+
+function toggleInlineCustomGrade(studentId) {
+    const select = document.getElementById('grade_level_' + studentId);
+    const container = document.getElementById('custom_grade_container_' + studentId);
+    if (select.value === 'Other') {
+        container.style.display = 'block';
+    } else {
+        container.style.display = 'none';
+    }
+}
+
+function openEditStudentModal(button) {
+    const id = button.dataset.id;
+    const name = button.dataset.name;
+    const grade = button.dataset.grade;
+    const customGrade = button.dataset.customGrade;
+    const gradingSystem = button.dataset.gradingSystem;
+    const startYear = button.dataset.start;
+    const endYear = button.dataset.end;
+
+    document.getElementById('student_id').value = id; // Fixed ID map
+    document.getElementById('name').value = name;
+    document.getElementById('grade_level').value = grade;
+    document.getElementById('custom_grade_level').value = customGrade;
+    document.getElementById('grading_system').value = gradingSystem || 'quarters';
+    document.getElementById('academic_year_start_month').value = startYear || '8';
+    document.getElementById('academic_year_end_month').value = endYear || '7';
+
+    document.getElementById('form-title').innerText = 'Edit Student';
+    document.getElementById('submit-btn').innerText = 'Save Changes';
+
+    toggleCustomGrade();
+}
+
+function resetForm() {
+    document.getElementById('form-title').innerText = 'Add New Student';
+    document.getElementById('submit-btn').innerText = 'Add Student';
+    document.getElementById('student_id').value = '';
+    document.getElementById('name').value = '';
+    document.getElementById('grade_level').value = '1st Grade';
+    document.getElementById('custom_grade_level').value = '';
+    document.getElementById('grading_system').value = 'quarters';
+    document.getElementById('academic_year_start_month').value = '8';
+    document.getElementById('academic_year_end_month').value = '7';
+    toggleCustomGrade();
+}
+
+function manageSubjects(studentId, studentName) {
+    const row = document.getElementById('subjects-row-' + studentId);
+    if (row.style.display === 'none') {
+        row.style.display = 'table-row';
+    } else {
+        row.style.display = 'none';
+    }
+}
+
+
+
+// Global Subject Toggle
+function toggleCustomSubject(studentId) {
+    const select = document.getElementById('subject_select_' + studentId);
+    const customInput = document.getElementById('custom_subject_' + studentId);
+    if (select.value === 'custom') {
+        customInput.style.display = 'inline-block';
+        customInput.required = true;
+    } else {
+        customInput.style.display = 'none';
+        customInput.required = false;
+        customInput.value = '';
+    }
+}
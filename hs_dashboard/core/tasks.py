@@ -1,26 +1,55 @@
 from celery import shared_task
-from .services.pdf_service import prepare_compliance_data
-from .utils import generate_pdf_bytes
+from django.conf import settings
+from django.db import OperationalError
+
+from .services.pdf_service import prepare_compliance_data, render_compliance_pdf
 from .models import Student
-from datetime import date
-import base64
+from .telemetry import InstrumentedTask
 
-@shared_task
+@shared_task(
+    base=InstrumentedTask,
+    # A render stuck in xhtml2pdf is interrupted, then killed
+    soft_time_limit=settings.REPORT_TASK_SOFT_TIME_LIMIT,
+    time_limit=settings.REPORT_TASK_TIME_LIMIT,
+    # A locked database is worth retrying; a broken report is not
+    autoretry_for=(OperationalError,),
+    retry_backoff=True,
+    max_retries=3,
+)
 def async_generate_report(student_id, start_date_str=None, end_date_str=None):
     """
     Task to generate the compliance report.
-    Returns the PDF content as a bytes object.
+    Returns the PDF content as a bytes object. Errors propagate to the caller
+    and are recorded by InstrumentedTask.
+    """
+    # The report reads the family's association; load it with the student
+    student = Student.objects.select_related('user__profile__association').get(id=student_id)
+    context = prepare_compliance_data(student, start_date_str, end_date_str)
+    return render_compliance_pdf(context)
+
+@shared_task(base=InstrumentedTask)
+def refresh_association_rollups(force=False):
+    """
+    Periodic task: refreshes director rollups for every association.
+    Only students with changed data are recomputed unless `force` is set.
     """
-    try:
-        student = Student.objects.get(id=student_id)
-        
-        context = prepare_compliance_data(student, start_date_str, end_date_str)
-        
-        # Use the HTML template for styling
-        pdf_content = generate_pdf_bytes('pdfs/attendance_report.html', context)
-        
-        return pdf_content
-    except Exception as e:
-        # Log error
-        print(f"Error generating report: {e}")
-        return None
+    from .services.analytics import refresh_all_associations
+    return refresh_all_associations(force=force)
+
+@shared_task(base=InstrumentedTask)
+def prune_sync_records():
+    """Periodic task: drops expired sync receipts and tombstones."""
+    from .services.sync_service import prune_sync_records
+    return prune_sync_records()
+
+@shared_task(base=InstrumentedTask)
+def prune_change_events():
+    """Periodic task: drops change events past the feed's retention."""
+    from .services.change_feed import prune_change_events
+    return prune_change_events()
+
+@shared_task(base=InstrumentedTask)
+def send_weekly_digests():
+    """Periodic task: emails families their weekly missing-work digest."""
+    from .services.digest_service import send_weekly_digests
+    return send_weekly_digests()
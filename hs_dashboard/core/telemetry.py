@@ -0,0 +1,96 @@
+import logging
+import resource
+import sys
+import time
+
+from billiard.exceptions import WorkerLostError
+from celery import Task
+from celery.exceptions import Retry, TimeLimitExceeded
+from celery.signals import task_failure
+
+from core.services.metrics import TASK_FAILURES, TASK_RSS_BYTES, TASK_RSS_GROWTH_BYTES, TASK_SECONDS
+
+logger = logging.getLogger('core.tasks')
+
+# ru_maxrss is in kilobytes on Linux and bytes on macOS
+_MAXRSS_UNIT = 1 if sys.platform == 'darwin' else 1024
+
+
+def _peak_rss():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * _MAXRSS_UNIT
+
+
+def _current_rss():
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * resource.getpagesize()
+    except OSError:
+        return _peak_rss()
+
+
+class InstrumentedTask(Task):
+    """
+    Base class for the app's tasks: records run time, memory and failures in
+    the shared metrics and logs one structured line per run.
+
+    Runs whether the task is executed by a worker or called directly, as
+    download_report does.
+    """
+
+    def __call__(self, *args, **kwargs):
+        task_id = getattr(self.request, 'id', None)
+        peak_before = _peak_rss()
+        start = time.perf_counter()
+        outcome = 'success'
+        exception = None
+        try:
+            return super().__call__(*args, **kwargs)
+        except Retry:
+            outcome = 'retry'
+            raise
+        except Exception as exc:
+            outcome = 'failure'
+            exception = type(exc).__name__
+            raise
+        finally:
+            duration = time.perf_counter() - start
+            rss = _current_rss()
+            growth = max(0, _peak_rss() - peak_before)
+            try:
+                TASK_SECONDS.observe(duration, task=self.name, outcome=outcome)
+                TASK_RSS_BYTES.observe(rss, task=self.name)
+                TASK_RSS_GROWTH_BYTES.observe(growth, task=self.name)
+                if exception:
+                    TASK_FAILURES.inc(task=self.name, exception=exception)
+            except Exception:
+                # Metrics must never fail the task itself
+                logger.exception("task.metrics_failed task=%s", self.name)
+
+            level = logging.INFO if outcome == 'success' else logging.WARNING
+            logger.log(
+                level,
+                "task.finished task=%s id=%s outcome=%s exception=%s duration_ms=%.1f rss_kb=%d rss_growth_kb=%d",
+                self.name, task_id, outcome, exception or '-', duration * 1000, rss // 1024, growth // 1024,
+                exc_info=outcome == 'failure',
+                extra={
+                    'task': self.name, 'task_id': task_id, 'outcome': outcome, 'exception': exception,
+                    'duration_ms': round(duration * 1000, 1), 'rss_bytes': rss, 'rss_growth_bytes': growth,
+                },
+            )
+
+
+@task_failure.connect
+def record_lost_task(sender=None, task_id=None, exception=None, **kwargs):
+    """
+    Counts runs that died outside the task body (hard time limit, killed or
+    recycled child). The worker's main process reports these; failures raised
+    inside the task are already counted by InstrumentedTask.
+    """
+    if not isinstance(exception, (TimeLimitExceeded, WorkerLostError)):
+        return
+    name = getattr(sender, 'name', str(sender))
+    TASK_FAILURES.inc(task=name, exception=type(exception).__name__)
+    logger.error(
+        "task.lost task=%s id=%s exception=%s", name, task_id, type(exception).__name__,
+        extra={'task': name, 'task_id': task_id, 'outcome': 'lost', 'exception': type(exception).__name__},
+    )
@@ -1,9 +1,14 @@
 from django.urls import path
-from .views import dashboard, settings_view, portfolio_view, log_school_day, bulk_log_school_day, delete_school_day, delete_student, download_report, upload_work_sample, delete_work_sample, update_family_settings, add_edit_student, add_subject, delete_subject, add_edit_school_day, initialize_subjects, download_portfolio, save_grade, gradebook_view
+from .views import dashboard, student_card, settings_view, portfolio_view, log_school_day, bulk_log_school_day, delete_school_day, delete_student, download_report, upload_work_sample, delete_work_sample, update_family_settings, add_edit_student, add_subject, delete_subject, add_edit_school_day, initialize_subjects, download_portfolio, save_grade, gradebook_view, family_gradebook_view, export_data, portfolio_calendar, portfolio_history, day_detail, student_heatmap, director_dashboard, search_view, sync_upload, sync_changes, metrics
 
 urlpatterns = [
     path('', dashboard, name='dashboard'),
+    path('student/<int:student_id>/card/', student_card, name='student_card'),
     path('portfolio/', portfolio_view, name='portfolio'),
+    path('portfolio/calendar/', portfolio_calendar, name='portfolio_calendar'),
+    path('portfolio/history/', portfolio_history, name='portfolio_history'),
+    path('portfolio/day/', day_detail, name='day_detail'),
+    path('student/<int:student_id>/heatmap/', student_heatmap, name='student_heatmap'),
     path('settings/', settings_view, name='settings'),
     path('log_school_day', log_school_day, name='log_school_day'),
     path('bulk_log_school_day/', bulk_log_school_day, name='bulk_log_school_day'),
@@ -20,5 +25,13 @@ urlpatterns = [
     path('settings/family/', update_family_settings, name='update_family_settings'),
     path('day/add_edit/', add_edit_school_day, name='add_edit_school_day'),
     path('save_grade/', save_grade, name='save_grade'),
+    path('gradebook/', family_gradebook_view, name='family_gradebook'),
     path('gradebook/<int:student_id>/', gradebook_view, name='gradebook'),
+    path('export/<str:dataset>/', export_data, name='export_data'),
+    path('search/', search_view, name='search'),
+    path('api/sync/days/', sync_upload, name='sync_upload'),
+    path('api/sync/changes/', sync_changes, name='sync_changes'),
+    path('director/', director_dashboard, name='director_dashboard'),
+    path('director/<int:association_id>/', director_dashboard, name='director_association'),
+    path('metrics', metrics, name='metrics'),
 ]
@@ -2,6 +2,8 @@ from django.template.loader import get_template
 from django.http import HttpResponse
 from io import BytesIO
 
+from .models import GlobalSubject, Subject, normalize_subject_name
+
 def get_required_subjects(grade_level):
     """
     Returns a list of required subjects based on the student's grade level.
@@ -23,6 +25,33 @@ def get_required_subjects(grade_level):
     # Default to elementary for 1st-6th, Kindergarten, and others
     return elementary_subjects
 
+def resolve_subject(student, name=None, global_subject=None):
+    """
+    Returns the student's subject matching `name` (or `global_subject`), creating it if needed.
+
+    Names are matched on the normalised name_key, so "math " and "Math" resolve to the
+    same row. New subjects link to a GlobalSubject when one matches. Creation relies on
+    the (student, name_key) unique constraint, so concurrent requests cannot create
+    duplicates.
+    """
+    key = global_subject.name_key if global_subject else normalize_subject_name(name)
+    subject = Subject.objects.filter(student=student, name_key=key).first()
+    if subject:
+        return subject
+
+    if global_subject is None:
+        global_subject = GlobalSubject.objects.filter(name_key=key).first()
+
+    subject, _ = Subject.objects.get_or_create(
+        student=student,
+        name_key=key,
+        defaults={
+            'global_subject': global_subject,
+            'name': None if global_subject else ' '.join(name.split()),
+        },
+    )
+    return subject
+
 def generate_pdf_bytes(template_src, context_dict={}):
     """Generates PDF bytes from a template and context."""
     from xhtml2pdf import pisa
@@ -0,0 +1,124 @@
+import hashlib
+from datetime import datetime, time
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.db import transaction
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+from .batching import TransactionBatch
+from .models import FamilyProfile, Student
+
+class _FamilyBatch(TransactionBatch):
+    """Families touched inside the current transaction."""
+
+    def __init__(self):
+        self.user_ids = set()
+        self.student_ids = set()
+
+    def flush(self):
+        user_ids = set(self.user_ids)
+        if self.student_ids:
+            # Students deleted in the same transaction report their own user_id
+            user_ids.update(Student.objects.filter(id__in=self.student_ids).values_list('user_id', flat=True))
+        if user_ids:
+            FamilyProfile.objects.filter(user_id__in=user_ids).update(data_version=timezone.now())
+
+
+def touch_family(user_id=None, student_id=None):
+    """
+    Marks a family's data as changed.
+
+    Calls are collected and flushed once when the surrounding transaction
+    commits, so a cascade delete of hundreds of rows costs a single UPDATE.
+    Outside a transaction the change is written immediately.
+    """
+    batch = _FamilyBatch.current() or _FamilyBatch()
+
+    if user_id:
+        batch.user_ids.add(user_id)
+    if student_id:
+        batch.student_ids.add(student_id)
+
+    if not transaction.get_connection().in_atomic_block:
+        batch.flush()
+
+
+def _conditional_validators(request, view_name):
+    """Returns (etag, last_modified) for the request, or None when the family has no profile."""
+    # The profile is shared with the view through request.family
+    profile = request.family.profile
+    if profile is None:
+        return None
+    version = profile.data_version
+
+    today = timezone.localdate()
+    etag = quote_etag(hashlib.md5('|'.join([
+        view_name,
+        str(request.user.pk),
+        version.isoformat(),
+        today.isoformat(),
+        request.get_full_path(),
+        request.headers.get('HX-Request', ''),
+        request.headers.get('HX-Target', ''),
+        request.COOKIES.get('csrftoken', ''),
+    ]).encode()).hexdigest())
+    start_of_today = timezone.make_aware(datetime.combine(today, time.min))
+    return etag, int(max(version, start_of_today).timestamp())
+
+
+def _patch_conditional_response(response, etag, last_modified):
+    if response.status_code in (200, 304):
+        response.headers.setdefault('ETag', etag)
+        response.headers.setdefault('Last-Modified', http_date(last_modified))
+        # Browsers must revalidate every time; the 304 is what saves the work
+        patch_cache_control(response, private=True, no_cache=True)
+        patch_vary_headers(response, ('Cookie', 'HX-Request'))
+    return response
+
+
+def family_conditional(view_func):
+    """
+    Adds ETag/Last-Modified handling driven by the family's data_version.
+
+    Matching GET/HEAD requests get a 304 before the view runs, so none of its
+    queries or templates are touched. The ETag also covers the URL, the HTMX
+    request headers, today's date (pages depend on it) and the CSRF cookie
+    embedded in rendered forms. Works on sync and async views.
+    """
+    if iscoroutinefunction(view_func):
+        @wraps(view_func)
+        async def _async_wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return await view_func(request, *args, **kwargs)
+
+            validators = await sync_to_async(_conditional_validators)(request, view_func.__name__)
+            if validators is None:
+                return await view_func(request, *args, **kwargs)
+
+            etag, last_modified = validators
+            response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+            if response is None:
+                response = await view_func(request, *args, **kwargs)
+            return _patch_conditional_response(response, etag, last_modified)
+
+        return _async_wrapper
+
+    @wraps(view_func)
+    def _wrapper(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return view_func(request, *args, **kwargs)
+
+        validators = _conditional_validators(request, view_func.__name__)
+        if validators is None:
+            return view_func(request, *args, **kwargs)
+
+        etag, last_modified = validators
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = view_func(request, *args, **kwargs)
+        return _patch_conditional_response(response, etag, last_modified)
+
+    return _wrapper
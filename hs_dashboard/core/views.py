@@ -1,24 +1,148 @@
+from django.conf import settings
 from django.shortcuts import render, redirect, get_object_or_404
+from django.template.loader import render_to_string
 from django.contrib.auth.decorators import login_required
 from django.utils import timezone
+from django.utils.crypto import constant_time_compare
 from datetime import date
-from .models import Student, SchoolDay, Subject, WorkSample, GlobalSubject, Grade
-from django.db.models import Count, Prefetch
-from django.http import HttpResponse, FileResponse
-from django.db import IntegrityError
+import json
+from .models import Association, Student, SchoolDay, Subject, WorkSample, GlobalSubject, Grade
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse, Http404
+from django.db import IntegrityError, transaction
+from django.views.decorators.http import require_POST
 
-from .utils import get_required_subjects, render_to_pdf
+from .utils import get_required_subjects, generate_pdf_bytes, resolve_subject
 
 from django.utils.text import slugify
 
 # PDF Imports
 
 from core.services.pdf_service import prepare_compliance_data
+from core.versioning import family_conditional
+from core.async_utils import async_login_required, gather_queries
+from core.services.export_service import EXPORT_COLUMNS, EXPORT_FORMATS, iter_export_rows, stream_csv, stream_ndjson
+from core.services.attendance_bitmap import attended_dates_in_month, load_years, student_years, total_days
+from core.services.analytics import association_overview, refresh_association
+from core.services.gradebook import build_family_gradebook, family_gradebook, overlay_scores, save_family_grades
+from core.services.heatmap import year_heatmap
+from core.services.search_service import search
+from core.services.sync_service import SyncError, apply_day_logs, changes_since
+from core.services.single_flight import single_flight
+from core.services.media_service import can_access, clean_media_path, serve_media
+from core.services.metrics import render_metrics
 
-@login_required
-def portfolio_view(request):
+def _requested_month(request, month_key='month', year_key='year'):
+    """Returns the (year, month) asked for in the query/form, defaulting to today."""
+    today = timezone.now().date()
+    try:
+        year = int(request.GET.get(year_key) or request.POST.get(year_key) or today.year)
+        month = int(request.GET.get(month_key) or request.POST.get(month_key) or today.month)
+    except (ValueError, TypeError):
+        return today.year, today.month
+    if not 1 <= month <= 12:
+        return today.year, today.month
+    return year, month
+
+
+def _calendar_context(family, year, month):
+    """Context for the attendance month grid (partials/calendar_month.html)."""
+    import calendar
+
+    cal = calendar.monthcalendar(year, month)
+
+    # Calculate previous and next month/year
+    if month == 1:
+        prev_month, prev_year = 12, year - 1
+    else:
+        prev_month, prev_year = month - 1, year
+    if month == 12:
+        next_month, next_year = 1, year + 1
+    else:
+        next_month, next_year = month + 1, year
+
+    # Day details are loaded on demand, so only the dates are needed here
+    logged_dates = set()
+    for years in load_years(family.student_ids).values():
+        logged_dates |= attended_dates_in_month(years, year, month)
+
+    work_sample_dates = set(WorkSample.objects.filter(
+        student_id__in=family.student_ids,
+        date_uploaded__year=year,
+        date_uploaded__month=month
+    ).values_list('date_uploaded', flat=True))
+
+    calendar_weeks = []
+    for week in cal:
+        week_data = []
+        for day in week:
+            if day == 0:
+                week_data.append({'day': 0, 'is_logged': False, 'has_sample': False})
+            else:
+                date_obj = date(year, month, day)
+                week_data.append({
+                    'day': day,
+                    'date': date_obj,
+                    'is_logged': date_obj in logged_dates,
+                    'has_sample': date_obj in work_sample_dates,
+                })
+        calendar_weeks.append(week_data)
+
+    return {
+        'calendar_weeks': calendar_weeks,
+        'current_month_name': calendar.month_name[month],
+        'current_month': month,
+        'current_year': year,
+        'prev_month': prev_month,
+        'prev_year': prev_year,
+        'next_month': next_month,
+        'next_year': next_year,
+    }
+
+
+def _history_context(user):
+    """Context for the recent attendance list (partials/history_list.html)."""
+    school_days = SchoolDay.objects.filter(student__user=user).select_related('student').prefetch_related(
+        'subjects', 'subjects__global_subject'
+    ).order_by('-date', '-created_at')[:50]
+    return {'school_days': school_days}
+
+
+def _attendance_changed_response(request):
+    """
+    HTMX response after a day is added, edited or deleted on the portfolio page:
+    the refreshed history list plus the displayed calendar month swapped out-of-band.
+    """
+    year, month = _requested_month(request, 'cal_month', 'cal_year')
+    html = render_to_string('core/partials/history_list.html', _history_context(request.user), request)
+    html += render_to_string(
+        'core/partials/calendar_month.html',
+        {**_calendar_context(request.family, year, month), 'oob': True},
+        request,
+    )
+    return HttpResponse(html)
+
+
+def _students_with_subjects(students):
+    """Sets the settings-row count helpers on students with prefetched subjects."""
+    for student in students:
+        student.subject_count = len(student.subjects.all())
+        student.has_subjects = student.subject_count > 0
+    return students
+
+
+def _month_choices():
+    import calendar as cal_module
+    return [(i, cal_module.month_name[i]) for i in range(1, 13)]
+
+
+@async_login_required
+@family_conditional
+async def portfolio_view(request):
+    family = request.family
+    
     # 1. Base Query
-    work_samples = WorkSample.objects.filter(student__user=request.user)
+    work_samples = WorkSample.objects.filter(student__user=request.user).select_related('student')
     
     # 2. Filtering
     sample_year = request.GET.get('sample_year')
@@ -39,99 +163,28 @@ def portfolio_view(request):
     # 3. Sorting (Student -> Subject -> Date Descending)
     work_samples = work_samples.order_by('student__name', 'subject', '-date_uploaded')
 
-    # 4. Get available years for filter dropdown
-    available_years = sorted(set(
-        WorkSample.objects.filter(student__user=request.user)
-        .dates('date_uploaded', 'year')
-        .values_list('date_uploaded__year', flat=True)
-    ), reverse=True)
-
-    # ... (Rest of existing code: Attendance History fetching)
-    school_days = SchoolDay.objects.filter(student__user=request.user).select_related('student').prefetch_related('subjects').order_by('-date', '-created_at')[:50]
-
-    # 3. Calendar Logic
     import calendar
-    from datetime import date
-    
+
     today = timezone.now().date()
-    
-    # Get month and year from request, default to today
-    try:
-        year = int(request.GET.get('year', today.year))
-        month = int(request.GET.get('month', today.month))
-    except (ValueError, TypeError):
-        year = today.year
-        month = today.month
-        
-    cal = calendar.monthcalendar(year, month)
-    month_name = calendar.month_name[month]
-    
-    # Calculate previous and next month/year
-    if month == 1:
-        prev_month = 12
-        prev_year = year - 1
-    else:
-        prev_month = month - 1
-        prev_year = year
-        
-    if month == 12:
-        next_month = 1
-        next_year = year + 1
-    else:
-        next_month = month + 1
-        next_year = year
+    year, month = _requested_month(request)
 
-    # Get all days with attendance for this user in this month
-    monthly_logs = SchoolDay.objects.filter(
-        student__user=request.user,
-        date__year=year,
-        date__month=month
-    ).select_related('student').prefetch_related('subjects')
-
-    # Organize logs by day
-    logs_by_date = {}
-    for log in monthly_logs:
-        date_obj = log.date
-        if date_obj not in logs_by_date:
-            logs_by_date[date_obj] = []
-        
-        logs_by_date[date_obj].append({
-            'student': log.student.name,
-            'subjects': [s.display_name for s in log.subjects.all()], 
-            'notes': log.notes
-        })
-    
-    calendar_weeks = []
-    # Get dates with work samples for this month
-    work_sample_dates = set(
-        WorkSample.objects.filter(
-            student__user=request.user,
-            date_uploaded__year=year,
-            date_uploaded__month=month
-        ).values_list('date_uploaded', flat=True)
+    # 4. The page's independent queries run concurrently
+    results = await gather_queries(
+        work_samples=lambda: list(work_samples),
+        # Available years for filter dropdown
+        available_years=lambda: sorted(set(
+            WorkSample.objects.filter(student__user=request.user)
+            .dates('date_uploaded', 'year')
+            .values_list('date_uploaded__year', flat=True)
+        ), reverse=True),
+        history=lambda: {'school_days': list(_history_context(request.user)['school_days'])},
+        calendar=lambda: _calendar_context(family, year, month),
+        # Subjects for all students to populate edit modal
+        students=lambda: family.students,
     )
+    available_years = results['available_years']
+    all_students = results['students']
 
-    for week in cal:
-        week_data = []
-        for day in week:
-            if day == 0:
-                week_data.append({'day': 0, 'is_logged': False, 'logs': [], 'has_sample': False})
-            else:
-                date_obj = date(year, month, day)
-                logs = logs_by_date.get(date_obj, [])
-                is_logged = len(logs) > 0
-                has_sample = date_obj in work_sample_dates
-                
-                week_data.append({
-                    'day': day, 
-                    'is_logged': is_logged,
-                    'logs': logs,
-                    'has_sample': has_sample
-                })
-        calendar_weeks.append(week_data)
-
-    # Get subjects for all students to populate edit modal
-    all_students = Student.objects.filter(user=request.user).prefetch_related('subjects')
     student_subjects_map = {}
     for student in all_students:
         # Get DB subjects
@@ -167,17 +220,12 @@ def portfolio_view(request):
             'selected': m == selected_month_val
         })
 
-    return render(request, 'core/portfolio.html', {
-        'work_samples': work_samples,
-        'school_days': school_days,
-        'calendar_weeks': calendar_weeks,
-        'current_month_name': month_name,
-        'current_year': year,
+    # Everything is loaded; rendering still runs in the sync thread (templates, csrf, messages)
+    return await sync_to_async(render)(request, 'core/portfolio.html', {
+        'work_samples': results['work_samples'],
+        **results['history'],
+        **results['calendar'],
         'current_date': today,
-        'prev_month': prev_month,
-        'prev_year': prev_year,
-        'next_month': next_month,
-        'next_year': next_year,
         # Filter Context (Pre-calculated)
         'year_options': year_options,
         'month_options': month_options,
@@ -188,21 +236,68 @@ def portfolio_view(request):
     })
 
 @login_required
+@family_conditional
+def portfolio_calendar(request):
+    """HTMX: a single month of the attendance calendar."""
+    year, month = _requested_month(request)
+    return render(request, 'core/partials/calendar_month.html', _calendar_context(request.family, year, month))
+
+@login_required
+@family_conditional
+def portfolio_history(request):
+    """HTMX: the recent attendance list."""
+    return render(request, 'core/partials/history_list.html', _history_context(request.user))
+
+@login_required
+@family_conditional
+def day_detail(request):
+    """HTMX: popover contents for one calendar day, loaded when it is clicked."""
+    try:
+        day_date = date.fromisoformat(request.GET.get('date', ''))
+    except ValueError:
+        return HttpResponse("Invalid date", status=400)
+
+    school_days = SchoolDay.objects.filter(
+        student__user=request.user,
+        date=day_date
+    ).select_related('student').prefetch_related('subjects', 'subjects__global_subject').order_by('student__name')
+    return render(request, 'core/partials/day_popover.html', {'school_days': school_days})
+
+@login_required
+@family_conditional
+def student_heatmap(request, student_id):
+    """
+    JSON: a whole academic year of attendance for one student, for the year
+    heatmap. ?year= selects the year by its starting calendar year.
+    """
+    student = get_object_or_404(Student, id=student_id, user=request.user)
+    try:
+        year = int(request.GET['year']) if request.GET.get('year') else None
+    except ValueError:
+        year = 0
+    if year is not None and not 1900 <= year <= 2999:
+        return JsonResponse({'error': 'Invalid year'}, status=400)
+    return JsonResponse(year_heatmap(student, year))
+
+@login_required
+@transaction.atomic
 def update_family_settings(request):
     if request.method == 'POST':
         association_id = request.POST.get('association_id')
-        profile = request.user.profile
-        from .models import Association
+        profile = request.family.profile
         
         if association_id:
             assoc = get_object_or_404(Association, id=association_id)
             profile.association = assoc
         else:
             profile.association = None
+        profile.weekly_digest = bool(request.POST.get('weekly_digest'))
+        profile.data_version = timezone.now()
         profile.save()
     return redirect('settings')
 
 @login_required
+@transaction.atomic
 def add_edit_student(request):
     if request.method == 'POST':
         name = request.POST.get('name')
@@ -241,26 +336,50 @@ def add_edit_student(request):
             if academic_year_end_month:
                 student.academic_year_end_month = int(academic_year_end_month)
             student.save()
-    
-    # HTMX: Return updated student list
-    students = Student.objects.filter(user=request.user).annotate(subject_count=Count('subjects'))
-    for student in students:
-        student.has_subjects = student.subject_count > 0
-        
-    global_subjects = GlobalSubject.objects.all()
-    
-    # Month choices for dropdowns
-    import calendar as cal_module
-    months = [(i, cal_module.month_name[i]) for i in range(1, 13)]
-    
-    return render(request, 'core/partials/student_list.html', {
-        'students': students,
+
+            # HTMX: Append the new row and update the dependent widgets out-of-band
+            return _student_row_response(request, student, created=True)
+
+        # HTMX: Replace only the edited row
+        return _student_row_response(request, student)
+
+    return redirect('settings')
+
+
+def _student_row_response(request, student, created=False):
+    student = _students_with_subjects(
+        Student.objects.filter(id=student.id).prefetch_related('subjects', 'subjects__global_subject')
+    )[0]
+    context = {
+        'student': student,
         'grade_choices': Student.GRADE_CHOICES,
-        'global_subjects': global_subjects,
-        'months': months,
-    })
+        'global_subjects': GlobalSubject.objects.all(),
+        'months': _month_choices(),
+    }
+    html = render_to_string('core/partials/student_row.html', context, request)
+    if created:
+        html += _student_count_oob(request)
+    response = HttpResponse(html)
+    # The shared add/edit form can't know which it is, so the server picks the target
+    if created:
+        response['HX-Retarget'] = '#student-table'
+        response['HX-Reswap'] = 'beforeend'
+    else:
+        response['HX-Retarget'] = f'#student-{student.id}'
+        response['HX-Reswap'] = 'outerHTML'
+    return response
+
+
+def _student_count_oob(request):
+    """Out-of-band updates for the student count badge and empty-list message."""
+    context = {'student_count': Student.objects.filter(user=request.user).count(), 'oob': True}
+    return (
+        render_to_string('core/partials/student_count.html', context, request)
+        + render_to_string('core/partials/student_empty.html', context, request)
+    )
 
 @login_required
+@transaction.atomic
 def add_subject(request):
     if request.method == 'POST':
         student_id = request.POST.get('student_id')
@@ -270,24 +389,14 @@ def add_subject(request):
         student = get_object_or_404(Student, id=student_id, user=request.user)
         
         if global_subject_id and global_subject_id != 'custom':
-            # Check if student already has this global subject
-            exists = Subject.objects.filter(
-                student=student, 
-                global_subject_id=global_subject_id
-            ).exists()
-            if not exists:
-                Subject.objects.create(student=student, global_subject_id=global_subject_id)
+            global_subj = get_object_or_404(GlobalSubject, id=global_subject_id)
+            resolve_subject(student, global_subject=global_subj)
         elif custom_name:
-            # Check for existing custom subject with same name
-            exists = Subject.objects.filter(
-                student=student,
-                name__iexact=custom_name
-            ).exists()
-            if not exists:
-                Subject.objects.create(student=student, name=custom_name)
+            resolve_subject(student, custom_name)
     return redirect('settings')
 
 @login_required
+@transaction.atomic
 def delete_subject(request, subject_id):
     if request.method == 'POST':
         subject = get_object_or_404(Subject, id=subject_id, student__user=request.user)
@@ -295,26 +404,19 @@ def delete_subject(request, subject_id):
     return redirect('settings')
 
 @login_required
+@transaction.atomic
 def initialize_subjects(request, student_id):
     student = get_object_or_404(Student, id=student_id, user=request.user)
     required_subjects = get_required_subjects(student.grade_level)
     
     for subject_name in required_subjects:
-        # Find matching GlobalSubject
-        global_subj = GlobalSubject.objects.filter(name__iexact=subject_name).first()
-        
-        if global_subj:
-            # Check if already exists to avoid duplicates
-            if not Subject.objects.filter(student=student, global_subject=global_subj).exists():
-                Subject.objects.create(student=student, global_subject=global_subj)
-        else:
-            # Fallback to custom name if no global match found
-            if not Subject.objects.filter(student=student, name__iexact=subject_name).exists():
-                Subject.objects.create(student=student, name=subject_name)
+        # Links to the matching GlobalSubject, falling back to a custom name
+        resolve_subject(student, subject_name)
                 
     return redirect('settings')
 
 @login_required
+@transaction.atomic
 def add_edit_school_day(request):
     if request.method == 'POST':
         day_id = request.POST.get('day_id')
@@ -335,16 +437,7 @@ def add_edit_school_day(request):
             subject_objs = []
             for s_name in subjects_list:
                 if s_name:
-                    subj = Subject.objects.filter(student=student, global_subject__name__iexact=s_name).first()
-                    if not subj:
-                        subj = Subject.objects.filter(student=student, name__iexact=s_name).first()
-                    if not subj:
-                        global_subj = GlobalSubject.objects.filter(name__iexact=s_name).first()
-                        if global_subj:
-                            subj = Subject.objects.create(student=student, global_subject=global_subj)
-                        else:
-                            subj = Subject.objects.create(student=student, name=s_name)
-                    subject_objs.append(subj)
+                    subject_objs.append(resolve_subject(student, s_name))
             day.subjects.set(subject_objs)
         else:
             day = SchoolDay.objects.create(student=student, date=date_str)
@@ -352,178 +445,104 @@ def add_edit_school_day(request):
             # Add subjects with GlobalSubject-aware resolution
             for s_name in subjects_list:
                 if s_name:
-                    subj = Subject.objects.filter(student=student, global_subject__name__iexact=s_name).first()
-                    if not subj:
-                        subj = Subject.objects.filter(student=student, name__iexact=s_name).first()
-                    if not subj:
-                        global_subj = GlobalSubject.objects.filter(name__iexact=s_name).first()
-                        if global_subj:
-                            subj = Subject.objects.create(student=student, global_subject=global_subj)
-                        else:
-                            subj = Subject.objects.create(student=student, name=s_name)
-                    day.subjects.add(subj)
-        
+                    day.subjects.add(resolve_subject(student, s_name))
+
+        if request.htmx:
+            return _attendance_changed_response(request)
+
         next_url = request.GET.get('next') or request.POST.get('next')
         if next_url:
             return redirect(next_url)
     return redirect('settings')
 
 @login_required
+@family_conditional
 def settings_view(request):
-        
-    # Display students
-    # Display students with subject count annotation
-    students = Student.objects.filter(user=request.user).annotate(subject_count=Count('subjects'))
-    
-    # Add helper attribute for template
-    for student in students:
-        student.has_subjects = student.subject_count > 0
-    
-    # Display recent attendance history (last 50 records)
-    school_days = SchoolDay.objects.filter(student__user=request.user).select_related('student').prefetch_related('subjects').order_by('-date', '-created_at')[:50]
-    
-    # Calendar Logic
-    import calendar
-    from datetime import date
-    
-    today = timezone.now().date()
-    
-    # Get month and year from request, default to today
-    try:
-        year = int(request.GET.get('year', today.year))
-        month = int(request.GET.get('month', today.month))
-    except (ValueError, TypeError):
-        year = today.year
-        month = today.month
-        
-    cal = calendar.monthcalendar(year, month)
-    month_name = calendar.month_name[month]
-    
-    # Calculate previous and next month/year
-    if month == 1:
-        prev_month = 12
-        prev_year = year - 1
-    else:
-        prev_month = month - 1
-        prev_year = year
-        
-    if month == 12:
-        next_month = 1
-        next_year = year + 1
-    else:
-        next_month = month + 1
-        next_year = year
-
-    # Get all days with attendance for this user in this month
-    logged_dates = set(SchoolDay.objects.filter(
-        student__user=request.user,
-        date__year=year,
-        date__month=month
-    ).values_list('date', flat=True))
-    
-    calendar_weeks = []
-    for week in cal:
-        week_data = []
-        for day in week:
-            if day == 0:
-                week_data.append(None)
-            else:
-                current_date_obj = date(year, month, day)
-                is_logged = current_date_obj in logged_dates
-                week_data.append({'day': day, 'is_logged': is_logged})
-        calendar_weeks.append(week_data)
+    # Display students with their subjects (counts come from the prefetch)
+    students = _students_with_subjects(request.family.students)
 
-    
     # Get all Associations
-    from .models import Association
     associations = Association.objects.all()
     
     # Get all GlobalSubjects for the subject dropdown
     global_subjects = GlobalSubject.objects.all()
 
-    # Month choices for dropdowns
-    import calendar as cal_module
-    months = [(i, cal_module.month_name[i]) for i in range(1, 13)]
-
     return render(request, 'core/settings.html', {
         'students': students, 
         'grade_choices': Student.GRADE_CHOICES,
-        'school_days': school_days,
-        'calendar_weeks': calendar_weeks,
-        'current_month_name': month_name,
-        'current_year': year,
-        'current_date': today,
-        'prev_month': prev_month,
-        'prev_year': prev_year,
-        'next_month': next_month,
-        'next_year': next_year,
         'associations': associations,
         'global_subjects': global_subjects,
-        'months': months,
+        'months': _month_choices(),
     })
 
-@login_required
-def dashboard(request):
-    # Optimizing query to prevent N+1 problem
-    students = Student.objects.filter(user=request.user).annotate(
-        days_completed_count=Count('school_days')
-    ).prefetch_related(
-        'subjects',
-        'subjects__global_subject',
-        Prefetch('work_samples', queryset=WorkSample.objects.order_by('-date_uploaded'))
-    )
-    
-    students_data = []
-    for student in students:
-        # Use annotated count
-        days_completed = student.days_completed_count
-        progress_percentage = min(100, int((days_completed / 180) * 100))
-        days_remaining = max(0, 180 - days_completed)
-        
-        # Get explicitly assigned subjects
-        db_subjects = [s.display_name for s in student.subjects.all()]
-        
-        # If student has assigned subjects, use them
-        if db_subjects:
-            required_subjects = sorted(list(set(db_subjects)))
-        else:
-             # Fallback to default if no subjects assigned
-             required_subjects = get_required_subjects(student.grade_level)
-        
-        # Calculate 6-week compliance window
-        six_weeks_ago = timezone.now().date() - timezone.timedelta(days=42)
+def _required_subjects(student):
+    """The student's assigned subjects (prefetched), or the grade's defaults when none are assigned."""
+    db_subjects = [s.display_name for s in student.subjects.all()]
+    if db_subjects:
+        return sorted(set(db_subjects))
+    return get_required_subjects(student.grade_level)
 
-        # Check compliance using prefetched data
-        all_samples = list(student.work_samples.all())
-        
-        valid_subjects = {
-            s.subject for s in all_samples if s.date_uploaded >= six_weeks_ago
-        }
-        
-        missing_samples = [
-            s for s in required_subjects if s not in valid_subjects
-        ]
 
-        # Get recent uploads from prefetched list
-        recent_samples = all_samples[:5]
+def _student_card_data(student, years, samples):
+    """Context for one dashboard card from the student's AttendanceYears and newest-first samples."""
+    days_completed = total_days(years)
+    required_subjects = _required_subjects(student)
 
-        students_data.append({
-            'student': student,
-            'days_completed': days_completed,
-            'days_remaining': days_remaining,
-            'progress_percentage': progress_percentage,
-            'is_complete': days_completed >= 180,
-            'required_subjects': required_subjects,
-            'missing_samples': missing_samples,
-            'recent_samples': recent_samples
-        })
-    
-    context = {
-        'students_data': students_data,
+    # Calculate 6-week compliance window
+    six_weeks_ago = timezone.now().date() - timezone.timedelta(days=42)
+    valid_subjects = {s.subject for s in samples if s.date_uploaded >= six_weeks_ago}
+
+    return {
+        'student': student,
+        'days_completed': days_completed,
+        'days_remaining': max(0, 180 - days_completed),
+        'progress_percentage': min(100, int((days_completed / 180) * 100)),
+        'is_complete': days_completed >= 180,
+        'required_subjects': required_subjects,
+        'missing_samples': [s for s in required_subjects if s not in valid_subjects],
+        'recent_samples': samples[:5],
     }
-    return render(request, 'core/dashboard.html', context)
+
+
+@async_login_required
+@family_conditional
+async def dashboard(request):
+    """
+    The page shell: the bulk log form plus a skeleton per student. Each card
+    then loads from student_card in its own HTMX request.
+    """
+    family = request.family
+    students = await sync_to_async(lambda: family.students)()
+    students_data = [
+        {'student': student, 'required_subjects': _required_subjects(student)}
+        for student in students
+    ]
+    return await sync_to_async(render)(request, 'core/dashboard.html', {'students_data': students_data})
+
+
+@async_login_required
+@family_conditional
+async def student_card(request, student_id):
+    """One student's dashboard card (progress, log form, sample warnings)."""
+    # Student (with subjects), attendance and samples load concurrently
+    results = await gather_queries(
+        student=lambda: Student.objects.filter(id=student_id, user=request.user).prefetch_related(
+            'subjects', 'subjects__global_subject'
+        ).first(),
+        attendance=lambda: load_years([student_id]),
+        samples=lambda: list(
+            WorkSample.objects.filter(student_id=student_id, student__user=request.user).order_by('-date_uploaded')
+        ),
+    )
+    student = results['student']
+    if student is None:
+        raise Http404("Student not found")
+
+    data = _student_card_data(student, results['attendance'][student_id], results['samples'])
+    return await sync_to_async(render)(request, 'core/partials/student_card.html', {'data': data})
 
 @login_required
+@transaction.atomic
 def log_school_day(request):
     if request.method == "POST":
         student_id = request.POST.get('student_id')
@@ -539,36 +558,27 @@ def log_school_day(request):
             date_obj = timezone.now().date()
         
         try:
-            day = SchoolDay.objects.create(
-                student=student, 
-                date=date_obj, 
-                notes=notes,
-                # subjects_completed=subjects_completed # Removed
-            )
-            
-            # Handle M2M Subjects
-            if subjects_completed:
-                for s_name in subjects_completed:
-                    if s_name:
-                        # Try to find existing subject for this student
-                        subj = Subject.objects.filter(student=student, global_subject__name__iexact=s_name).first()
-                        if not subj:
-                            subj = Subject.objects.filter(student=student, name__iexact=s_name).first()
-                        if not subj:
-                            # Check if matches a GlobalSubject
-                            global_subj = GlobalSubject.objects.filter(name__iexact=s_name).first()
-                            if global_subj:
-                                subj = Subject.objects.create(student=student, global_subject=global_subj)
-                            else:
-                                subj = Subject.objects.create(student=student, name=s_name)
-                        day.subjects.add(subj)
+            # Savepoint: a duplicate date must not break the view's transaction
+            with transaction.atomic():
+                day = SchoolDay.objects.create(
+                    student=student, 
+                    date=date_obj, 
+                    notes=notes,
+                    # subjects_completed=subjects_completed # Removed
+                )
+                
+                # Handle M2M Subjects
+                if subjects_completed:
+                    for s_name in subjects_completed:
+                        if s_name:
+                            day.subjects.add(resolve_subject(student, s_name))
         except IntegrityError:
             # Handle duplicate date (silently fail or return error - simple return for now)
             # ideally we return an error message to HTMX
              return HttpResponse("Error: Date already logged", status=400)
              
         # HTMX response: return updated counts
-        days_completed = student.school_days.count()
+        days_completed = total_days(student_years(student))
         days_remaining = max(0, 180 - days_completed)
         
         return render(request, 'core/partials/stats.html', {
@@ -580,6 +590,7 @@ def log_school_day(request):
     return HttpResponse(status=400)
 
 @login_required
+@transaction.atomic
 def bulk_log_school_day(request):
     if request.method == "POST":
         student_ids = request.POST.getlist('student_ids')
@@ -611,18 +622,7 @@ def bulk_log_school_day(request):
                 if subjects:
                     for s_name in subjects:
                         if s_name:
-                            # Try to find existing subject for this student
-                            subj = Subject.objects.filter(student=student, global_subject__name__iexact=s_name).first()
-                            if not subj:
-                                subj = Subject.objects.filter(student=student, name__iexact=s_name).first()
-                            if not subj:
-                                # Check if matches a GlobalSubject
-                                global_subj = GlobalSubject.objects.filter(name__iexact=s_name).first()
-                                if global_subj:
-                                    subj = Subject.objects.create(student=student, global_subject=global_subj)
-                                else:
-                                    subj = Subject.objects.create(student=student, name=s_name)
-                            day.subjects.add(subj)
+                            day.subjects.add(resolve_subject(student, s_name))
             
             # SchoolDay.objects.bulk_create(school_days) # Removed in favor of loop for M2M
             
@@ -630,11 +630,15 @@ def bulk_log_school_day(request):
     return redirect('dashboard')
 
 @login_required
+@transaction.atomic
 def delete_school_day(request, day_id):
     # This might be used by a direct link or fetch
     day = get_object_or_404(SchoolDay, id=day_id, student__user=request.user)
     day.delete()
-    
+
+    if request.htmx:
+        return _attendance_changed_response(request)
+
     next_url = request.GET.get('next') or request.POST.get('next')
     if next_url:
         return redirect(next_url)
@@ -642,33 +646,22 @@ def delete_school_day(request, day_id):
     return redirect('settings')
 
 @login_required
+@transaction.atomic
 def delete_student(request, student_id):
     student = get_object_or_404(Student, id=student_id, user=request.user)
     student.delete()
-    student.delete()
-    
-    # HTMX: Return updated student list
-    students = Student.objects.filter(user=request.user).annotate(subject_count=Count('subjects'))
-    for student in students:
-        student.has_subjects = student.subject_count > 0
-        
-    global_subjects = GlobalSubject.objects.all()
-    
-    # Month choices for dropdowns
-    import calendar as cal_module
-    months = [(i, cal_module.month_name[i]) for i in range(1, 13)]
-    
-    return render(request, 'core/partials/student_list.html', {
-        'students': students,
-        'grade_choices': Student.GRADE_CHOICES,
-        'global_subjects': global_subjects,
-        'months': months,
-    })
 
-# PDF Imports
-
-from core.services.pdf_service import prepare_compliance_data
+    # HTMX: The row swaps itself out with the empty body; only the counts follow
+    return HttpResponse(_student_count_oob(request))
 
+def _report_flight_key(request, kind, student, start_date, end_date):
+    """
+    Identifies one rendered report. The family's data_version and today's date
+    (printed on the PDF) change the key whenever the output would change.
+    """
+    profile = request.family.profile
+    version = profile.data_version.timestamp() if profile else ''
+    return f"{kind}:{student.id}:{start_date}:{end_date}:{version}:{timezone.localdate()}"
 
 
 @login_required
@@ -772,7 +765,11 @@ def download_report(request):
     from core.tasks import async_generate_report
     
     try:
-        pdf_content = async_generate_report(student.id, str(start_date), str(end_date))
+        # Double clicks and retries share one render
+        pdf_content = single_flight(
+            _report_flight_key(request, 'compliance', student, start_date, end_date),
+            lambda: async_generate_report(student.id, str(start_date), str(end_date)),
+        )
         
         if pdf_content:
             response = HttpResponse(pdf_content, content_type='application/pdf')
@@ -892,9 +889,14 @@ def download_portfolio(request):
         'end_date': end_date,
     }
 
-    pdf_response = render_to_pdf('pdfs/portfolio_report.html', context)
+    # Double clicks and retries share one render
+    pdf_content = single_flight(
+        _report_flight_key(request, 'portfolio', student, start_date, end_date),
+        lambda: generate_pdf_bytes('pdfs/portfolio_report.html', context),
+    )
     
-    if pdf_response.status_code == 200:
+    if pdf_content:
+        pdf_response = HttpResponse(pdf_content, content_type='application/pdf')
         safe_name = slugify(student.name)
         filename = f"Portfolio_Samples_{safe_name}_{academic_year_label}.pdf"
         pdf_response['Content-Disposition'] = f'attachment; filename="{filename}"'
@@ -904,6 +906,7 @@ def download_portfolio(request):
 
 
 @login_required
+@transaction.atomic
 def upload_work_sample(request):
     if request.method == "POST":
         student_id = request.POST.get('student_id')
@@ -922,6 +925,7 @@ def upload_work_sample(request):
     return redirect('dashboard')
 
 @login_required
+@transaction.atomic
 def delete_work_sample(request, sample_id):
     sample = get_object_or_404(WorkSample, id=sample_id, student__user=request.user)
     if request.method == "POST":
@@ -929,6 +933,7 @@ def delete_work_sample(request, sample_id):
     return redirect('dashboard')
 
 @login_required
+@transaction.atomic
 def save_grade(request):
     if request.method == "POST":
         student_id = request.POST.get('student_id')
@@ -952,6 +957,7 @@ def save_grade(request):
     return HttpResponse(status=400)
 
 @login_required
+@family_conditional
 def gradebook_view(request, student_id):
     student = get_object_or_404(Student, id=student_id, user=request.user)
     subjects = student.subjects.all().order_by('name', 'global_subject__name')
@@ -985,3 +991,202 @@ def gradebook_view(request, student_id):
         'grade_rows': grade_rows,
         'terms': terms,
     })
+
+
+
+def _posted_scores(post):
+    """Reads the matrix's `score-<subject_id>-<term>` inputs into {(subject_id, term): score}."""
+    scores = {}
+    for name, score in post.items():
+        prefix, _, rest = name.partition('-')
+        subject_id, _, term = rest.partition('-')
+        if prefix == 'score' and subject_id.isdigit() and term:
+            scores[int(subject_id), term] = score
+    return scores
+
+
+@login_required
+@family_conditional
+def family_gradebook_view(request):
+    """
+    Every student's grades in one subject x term matrix, edited in place.
+
+    GET serves the cached matrix; POST saves all changed cells at once and
+    swaps the freshly built matrix back in. If the save is rejected, the
+    unchanged matrix comes back with the typed scores still in their cells.
+    """
+    context = {}
+    scores = errors = None
+    if request.method == "POST":
+        scores = _posted_scores(request.POST)
+        changed, errors = save_family_grades(request.user.id, scores)
+        context.update({'saved': changed, 'errors': errors})
+
+    if scores is not None and not errors:
+        # data_version moved on commit, so the cached matrix is already stale
+        gradebook = build_family_gradebook(request.user.id)
+    elif request.family.profile:
+        gradebook = family_gradebook(request.user.id, request.family.profile.data_version)
+    else:
+        gradebook = build_family_gradebook(request.user.id)
+    if errors:
+        overlay_scores(gradebook, scores)
+    context['gradebook'] = gradebook
+
+    if request.htmx:
+        return render(request, 'core/partials/family_gradebook_table.html', context)
+    return render(request, 'core/family_gradebook.html', context)
+
+@login_required
+def export_data(request, dataset):
+    """
+    Streams a family's attendance, work samples or grades as CSV or NDJSON.
+
+    Optional filters: `student_id`, `year` (academic start year). Staff may
+    pass `association_id` to export every family in an association.
+    """
+    if dataset not in EXPORT_COLUMNS:
+        raise Http404("Unknown export")
+
+    export_format = request.GET.get('format', 'csv')
+    if export_format not in EXPORT_FORMATS:
+        return HttpResponse("Unsupported export format", status=400)
+
+    # Validated up front: the export streams, so a bad filter found while
+    # iterating would surface after the 200 headers have gone out
+    try:
+        association_id = int(request.GET['association_id']) if request.GET.get('association_id') else None
+        student_id = int(request.GET['student_id']) if request.GET.get('student_id') else None
+    except ValueError:
+        return HttpResponse("Invalid student or association", status=400)
+
+    if association_id and request.user.is_staff:
+        students = Student.objects.filter(user__profile__association_id=association_id)
+        label = f"association_{association_id}"
+    else:
+        students = Student.objects.filter(user=request.user)
+        label = slugify(request.user.username)
+
+    if student_id:
+        student = get_object_or_404(students, id=student_id)
+        students = students.filter(id=student.id)
+        label = slugify(student.name)
+
+    academic_year = None
+    requested_year = request.GET.get('year')
+    if requested_year:
+        try:
+            academic_year = int(requested_year)
+        except ValueError:
+            return HttpResponse("Invalid year", status=400)
+        label = f"{label}_{academic_year}"
+
+    rows = iter_export_rows(dataset, students, academic_year)
+    if export_format == 'ndjson':
+        response = StreamingHttpResponse(stream_ndjson(dataset, rows), content_type='application/x-ndjson')
+    else:
+        response = StreamingHttpResponse(stream_csv(dataset, rows), content_type='text/csv')
+
+    response['Content-Disposition'] = f'attachment; filename="{dataset}_{label}.{export_format}"'
+    return response
+
+
+@login_required
+def director_dashboard(request, association_id=None):
+    """
+    Association-wide progress for directors (and staff): per-family and
+    per-student progress, at-risk students and subject coverage, read from
+    the rollup tables.
+    """
+    if request.user.is_staff:
+        associations = Association.objects.all()
+    else:
+        associations = Association.objects.filter(director=request.user)
+
+    if association_id is not None:
+        association = get_object_or_404(associations, id=association_id)
+    else:
+        association = associations.order_by('name').first()
+        if association is None:
+            raise Http404("No association to show")
+
+    # Picks up families that changed since the periodic refresh
+    refresh_association(association)
+
+    return render(request, 'core/director.html', {
+        'association': association,
+        'associations': associations.order_by('name'),
+        **association_overview(association),
+    })
+
+
+@login_required
+def search_view(request):
+    """
+    Ranked full-text search over the family's school days and work samples.
+    HTMX requests get just the result list (or the next page of it).
+    """
+    query = request.GET.get('q', '').strip()
+    try:
+        page = int(request.GET.get('page', 1))
+    except ValueError:
+        page = 1
+
+    context = {'query': query, **search(request.user, query, page)}
+    if request.htmx:
+        return render(request, 'core/partials/search_results.html', context)
+    return render(request, 'core/search.html', context)
+
+
+@login_required
+def protected_media(request, path):
+    """
+    Serves uploaded files (work samples and their derived images) to the family
+    that owns them. The bytes are sent by the front-end server when
+    MEDIA_SENDFILE_BACKEND is configured.
+    """
+    path = clean_media_path(path)
+    if not can_access(request.user, path):
+        # Same answer as a missing file, so paths can't be probed
+        raise Http404("File not found")
+    return serve_media(request, path)
+
+
+@login_required
+@require_POST
+def sync_upload(request):
+    """
+    JSON API: applies a device's queued day logs in one transaction.
+    Body: {"days": [{"key", "student", "date", "notes", "subjects"}, ...]}.
+    """
+    try:
+        entries = json.loads(request.body)['days']
+        if not isinstance(entries, list):
+            raise SyncError("days must be a list")
+        results = apply_day_logs(request.user, entries)
+    except (ValueError, KeyError, TypeError) as e:
+        message = str(e) if isinstance(e, SyncError) else "Expected a JSON body with a days list"
+        return JsonResponse({'error': message}, status=400)
+    return JsonResponse({'results': results})
+
+
+@login_required
+def sync_changes(request):
+    """JSON API: every day, subject and work sample change since ?cursor=."""
+    try:
+        return JsonResponse(changes_since(request.user, request.GET.get('cursor')))
+    except SyncError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+
+def metrics(request):
+    """
+    Web and task metrics in the Prometheus text format, for staff or a
+    scraper presenting settings.METRICS_TOKEN as a bearer token.
+    """
+    token = settings.METRICS_TOKEN
+    authorization = request.headers.get('Authorization', '')
+    has_token = bool(token) and constant_time_compare(authorization, f'Bearer {token}')
+    if not (has_token or request.user.is_staff):
+        raise Http404
+    return HttpResponse(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
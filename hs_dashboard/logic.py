@@ -1,26 +1,97 @@
+from datetime import date, timedelta
+
+DEFAULT_REQUIRED_DAYS = 180
+
+
 class SchoolYear:
-    def __init__(self):
-        self.current_day_count = 0
-        self.completed_subjects = []
+    """
+    One student's academic year: attended days as an integer bitset (bit n is
+    start + n days) and the number of days each subject was logged.
+
+    Plain Python with no database access, so an audit can feed it rows from a
+    single streamed query.
+    """
+
+    __slots__ = ('start', 'end', 'required_days', 'bits', 'subject_days')
+
+    def __init__(self, start, end, required_days=DEFAULT_REQUIRED_DAYS):
+        self.start = start
+        self.end = end
+        self.required_days = required_days
+        self.bits = 0
+        self.subject_days = {}
+
+    def __contains__(self, day):
+        return self.start <= day <= self.end and bool(self.bits >> (day - self.start).days & 1)
+
+    def log_day(self, day, subject=None):
+        """
+        Marks `day` attended and counts a day of `subject` (any hashable key).
+        Pass each (day, subject) pair once. Days outside the year are ignored.
+
+        Returns:
+            bool: Whether the day falls in this year.
+        """
+        if not self.start <= day <= self.end:
+            return False
+        self.bits |= 1 << (day - self.start).days
+        if subject is not None:
+            self.subject_days[subject] = self.subject_days.get(subject, 0) + 1
+        return True
+
+    @property
+    def days(self):
+        return bin(self.bits).count('1')
+
+    @property
+    def shortfall(self):
+        return max(0, self.required_days - self.days)
+
+    @property
+    def is_complete(self):
+        return self.shortfall == 0
+
+    def coverage(self, required_subjects):
+        """Splits `required_subjects` (keys) into (covered, missing) lists."""
+        covered = [subject for subject in required_subjects if self.subject_days.get(subject)]
+        missing = [subject for subject in required_subjects if not self.subject_days.get(subject)]
+        return covered, missing
+
+    def completion_date(self):
+        """The day the requirement was met, or None while it hasn't been."""
+        if not self.is_complete:
+            return None
+        bits, index, seen = self.bits, 0, 0
+        while bits:
+            if bits & 1:
+                seen += 1
+                if seen == self.required_days:
+                    return self.start + timedelta(days=index)
+            bits >>= 1
+            index += 1
+        return self.start
 
-    def check_days_remaining(self):
-        if self.current_day_count < 180:
-            days_remaining = 180 - self.current_day_count
-            print(f"Days remaining: {days_remaining}")
-        else:
-            print("You have completed the 180 required days!")
+    def projected_completion(self, today=None):
+        """
+        When the requirement will be met at the pace logged so far (school
+        days per calendar day since the year began). None before the first
+        logged day, or once the year is over and it was never met.
+        """
+        if self.is_complete:
+            return self.completion_date()
+        today = today or date.today()
+        days = self.days
+        if not days or today < self.start or today > self.end:
+            return None
+        elapsed = (today - self.start).days + 1
+        # Ceiling division: whole calendar days needed for the remaining school days
+        return today + timedelta(days=-(-self.shortfall * elapsed // days))
 
-    def log_days(self, days):
-        self.current_day_count += days
 
 # Test simulation
 if __name__ == "__main__":
-    # Create an instance of SchoolYear
-    school = SchoolYear()
-    
-    # Simulate logging 5 days
-    print("Logging 5 days of school...")
-    school.log_days(5)
-    
-    # Check and print the result
-    school.check_days_remaining()
+    year = SchoolYear(date(2025, 8, 1), date(2026, 7, 31))
+    for offset in range(0, 60, 2):
+        year.log_day(date(2025, 8, 1) + timedelta(days=offset), 'math')
+    print(f"Days: {year.days}, remaining: {year.shortfall}")
+    print(f"Projected completion: {year.projected_completion(date(2025, 9, 30))}")